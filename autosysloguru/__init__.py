@@ -71,18 +71,70 @@
 
 
 import atexit as _atexit
+import functools
+import inspect
+import logging
+import os as _os
+import reprlib
+import signal
 import sys as _sys
-from sys import stdout, stderr
+import threading
+from sys import stderr
 
 from loguru import _Core, _Logger
+from loguru import _defaults
+from loguru._colorama import should_colorize
+from loguru._colorizer import Colorizer
 from loguru._defaults import env
+from loguru._file_sink import FileSink
+from loguru._get_frame import get_frame
+from loguru._logger import context, start_time
+from loguru._recattrs import RecordException, RecordLevel
+
+from . import _timing
+from ._aio import Completion, running_loop
+from ._background import BackgroundSink
+from ._binary import BinaryFileSink
+from ._config import LoguruConfig, load_config, resolve_handlers
+from ._file_sinks import AutoSysFileSink, BufferedFileSink, MappedFileSink
+from ._filters import DedupFilter, FilterChain, RateLimitFilter, SamplingFilter, chained_filters
+from ._merge import ThreadBuffers
+from ._metrics import Metrics, PrometheusExporter, sink_chain
+from ._record import parts as _parts
+from ._reload import ConfigWatcher
+from ._remote import RING_KEY, LogReceiver, RemoteSink
+from ._ring import RingBuffer
+from ._serializer import DEFAULT_FIELDS, JsonLinesSink
+from ._template import TemplateSink, coloring
+from ._timing import perf_counter_ns, process_time_ns
 
 if True:  # * ################## type definitions
     from io import TextIOWrapper
     from logging import Handler
+    from os import PathLike
     from typing import Dict, List
+    from weakref import WeakSet
 
 
+_TRACE_NO: int = _defaults.LOGURU_TRACE_NO
+_DEBUG_NO: int = _defaults.LOGURU_DEBUG_NO
+_INFO_NO: int = _defaults.LOGURU_INFO_NO
+_SUCCESS_NO: int = _defaults.LOGURU_SUCCESS_NO
+_WARNING_NO: int = _defaults.LOGURU_WARNING_NO
+_ERROR_NO: int = _defaults.LOGURU_ERROR_NO
+_CRITICAL_NO: int = _defaults.LOGURU_CRITICAL_NO
+_STANDARD_LEVELS: Dict[str, int] = {'TRACE': _TRACE_NO, 'DEBUG': _DEBUG_NO, 'INFO': _INFO_NO,
+                                    'SUCCESS': _SUCCESS_NO, 'WARNING': _WARNING_NO,
+                                    'ERROR': _ERROR_NO, 'CRITICAL': _CRITICAL_NO}
+
+# keyword arguments of loguru's add(); anything else is an option of the file sink
+_ADD_OPTIONS = frozenset(('level', 'format', 'filter', 'colorize', 'serialize',
+                          'backtrace', 'diagnose', 'enqueue', 'catch'))
+_BUFFER_OPTIONS = ('buffer_size', 'flush_interval', 'flush_level')
+
+# address served by a LogReceiver in this process (see AutoSysLogger.aggregate)
+_receiver_address: str = None
+
 # use existing _debug_ else use default
 try:
     _debug_
@@ -94,11 +146,77 @@ class PropagateHandler(Handler):
     """ Handler used to pass messages directly from Loguru to the standard library logging module Logger. Just set it and forget it.
 
     logger = AutoSysLogger(propagate=True)
+
+    Standard library loggers are cached per record name (up to `cache_size`
+    names; call `cache_clear()` after reconfiguring `logging`), and records
+    the target logger would drop are never dispatched. With `batch_size`
+    above 1, records are handed to the standard library in batches; a batch
+    is flushed when full, on ERROR and above, every `flush_interval` seconds
+    (by a thread started with the first batch), on `logger.complete()` and
+    when the handler is closed.
     """
 
+    def __init__(self, level=logging.NOTSET, cache_size: int = 256, batch_size: int = 0,
+                 flush_interval: float = 1.0):
+        super().__init__(level)
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._loggers: Dict = {}
+        self._batch: List = []
+        self._stopped = threading.Event()
+        self._flusher = None
+
+    def get_logger(self, name) -> logging.Logger:
+        try:
+            return self._loggers[name]
+        except KeyError:
+            pass
+        if len(self._loggers) >= self.cache_size:
+            self._loggers = {}
+        target = self._loggers[name] = logging.getLogger(name)
+        return target
+
+    def cache_clear(self):
+        """ Forget cached standard library loggers. """
+        self._loggers = {}
+
     def emit(self, record):
-        import logging
-        logging.getLogger(record.name).handle(record)
+        if self.batch_size > 1:
+            self._batch.append(record)
+            if len(self._batch) >= self.batch_size or record.levelno >= logging.ERROR:
+                self.flush()
+            elif self._flusher is None and self.flush_interval and not self._stopped.is_set():
+                self._flusher = threading.Thread(target=self._flush_periodically, daemon=True,
+                                                 name='autosysloguru-propagate')
+                self._flusher.start()
+            return
+        target = self.get_logger(record.name)
+        if target.isEnabledFor(record.levelno):
+            target.handle(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            batch, self._batch = self._batch, []
+        finally:
+            self.release()
+        get_logger = self.get_logger
+        for record in batch:
+            target = get_logger(record.name)
+            if target.isEnabledFor(record.levelno):
+                target.handle(record)
+
+    def _flush_periodically(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stopped.set()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self.flush()
+        super().close()
 
 
 class AutoSysLevelChangeFilter:
@@ -113,53 +231,302 @@ class AutoSysLevelChangeFilter:
     level_filter.level = "DEBUG"
     ```
 
+    The numeric threshold is resolved once when `level` is assigned (and
+    again when levels change through `AutoSysLogger.level()`), so each
+    record only costs a single integer compare. Loggers the filter is
+    attached to are notified so their early level gate stays current.
+
     from loguru documentation 'recipes'
     https://loguru.readthedocs.io/en/stable/resources/recipes.html
     """
 
-    def __init__(self, level):
+    _instances: WeakSet = WeakSet()
+    _counters = None  # ShardedCounters of the logger's metrics, if enabled
+
+    def __init__(self, level, logger=None):
+        self._logger = logger
+        self._cores: WeakSet = WeakSet()
         self.level = level
+        AutoSysLevelChangeFilter._instances.add(self)
+
+    @property
+    def level(self):
+        return self._level
+
+    @level.setter
+    def level(self, value):
+        self.levelno = self._resolve(value)
+        self._level = value
+        for core in list(self._cores):
+            _update_min_level(core)
+
+    def _resolve(self, level) -> int:
+        if isinstance(level, int):
+            return level
+        if self._logger is None and type(logger) is _LazyAutoSysLogger:
+            # resolving through the module logger would configure it
+            try:
+                return _STANDARD_LEVELS[level]
+            except KeyError:
+                raise ValueError(f"Level '{level}' does not exist") from None
+        return (self._logger or logger).level(level).no
+
+    def refresh(self):
+        """ Resolve the cached threshold again from the current level name. """
+        self.level = self._level
+
+    @classmethod
+    def refresh_all(cls):
+        """ Invalidate the cached threshold of every live level filter. """
+        for level_filter in list(cls._instances):
+            level_filter.refresh()
 
     def __call__(self, record):
-        levelno = logger.level(self.level).no
-        return record['level'].no >= levelno
+        # records replayed by a ring buffer are below the level on purpose
+        if record['level'].no >= self.levelno or RING_KEY in record.get('extra', ()):
+            return True
+        if self._counters is not None:
+            self._counters.add(('dropped', record['level'].name))
+        return False
+
+
+def _update_min_level(core: _Core):
+    """ Set `core.min_level` to the lowest level any attached handler accepts.
+
+        Loguru only counts each handler's own `level`, which is 0 for handlers
+        gated by an `AutoSysLevelChangeFilter` (alone or in a `FilterChain`);
+        the filter threshold is taken into account here so `AutoSysLogger` can drop disabled levels before
+        any record is built. """
+    with core.lock:
+        levelnos = []
+        for handler in core.handlers.values():
+            levelno = handler._levelno
+            for level_filter in chained_filters(handler._filter):
+                if isinstance(level_filter, AutoSysLevelChangeFilter):
+                    levelno = max(levelno, level_filter.levelno)
+            levelnos.append(levelno)
+        core.min_level = min(levelnos, default=float('inf'))
+
+
+def _flush_summaries(handlers: List):
+    """ Write the pending "repeated N times" summaries of the `DedupFilter`s of `handlers`. """
+    for handler in handlers:
+        for member in chained_filters(handler._filter):
+            if isinstance(member, DedupFilter):
+                member.flush()
 
 
 class AutoSysLoggerError(Exception):
     """ A problem occurred while configuring the logger. """
 
 
-class LoguruConfig:
-    """ Configuration data for AutoSysLoguru """
+class _TruncatedRepr(reprlib.Repr):
+    """ `reprlib.Repr` that also slices bytes before rendering them. """
 
-    def __init__(self, dev_level: str, prod_level: str, dev_handlers: List, prod_handlers: List):
-        self.dev_level = dev_level
-        self.prod_level = prod_level
-        self.dev_handlers = dev_handlers
-        self.prod_handlers = prod_handlers
+    def __init__(self, max_repr: int):
         super().__init__()
+        self.maxstring = self.maxlong = self.maxother = max_repr
+
+    def repr_bytes(self, x, level):
+        if len(x) <= self.maxother:
+            return repr(x)
+        return repr(x[:self.maxother]) + '...'
+
+    repr_bytearray = repr_bytes
+
+    def __call__(self, value) -> str:
+        text = self.repr(value)
+        if len(text) <= self.maxother:
+            return text
+        return text[:max(self.maxother - 3, 0)] + '...'
+
+
+def _render(value, summarize, many: bool = False):
+    """ Render a call's args tuple, kwargs dict or result (lazily, from a log call). """
+    if summarize is None:
+        return value
+    if not many:
+        return summarize(value)
+    if isinstance(value, dict):
+        return '{' + ', '.join(f'{key!r}: {summarize(item)}' for key, item in value.items()) + '}'
+    return '(' + ', '.join(map(summarize, value)) + ')'
+
+
+def logger_wraps(*, entry=True, exit=True, level='DEBUG', max_repr: int = None, summarize=None,
+                 timing: bool = False, interval: float = None):
+    """ Log entry to and exit from the decorated function.
+
+        Nothing is rendered unless a handler accepts `level`. Arguments and
+        results are rendered lazily, either with `summarize` (a callable
+        returning a short string for one value) or truncated to `max_repr`
+        characters. Coroutine functions are awaited and generator functions
+        are delegated to with `yield from`, so the exit message carries the
+        awaited or returned value.
+
+        With `timing=True`, entry/exit messages are replaced by wall and CPU
+        time histograms per function, summarized (count, p50/p95/p99, max)
+        at `level` every `interval` seconds and at exit. Calls are timed
+        whatever the logger's level, including calls that raise.
+
+        https://loguru.readthedocs.io/en/stable/resources/recipes.html
+    """
+    if summarize is None and max_repr is not None:
+        summarize = _TruncatedRepr(max_repr)
 
-
-def logger_wraps(*, entry=True, exit=True, level='DEBUG'):
-    # https://loguru.readthedocs.io/en/stable/resources/recipes.html
     def wrapper(func):
-        name = func.__name__
+        if timing:
+            return _timed(func, level, interval)
 
-        @functools.wraps(func)
-        def wrapped(*args, **kwargs):
-            logger_ = logger.opt(depth=1)
+        name = func.__name__
+        logger_ = None  # set on the first call, decorating does not configure the logger
+
+        def enabled() -> bool:
+            nonlocal logger_
+            if logger_ is None:
+                # depth=2: skip log_entry/log_exit and the wrapper itself
+                logger_ = logger.opt(depth=2, lazy=True)
+            core = logger_._core
+            if isinstance(level, int):
+                return level >= core.min_level
+            level_ = core.levels.get(level)
+            if level_ is None:
+                raise ValueError(f"Level '{level}' does not exist")  # as loguru's log() would
+            return level_.no >= core.min_level
+
+        def log_entry(args, kwargs):
             if entry:
-                logger_.log(level, "Entering '{}' (args={}, kwargs={})", name, args, kwargs)
-            result = func(*args, **kwargs)
+                logger_.log(level, "Entering '{}' (args={}, kwargs={})", lambda: name,
+                            lambda: _render(args, summarize, True), lambda: _render(kwargs, summarize, True))
+
+        def log_exit(result):
             if exit:
-                logger_.log(level, "Exiting '{}' (result={})", name, result)
-            return result
+                logger_.log(level, "Exiting '{}' (result={})", lambda: name,
+                            lambda: _render(result, summarize))
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapped(*args, **kwargs):
+                if not enabled():
+                    return await func(*args, **kwargs)
+                log_entry(args, kwargs)
+                result = await func(*args, **kwargs)
+                log_exit(result)
+                return result
+
+        elif inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapped(*args, **kwargs):
+                if not enabled():
+                    return (yield from func(*args, **kwargs))
+                log_entry(args, kwargs)
+                result = yield from func(*args, **kwargs)
+                log_exit(result)
+                return result
+
+        else:
+            @functools.wraps(func)
+            def wrapped(*args, **kwargs):
+                if not enabled():
+                    return func(*args, **kwargs)
+                log_entry(args, kwargs)
+                result = func(*args, **kwargs)
+                log_exit(result)
+                return result
 
         return wrapped
 
     return wrapper
 
 
+def _timed(func, level, interval: float = None):
+    """ `func` wrapped to record its wall and CPU time (see `logger_wraps`). """
+    stats = _timing.TimingStats(func.__qualname__, level, interval)
+    _timing.registry.add(stats)
+
+    def done(wall_started, cpu_started):
+        now = perf_counter_ns()
+        if stats.record(now - wall_started, process_time_ns() - cpu_started, now):
+            _report_timing(stats)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapped(*args, **kwargs):
+            started = perf_counter_ns(), process_time_ns()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                done(*started)
+
+    elif inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            started = perf_counter_ns(), process_time_ns()
+            try:
+                return (yield from func(*args, **kwargs))
+            finally:
+                done(*started)
+
+    else:
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            started = perf_counter_ns(), process_time_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                done(*started)
+
+    return wrapped
+
+
+def _report_timing(stats: _timing.TimingStats):
+    summary = stats.take_summary()
+    if summary:
+        logger.log(stats.level, "Timing '{}' ({})", stats.name, summary)
+
+
+def _report_timings():
+    """ Emit the remaining `logger_wraps(timing=True)` summaries (at exit). """
+    for stats in list(_timing.registry):
+        _report_timing(stats)
+
+
+class _LoggerState:
+    """ What an `AutoSysLogger` shares with the loggers `opt()`, `bind()` and
+        `patch()` derive from it: its options, level and level filter, and
+        what it started (sinks, ring buffer, metrics, watcher, ...). """
+
+    def __init__(self, debug: bool, propagate: bool, json: bool, handlers: List, nonblocking: bool,
+                 queue_size: int, overflow: str, asyncio: bool, level: str):
+        self.debug: bool = debug
+        # if True, logger messages will propagate to stdlib logging module
+        self.propagate: bool = propagate
+        self.json: bool = json
+        self.handlers: List = handlers
+        # if True, sinks are written by a background thread (see _background.py)
+        self.nonblocking: bool = nonblocking
+        self.queue_size: int = queue_size
+        self.overflow: str = overflow
+        # if True, handlers are nonblocking and never make an event loop wait
+        self.asyncio: bool = asyncio
+        self.background: Dict = {}
+        # the RingBuffer of ring_buffer() and the Metrics of enable_metrics(), if any
+        self.rings: List = []
+        self.metrics: List = []
+        # both get the calls dropped by the early level gate (see _keep)
+        self.gated: List = []
+        # the ThreadBuffers of thread_buffers(), if any
+        self.thread_buffers: List = []
+        self.level: str = level
+        self.logging: bool = True
+        self.level_filter: AutoSysLevelChangeFilter = None
+        self.user: str = ''
+        self.config: LoguruConfig = None
+        self.config_handlers: Dict = None  # handler key -> id, for handlers added by config()
+        self.watcher: ConfigWatcher = None
+        self.receiver: LogReceiver = None  # this process writes the records of its children
+        self.remote: RemoteSink = None  # this process sends its records to a writer
+
+
 class AutoSysLogger(_Logger):
     """ Smoother defaults for the awesome Loguru logger.
 
@@ -173,32 +540,34 @@ class AutoSysLogger(_Logger):
             _DEFAULT_DEV_LEVEL: str = 'TRACE'
 
         If level is set to "NONE", the logger will still load but no handlers
-        will be added. """
+        will be added.
+
+        The logger tracks the lowest level any attached handler accepts
+        (including `level_filter` thresholds), and logging calls below it
+        return immediately. """
 
-    _user: str = ''
-    _level: str = ''
-    _propagate: bool = False
+    # set by aggregate() and inherited by child processes
+    AGGREGATE_ENV: str = 'AUTOSYSLOGURU_AGGREGATE'
 
     _DEFAULT_PROD_LEVEL: str = 'SUCCESS'
     _DEFAULT_DEV_LEVEL: str = 'TRACE'
+    # used by config() when no configuration source has handlers
     _DEFAULT_DEV_HANDLERS: List = [
-        {'sink': stdout, 'colorize': True,
+        {'sink': 'sys.stdout', 'compiled': True,
          'format': '<green>{time}</green> <level>{message}</level>'},
-        # 1kb max size forces a new json file for each run
-        {'sink': 'output.json', 'serialize': True, 'rotation': '1 KB', 'retention': '10 days'},
+        # one json file per run (see _file_sinks.per_run_path)
+        {'sink': 'output.json', 'json': True, 'per_run': True, 'rotation': '100 MB', 'retention': '10 days'},
         # Set 'False' to not leak sensitive data in prod
         {'sink': 'output.log', 'backtrace': True, 'diagnose': True, 'rotation': '500 MB'}
     ]
     _DEFAULT_PROD_HANDLERS: List = [
-        {'sink': stdout, 'colorize': True, 'format': '<green>{time}</green> <level>{message}</level>'},
+        {'sink': 'sys.stdout', 'compiled': True, 'format': '<green>{time}</green> <level>{message}</level>'},
         {'sink': 'output.log', 'rotation': '500 MB', 'retention': '10 days'}
-    ],
-
-    LOGGING: bool = True
+    ]
 
     def __init__(
         self,
-        core: _Core = _Core(),
+        core: _Core = None,
         exception: str = None,
         depth: int = 0,
         record: bool = False,
@@ -210,32 +579,29 @@ class AutoSysLogger(_Logger):
         extra: Dict = {},
         debug: bool = False,
         level: str = '',
-        propagate: bool = True,
+        propagate: bool = False,
         json: bool = True,
-        handlers: Dict = {}
+        handlers: Dict = {},
+        nonblocking: bool = False,
+        queue_size: int = 10000,
+        overflow: str = 'drop_newest',
+        asyncio: bool = False
     ):
         # original class init method:
         # _Logger.__init__(self, core, exception, depth, record, lazy, colors, raw, capture, patcher, extra)
         # super().__init__(_Core(), None, 0, False, False, False, False, True, None, {})
+        if core is None:
+            core = _Core()
         super().__init__(core, exception, depth, record, lazy, colors, raw, capture, patcher, extra)
 
-        self._debug: bool = debug
-        self._propagate: bool = propagate
-        self._json: bool = json
-        self._handlers: List = handlers
-        self._level: int
-        self.level_filter = AutoSysLevelChangeFilter('WARNING')
+        # shared with the loggers derived by opt(), bind() and patch()
+        self._state = _LoggerState(debug, propagate, json, handlers, nonblocking, queue_size, overflow,
+                                   asyncio, level)
+        _ = self.__level
         # must be added at handler creation:
         # logger.add(sys.stderr, filter=level_filter, level=0)
         # but can be adjusted dynamically:
-        level_filter.level = self.level
-
-        if level:
-            self.level(level)
-        else:
-            _ = self.level
-
-        # if True, logger messages will propagate to stdlib logging module
+        self._state.level_filter = AutoSysLevelChangeFilter(self._state.level if self.LOGGING else 0, self)
 
         self._set_default_handler()
 
@@ -245,9 +611,9 @@ class AutoSysLogger(_Logger):
             retval[name] = value
         return retval
 
-    def json_handler(self, filename='output.json', rotation='1 B', retention='10 days'):
-        # 1 B max size forces a new json file for each run
-        retval = {'sink': filename, 'serialize': True}
+    def json_handler(self, filename='output.json', rotation='100 MB', retention='10 days'):
+        # per_run gives each run its own json file (rotated by size within a run)
+        retval = {'sink': filename, 'json': True, 'per_run': True}
         if rotation:
             retval['rotation'] = rotation
         if retention:
@@ -255,59 +621,668 @@ class AutoSysLogger(_Logger):
         return retval
         return {'sink': filename, 'serialize': True, 'rotation': rotation, 'retention': retention},
 
+    @property
+    def LOGGING(self) -> bool:
+        return self._state.logging
+
+    @LOGGING.setter
+    def LOGGING(self, value: bool):
+        self._state.logging = value
+
+    @property
+    def level_filter(self) -> AutoSysLevelChangeFilter:
+        return self._state.level_filter
+
     @property
     def username(self):
-        if not self._user:
+        if not self._state.user:
             from os import getuid
             from pwd import getpwuid
-            self._user = getpwuid(getuid())[0]
+            self._state.user = getpwuid(getuid())[0]
             del getuid
             del getpwuid
-        return self._user
+        return self._state.user
 
     @property
     def __debug(self):
-        if not self._debug:
-            self._debug = _debug_
-        return self._debug
+        if not self._state.debug:
+            self._state.debug = _debug_
+        return self._state.debug
 
     @__debug.setter
     def __debug(self, value: bool):
-        self._debug = bool(value)
+        self._state.debug = bool(value)
 
     @property
     def __level(self):
-        if not self._level:
+        if not self._state.level:
             from os import environ as _env
             if 'LOGURU_LEVEL' in _env:
-                self._level = _env.get('LOGURU_LEVEL', self._level)
+                self._state.level = _env.get('LOGURU_LEVEL', self._state.level)
+            elif self._state.config is not None and self._state.config.level(self.__debug):
+                # loaded by config(), environment variables already applied
+                self._state.level = self._state.config.level(self.__debug)
             else:  # or use environment default
                 if 'LOGURU_DEFAULT_LEVEL' in _env:
-                    self._level = _env.get('LOGURU_DEFAULT_LEVEL', self._level)
+                    self._state.level = _env.get('LOGURU_DEFAULT_LEVEL', self._state.level)
                 else:  # or use hardcoded defaults based on debug boolean flag
-                    if self.debug:
-                        self._level = self._DEFAULT_DEV_LEVEL
+                    if self.__debug:
+                        self._state.level = self._DEFAULT_DEV_LEVEL
                     else:
-                        self._level = self._DEFAULT_PROD_LEVEL
+                        self._state.level = self._DEFAULT_PROD_LEVEL
             del _env
-            self.LOGGING = self._level != 'NONE'
-        return self._level
+            self.LOGGING = self._state.level != 'NONE'
+        return self._state.level
 
     @__level.setter
     def __level(self, value):
         if value in stuff:  # todo - find the loguru list of levels
-            self._level = value
-            self.LOGGING = self._level != 'NONE'
+            self._state.level = value
+            self.LOGGING = self._state.level != 'NONE'
 
     def _level_name(self):
-        self.level(self._level)
+        self.level(self._state.level)
+
+    def level(self, name, no=None, color=None, icon=None):
+        level = super().level(name, no, color, icon)
+        if not (no is color is icon is None):
+            # a level was added or updated; cached filter thresholds are stale
+            AutoSysLevelChangeFilter.refresh_all()
+        return level
+
+    def add(self, sink, **kwargs):
+        """ Add a handler (see loguru's `add()`).
+
+            Extra options:
+
+            - `buffered` (file sinks): coalesce messages into large writes,
+              flushed every `buffer_size` bytes, `flush_interval` seconds and
+              at `flush_level` (ERROR) and above.
+            - `mapped` (file sinks): copy messages into a memory mapping of
+              the file, grown `segment_size` (64 MB) bytes at a time.
+            - `binary` (file sinks): write records in the binary block
+              format of _binary.py (read with the `autosysloguru` command),
+              taking the `buffered` options and `compress` (True).
+            - `per_run` (file sinks): write to a file named once for this run
+              (`output.<time>_<pid>_<id>.json`), applying `retention` to
+              previous runs in the background.
+            - `json`: write each record as one JSON line with the fields
+              listed in `json_fields` (see _serializer.FIELDS), replacing
+              loguru's generic `serialize=True` output.
+            - `nonblocking` (defaults to the logger's setting): move writes to
+              a background thread with a bounded queue of `queue_size`
+              messages and an `overflow` policy ('block', 'drop_oldest',
+              'drop_newest' or 'sample').
+            - `asyncio` (defaults to the logger's setting): `nonblocking`, and
+              a thread running an event loop never waits for the queue
+              (`block` drops there); `await logger.complete()` waits for
+              the writes without blocking the loop.
+            - `compiled`: render the `format` string with a function compiled
+              once per level (see _template.py) instead of loguru's generic
+              formatting; colors are used when `colorize` is true or, by
+              default, when the sink is a terminal.
+            - `filter` may be a list of filters, combined in a `FilterChain`
+              (e.g. `[logger.level_filter, RateLimitFilter(10)]`, see
+              _filters.py); level filters are checked first. """
+        loop_safe = kwargs.pop('asyncio', self._state.asyncio)
+        nonblocking = kwargs.pop('nonblocking', self._state.nonblocking) or loop_safe
+        queue_size = kwargs.pop('queue_size', self._state.queue_size)
+        overflow = kwargs.pop('overflow', self._state.overflow)
+        buffered = kwargs.pop('buffered', False)
+        buffer_options = {name: kwargs.pop(name) for name in _BUFFER_OPTIONS if name in kwargs}
+        flush_level = buffer_options.get('flush_level')
+        if isinstance(flush_level, str):  # e.g. from a configuration file
+            buffer_options['flush_level'] = int(flush_level) if flush_level.isdigit() else self.level(flush_level).no
+        mapped = kwargs.pop('mapped', False)
+        binary = kwargs.pop('binary', False)
+        json_lines = kwargs.pop('json', False)
+        json_fields = kwargs.pop('json_fields', DEFAULT_FIELDS)
+        compiled = kwargs.pop('compiled', False)
+        if isinstance(kwargs.get('filter'), (list, tuple)):
+            # level filters first: records they drop cost no tokens, samples or dedup state
+            kwargs['filter'] = FilterChain(*sorted(kwargs['filter'],
+                                                   key=lambda f: not isinstance(f, AutoSysLevelChangeFilter)))
+
+        created = None
+        if binary:
+            if not isinstance(sink, (str, PathLike)):
+                raise TypeError("'binary' is only supported for file paths")
+            kwargs.update(format='{message}', serialize=False, colorize=False)
+            file_options = {name: kwargs.pop(name) for name in list(kwargs) if name not in _ADD_OPTIONS}
+            sink = created = BinaryFileSink(sink, **buffer_options, **file_options)
+        elif isinstance(sink, (str, PathLike)):
+            sink = created = self._file_sink(sink, kwargs, buffered, buffer_options, mapped)
+        if json_lines:
+            # the formatted text is not used, keep loguru's work to a minimum
+            kwargs.update(format='{message}', serialize=False, colorize=False)
+            sink = created = JsonLinesSink(sink, json_fields)
+        elif compiled and isinstance(kwargs.get('format', _defaults.LOGURU_FORMAT), str) \
+                and not kwargs.get('serialize'):
+            colorize = kwargs.pop('colorize', None)
+            if colorize is None:
+                colorize = should_colorize(sink)
+            sink = created = TemplateSink(sink, kwargs.pop('format', _defaults.LOGURU_FORMAT), colorize,
+                                          self._core.levels_ansi_codes)
+            kwargs.update(format=sink.handler_format, colorize=colorize)
+        background = None
+        if nonblocking:
+            background = self._background_sink(sink, kwargs, queue_size, overflow, loop_safe)
+            if background is not None:
+                sink = created = background
+
+        try:
+            handler_id = super().add(sink, **kwargs)
+        except Exception:
+            if created is not None:
+                created.stop()
+            raise
+        if background is not None:
+            self._state.background[handler_id] = background
+        for metrics in self._state.metrics:
+            metrics.attach(self._core.handlers[handler_id])
+        for member in chained_filters(kwargs.get('filter')):
+            if isinstance(member, (AutoSysLevelChangeFilter, DedupFilter)):
+                member._cores.add(self._core)
+        _update_min_level(self._core)
+        return handler_id
+
+    @staticmethod
+    def _file_sink(path, kwargs: Dict, buffered: bool, buffer_options: Dict, mapped: bool = False):
+        """ Build the file sink for `path`, moving file options out of `kwargs`. """
+        file_options = {name: kwargs.pop(name) for name in list(kwargs) if name not in _ADD_OPTIONS}
+        kwargs.setdefault('colorize', False)
+        if mapped:
+            return MappedFileSink(path, **file_options)
+        if buffered:
+            return BufferedFileSink(path, **buffer_options, **file_options)
+        return AutoSysFileSink(path, **file_options)
+
+    @staticmethod
+    def _background_sink(sink, kwargs: Dict, queue_size: int, overflow: str, loop_safe: bool = False):
+        """ Wrap `sink` in a BackgroundSink. Returns None for sinks that
+            cannot be wrapped (handlers, coroutines). """
+        if isinstance(sink, Handler) or inspect.iscoroutinefunction(sink) \
+                or inspect.iscoroutinefunction(getattr(sink, '__call__', None)):
+            return None
+        if isinstance(sink, FileSink):
+            name = str(sink._path)
+        elif callable(getattr(sink, 'write', None)):
+            kwargs.setdefault('colorize', should_colorize(sink))
+            name = None
+        else:
+            kwargs.setdefault('colorize', False)
+            name = None
+        return BackgroundSink(sink, queue_size, overflow, name=name, loop_safe=loop_safe)
+
+    def remove(self, handler_id=None):
+        # summaries are written by the handlers using the filter: before they go
+        handlers = self._core.handlers
+        _flush_summaries([handlers[key] for key in (list(handlers) if handler_id is None else [handler_id])
+                          if key in handlers])
+        super().remove(handler_id)
+        if handler_id is None:
+            self._state.background.clear()
+            if self._state.config_handlers:
+                self._state.config_handlers.clear()
+        else:
+            self._state.background.pop(handler_id, None)
+            if self._state.config_handlers:
+                for key, config_id in list(self._state.config_handlers.items()):
+                    if config_id == handler_id:
+                        del self._state.config_handlers[key]
+        _update_min_level(self._core)
+
+    def queue_stats(self) -> Dict:
+        """ Counters (queued, dropped, written, errors, depth) per nonblocking handler id. """
+        return {handler_id: sink.stats() for handler_id, sink in self._state.background.items()}
+
+    def complete(self):
+        """ Write everything pending: thread buffers, nonblocking queues,
+            buffered files, `PropagateHandler` batches, `DedupFilter`
+            summaries and records for a remote writer (see loguru's
+            `complete()` for coroutine sinks).
+
+            On an event loop, this work starts at once in the loop's default
+            executor, awaited or not, so `await logger.complete()` never
+            blocks the loop; only the coroutine sinks' tasks are left to the
+            `await`. """
+        loop = running_loop()
+        if loop is not None:
+            return Completion(self._complete, loop)
+        return self._complete()
+
+    def _complete(self):
+        for buffers in self._state.thread_buffers:
+            buffers.flush()
+        for sink in list(self._state.background.values()):
+            sink.drain()
+        for handler in list(self._core.handlers.values()):
+            for member in sink_chain(handler._sink):
+                if isinstance(member, BufferedFileSink):
+                    member.flush_buffer()
+                elif isinstance(member, PropagateHandler):
+                    member.flush()
+        _flush_summaries(list(self._core.handlers.values()))
+        if self._state.remote is not None:
+            self._state.remote.send_pending()
+        return super().complete()
+
+    def aggregate(self, address: str = None) -> LogReceiver:
+        """ Become the single writer for this process and its children.
+
+            Records logged by child processes (forked after this call, or
+            started with this environment) are sent in batches over the Unix
+            socket `address` (default: in the temporary directory) and
+            written by this logger's handlers, so only this process opens
+            and rotates the log files. Forked children replace their copy
+            of the handlers with a `RemoteSink`; in other children the first
+            `AutoSysLogger` set up gets one. Children should call
+            `logger.complete()` (or `logger.remove()`) before exiting. """
+        global _receiver_address
+        if self._state.receiver is not None:
+            return self._state.receiver
+        if address is None:
+            import tempfile
+            address = _os.path.join(tempfile.gettempdir(), f'autosysloguru-{_os.getpid()}.sock')
+        self._state.receiver = LogReceiver(address, self)
+        _receiver_address = address
+        _os.environ[self.AGGREGATE_ENV] = address
+        if hasattr(_os, 'register_at_fork'):
+            _os.register_at_fork(after_in_child=self._after_fork_in_child)
+        return self._state.receiver
+
+    def stop_aggregating(self):
+        """ Stop receiving records from child processes. """
+        global _receiver_address
+        if self._state.receiver is not None:
+            self._state.receiver.stop()
+            if _os.environ.get(self.AGGREGATE_ENV) == self._state.receiver.address:
+                del _os.environ[self.AGGREGATE_ENV]
+            _receiver_address = None
+            self._state.receiver = None
+
+    def _after_fork_in_child(self):
+        global _receiver_address
+        if self._state.receiver is None:
+            return
+        _receiver_address = None
+        # the parent's sinks, threads and locks are not usable here: drop
+        # them without stopping (that would flush the parent's buffers again)
+        address = self._state.receiver.address
+        self._state.receiver = None
+        self._state.watcher = None
+        self._core.lock = threading.Lock()
+        self._core.handlers = {}
+        self._state.background.clear()
+        self._state.config_handlers = None
+        self._send_to(address)
+
+    def _send_to(self, address: str):
+        self._state.remote = RemoteSink(address)
+        self.add(self._state.remote, filter=self.level_filter, format='{message}', level=0)
+
+    def ring_buffer(self, size: int = 10000, level='TRACE', dump_level='ERROR',
+                    signum: int = None) -> RingBuffer:
+        """ Keep the last `size` records from `level` up that no handler
+            accepts, and write them with the handlers when a record at
+            `dump_level` or above is logged or, if given, `signum` (such as
+            `signal.SIGUSR1`) is received. The signal handler is only
+            installed when called from the main thread.
+
+            Captured calls are stored as a tuple of the message, its
+            arguments and the caller details, formatted only when dumped, so
+            running at SUCCESS with a TRACE ring buffer costs a tuple per call
+            instead of a record passed to the handlers. The arguments stay
+            referenced until their slot is reused or dumped. Replaces the
+            previous ring buffer. """
+        self.stop_ring_buffer()
+        ring = RingBuffer(self._core, size, self.level(level).no if isinstance(level, str) else level,
+                          self.level(dump_level).no if isinstance(dump_level, str) else dump_level, signum)
+        self._state.rings.append(ring)
+        self._state.gated.append(ring)
+        return ring
+
+    def stop_ring_buffer(self):
+        """ Stop capturing records; the buffered ones are dropped. """
+        for ring in self._state.rings:
+            ring.stop()
+            self._state.gated.remove(ring)
+        self._state.rings.clear()
+
+    def thread_buffers(self, interval: float = 0.01, lag: float = 0.005, buffer_size: int = 10000,
+                       wake_level='ERROR') -> ThreadBuffers:
+        """ Hand records to the handlers from a single flusher thread.
+
+            Each logging thread appends its records to its own buffer,
+            taking no lock shared with other threads, and the flusher
+            writes the records older than `lag` seconds every `interval`
+            seconds, merged in call order (see _merge.py). Records at
+            `wake_level` or above wake the flusher; a thread with
+            `buffer_size` records pending waits for it. `complete()`
+            writes everything pending. Replaces the previous buffers. """
+        self.stop_thread_buffers()
+        buffers = ThreadBuffers(self._core, interval, lag, buffer_size,
+                                self.level(wake_level).no if isinstance(wake_level, str) else wake_level)
+        self._state.thread_buffers.append(buffers)
+        return buffers
+
+    def stop_thread_buffers(self):
+        """ Write the pending records and log from the calling threads again. """
+        for buffers in self._state.thread_buffers:
+            buffers.stop()
+        self._state.thread_buffers.clear()
+
+    def enable_metrics(self) -> Metrics:
+        """ Count and time the work of the logging pipeline (see _metrics.py).
+
+            Counts records per level, calls and records dropped by the
+            level gate and `level_filter`, and for each handler the
+            messages and bytes (UTF-8) written and the write latency; file
+            rotations, queue and remote sink counters are added by
+            `metrics()`. Counters are kept per thread and merged when read.
+            The records are counted by the core's patcher, which this
+            chains to, including patchers later set with `configure()`. """
+        if not self._state.metrics:
+            metrics = Metrics(self._core)
+            metrics.start()
+            self._state.metrics.append(metrics)
+            self._state.gated.append(metrics)
+            self.level_filter._counters = metrics.counters
+        return self._state.metrics[0]
+
+    def disable_metrics(self):
+        """ Stop counting and stop the exporters; counts are dropped. """
+        for metrics in self._state.metrics:
+            metrics.stop()
+            self._state.gated.remove(metrics)
+        self._state.metrics.clear()
+        self.level_filter._counters = None
+
+    def metrics(self) -> Dict:
+        """ A snapshot of the counters of `enable_metrics()` ({} when off). """
+        if not self._state.metrics:
+            return {}
+        return self._state.metrics[0].snapshot()
+
+    def export_metrics(self, path: str = None, address=None, interval: float = 15.0) -> PrometheusExporter:
+        """ Export the metrics in the Prometheus text format: rewritten in
+            `path` every `interval` seconds, and/or served over HTTP on
+            `address` (a Unix socket path or a (host, port) tuple). Enables
+            metrics; `disable_metrics()` stops the exporters. """
+        if path is None and address is None:
+            raise ValueError("export_metrics() needs a 'path', an 'address' or both")
+        return self.enable_metrics().export(path, address, interval)
+
+    def _derive(self, other: _Logger):
+        """ Return a logger sharing the core and state of this one with the
+            options of `other`, so loggers from `opt()`, `bind()` and `patch()`
+            keep the early level gate. """
+        derived = object.__new__(type(self))
+        derived._core, derived._options, derived._state = self._core, other._options, self._state
+        return derived
+
+    def opt(self, **kwargs):
+        return self._derive(super().opt(**kwargs))
+
+    def bind(__self, **kwargs):
+        return __self._derive(super().bind(**kwargs))
+
+    def patch(self, patcher):
+        return self._derive(super().patch(patcher))
+
+    def configure(self, *, handlers=None, levels=None, extra=None, patcher=None, activation=None):
+        ids = super().configure(handlers=handlers, levels=levels, extra=extra, patcher=patcher,
+                                activation=activation)
+        if patcher is not None:
+            for metrics in self._state.metrics:
+                metrics.chain_patcher()
+        return ids
+
+    def _keep(self, level_name, levelno, message, args, kwargs, options=None):
+        # the frame of the caller of trace(), debug(), ...
+        options = options or self._options
+        frame = _sys._getframe(2 + options[1]) if self._state.rings else None
+        for hook in self._state.gated:
+            hook.capture(level_name, levelno, message, args, kwargs, options, frame)
+
+    def _dump_before(self, levelno):
+        for ring in self._state.rings:
+            if levelno >= ring.dump_levelno:
+                ring.dump()
+
+    def _log(self, level_id, static_level_no, from_decorator, options, message, args, kwargs):
+        """ loguru's `_log()`, building the record from shared parts (see _record.py).
+
+        This follows loguru 0.5.3's private `Logger._log()` line for line, which is why
+        pyproject.toml pins loguru to `~0.5.3` (checked by tests/test_record.py).
+        """
+        core = self._core
+
+        if not core.handlers:
+            return
+
+        (exception, depth, record, lazy, colors, raw, capture, patcher, extra) = options
+
+        frame = get_frame(depth + 2)
 
-    def propagate(self, value):
+        try:
+            name = frame.f_globals["__name__"]
+        except KeyError:
+            name = None
 
-        if self._propagate:
-            logger.configure(handlers=[{'sink': SocketHandler('localhost', 9999)}])
-            p_handler = {'sink': PropagateHandler(), filter = self.level_filter, format = '{message}'}
-            self.add(PropagateHandler(), format='{message}')
+        try:
+            if not core.enabled[name]:
+                return
+        except KeyError:
+            enabled = core.enabled
+            if name is None:
+                status = core.activation_none
+                enabled[name] = status
+                if not status:
+                    return
+            else:
+                dotted_name = name + "."
+                for dotted_module_name, status in core.activation_list:
+                    if dotted_name[: len(dotted_module_name)] == dotted_module_name:
+                        if status:
+                            break
+                        enabled[name] = False
+                        return
+                enabled[name] = True
+
+        current_datetime = _parts.now()
+
+        if level_id is None:
+            level_no = static_level_no
+            level = RecordLevel("Level %d" % level_no, level_no, " ")
+        else:
+            try:
+                level = _parts.level(core.levels[level_id])
+            except KeyError:
+                raise ValueError("Level '%s' does not exist" % level_id) from None
+            level_no = level.no
+
+        if level_no < core.min_level:
+            return
+
+        code = frame.f_code
+        file, module = _parts.file(code.co_filename)
+
+        if exception:
+            if isinstance(exception, BaseException):
+                type_, value, traceback = (type(exception), exception, exception.__traceback__)
+            elif isinstance(exception, tuple):
+                type_, value, traceback = exception
+            else:
+                type_, value, traceback = _sys.exc_info()
+            exception = RecordException(type_, value, traceback)
+        else:
+            exception = None
+
+        log_record = {
+            "elapsed": current_datetime - start_time,
+            "exception": exception,
+            "extra": {**core.extra, **context.get(), **extra},
+            "file": file,
+            "function": code.co_name,
+            "level": level,
+            "line": frame.f_lineno,
+            "message": str(message),
+            "module": module,
+            "name": name,
+            "process": _parts.process(),
+            "thread": _parts.thread(),
+            "time": current_datetime,
+        }
+
+        if lazy:
+            args = [arg() for arg in args]
+            kwargs = {key: value() for key, value in kwargs.items()}
+
+        if capture and kwargs:
+            log_record["extra"].update(kwargs)
+
+        if record:
+            if "record" in kwargs:
+                raise TypeError(
+                    "The message can't be formatted: 'record' shall not be used as a keyword "
+                    "argument while logger has been configured with '.opt(record=True)'"
+                )
+            kwargs.update(record=log_record)
+
+        if colors:
+            if args or kwargs:
+                colored_message = Colorizer.prepare_message(message, args, kwargs)
+            else:
+                colored_message = Colorizer.prepare_simple_message(str(message))
+            log_record["message"] = colored_message.stripped
+        elif args or kwargs:
+            colored_message = None
+            log_record["message"] = message.format(*args, **kwargs)
+        else:
+            colored_message = None
+
+        if core.patcher:
+            core.patcher(log_record)
+
+        if patcher:
+            patcher(log_record)
+
+        if self._state.thread_buffers:
+            self._state.thread_buffers[0].append(log_record, level_id, from_decorator, raw, colored_message)
+            return
+
+        coloring.message = colored_message  # for TemplateSink.handler_format()
+        for handler in core.handlers.values():
+            handler.emit(log_record, level_id, from_decorator, raw, colored_message)
+        coloring.message = None
+
+    # Each method returns before frame inspection, time capture or message
+    # formatting when no handler accepts the level (see _update_min_level),
+    # handing the call to the ring buffer and metrics if any (see _ring.py).
+
+    def trace(__self, __message, *args, **kwargs):
+        r"""Log ``message.format(*args, **kwargs)`` with severity ``'TRACE'``."""
+        if _TRACE_NO < __self._core.min_level:
+            if __self._state.gated:
+                __self._keep("TRACE", _TRACE_NO, __message, args, kwargs)
+            return
+        if __self._state.gated:
+            __self._dump_before(_TRACE_NO)
+        __self._log("TRACE", None, False, __self._options, __message, args, kwargs)
+
+    def debug(__self, __message, *args, **kwargs):
+        r"""Log ``message.format(*args, **kwargs)`` with severity ``'DEBUG'``."""
+        if _DEBUG_NO < __self._core.min_level:
+            if __self._state.gated:
+                __self._keep("DEBUG", _DEBUG_NO, __message, args, kwargs)
+            return
+        if __self._state.gated:
+            __self._dump_before(_DEBUG_NO)
+        __self._log("DEBUG", None, False, __self._options, __message, args, kwargs)
+
+    def info(__self, __message, *args, **kwargs):
+        r"""Log ``message.format(*args, **kwargs)`` with severity ``'INFO'``."""
+        if _INFO_NO < __self._core.min_level:
+            if __self._state.gated:
+                __self._keep("INFO", _INFO_NO, __message, args, kwargs)
+            return
+        if __self._state.gated:
+            __self._dump_before(_INFO_NO)
+        __self._log("INFO", None, False, __self._options, __message, args, kwargs)
+
+    def success(__self, __message, *args, **kwargs):
+        r"""Log ``message.format(*args, **kwargs)`` with severity ``'SUCCESS'``."""
+        if _SUCCESS_NO < __self._core.min_level:
+            if __self._state.gated:
+                __self._keep("SUCCESS", _SUCCESS_NO, __message, args, kwargs)
+            return
+        if __self._state.gated:
+            __self._dump_before(_SUCCESS_NO)
+        __self._log("SUCCESS", None, False, __self._options, __message, args, kwargs)
+
+    def warning(__self, __message, *args, **kwargs):
+        r"""Log ``message.format(*args, **kwargs)`` with severity ``'WARNING'``."""
+        if _WARNING_NO < __self._core.min_level:
+            if __self._state.gated:
+                __self._keep("WARNING", _WARNING_NO, __message, args, kwargs)
+            return
+        if __self._state.gated:
+            __self._dump_before(_WARNING_NO)
+        __self._log("WARNING", None, False, __self._options, __message, args, kwargs)
+
+    def error(__self, __message, *args, **kwargs):
+        r"""Log ``message.format(*args, **kwargs)`` with severity ``'ERROR'``."""
+        if _ERROR_NO < __self._core.min_level:
+            if __self._state.gated:
+                __self._keep("ERROR", _ERROR_NO, __message, args, kwargs)
+            return
+        if __self._state.gated:
+            __self._dump_before(_ERROR_NO)
+        __self._log("ERROR", None, False, __self._options, __message, args, kwargs)
+
+    def critical(__self, __message, *args, **kwargs):
+        r"""Log ``message.format(*args, **kwargs)`` with severity ``'CRITICAL'``."""
+        if _CRITICAL_NO < __self._core.min_level:
+            if __self._state.gated:
+                __self._keep("CRITICAL", _CRITICAL_NO, __message, args, kwargs)
+            return
+        if __self._state.gated:
+            __self._dump_before(_CRITICAL_NO)
+        __self._log("CRITICAL", None, False, __self._options, __message, args, kwargs)
+
+    def exception(__self, __message, *args, **kwargs):
+        r"""Convenience method for logging an ``'ERROR'`` with exception information."""
+        options = (True,) + __self._options[1:]
+        if _ERROR_NO < __self._core.min_level:
+            if __self._state.gated:
+                __self._keep("ERROR", _ERROR_NO, __message, args, kwargs, options)
+            return
+        if __self._state.gated:
+            __self._dump_before(_ERROR_NO)
+        __self._log("ERROR", None, False, options, __message, args, kwargs)
+
+    def log(__self, __level, __message, *args, **kwargs):
+        r"""Log ``message.format(*args, **kwargs)`` with severity ``level``."""
+        level_id, static_level_no = __self._dynamic_level(__level)
+        if level_id is None:
+            levelno = static_level_no
+        else:
+            level = __self._core.levels.get(level_id)
+            levelno = level.no if level else None  # unknown level: let _log() raise
+        if levelno is not None and levelno < __self._core.min_level:
+            if __self._state.gated:
+                __self._keep(level_id or "Level %d" % levelno, levelno, __message, args, kwargs)
+            return
+        if __self._state.gated and levelno is not None:
+            __self._dump_before(levelno)
+        __self._log(level_id, static_level_no, False, __self._options, __message, args, kwargs)
+
+    def propagate(self, address=('localhost', 9999), **options) -> int:
+        """ Send records to a `LogReceiver` at `address` (TCP or Unix socket)
+            in batches, with reconnects and a bounded spool while it is down
+            (see `RemoteSink`, which gets `options`). Returns the handler id. """
+        return self.add(RemoteSink(address, **options), filter=self.level_filter, format='{message}', level=0)
 
     def _set_default_handler(self):
         """ Remove default (first) handler if one is attached
@@ -318,68 +1293,149 @@ class AutoSysLogger(_Logger):
         except ValueError:
             pass
 
+        address = _os.environ.get(self.AGGREGATE_ENV)
+        if address and self.LOGGING and _receiver_address != address:
+            # child of an aggregating writer (see aggregate()): the writer owns the sinks
+            self._send_to(address)
+            return
+
         if self.LOGGING:
-            if not self.handlers:
+            if not self._state.handlers:
                 # default handler
-                self.add(stderr, filter=self.level_filter, level=self.level)
+                self.add(stderr, filter=self.level_filter, level=0)
             else:
-                for handler in self.handlers:
-                    self.add(handler, filter=self.level_filter, level=self.level)
+                for handler in self._state.handlers:
+                    if isinstance(handler, dict):
+                        self.add(**{'filter': self.level_filter, 'level': 0, **handler})
+                    else:
+                        self.add(handler, filter=self.level_filter, level=0)
 
-        if self.propagate:
-            s
+        if self._state.propagate:
+            self.add(PropagateHandler(), filter=self.level_filter, format='{message}', level=0)
 
         # for name,handler in self.handlers.items():
         #     self.add(handler)
 
-    def config(self, config=None):
-        # todo - all this ...
-        # check arguments first
-        # read environment next
-        #   LOGURU_CONFIG_FILENAME
-        # read pyproject.toml next
-        # read config file next
-        # use defaults last
-        if not config:
-            if self.debug:
-                # DEV MODE OPTIONS
-                new_handlers = self._DEFAULT_DEV_HANDLERS
-                pass
-            else:
-                # PRODUCTION MODE OPTIONS
-                new_handlers = self._DEFAULT_PROD_HANDLERS
-                pass
+    def config(self, config: LoguruConfig = None, **kwargs):
+        """ Apply a configuration: level and handlers for the current (dev
+            or production) mode.
 
-            self.config = {
-                'handlers': new_handlers,
-                'extra': {'user': self.username}
-            }
+            Without `config`, it is loaded from the environment,
+            `pyproject.toml` and `LOGURU_CONFIG_FILENAME` (see _config.py);
+            `kwargs` are passed to `load_config()`. When none of these has
+            handlers for the current mode, the defaults are used last
+            (`_DEFAULT_DEV_HANDLERS` or `_DEFAULT_PROD_HANDLERS`).
 
+            The first configuration with handlers replaces the current ones.
+            After that, only handlers that left the configuration are removed
+            and new ones added: unchanged sinks keep their open files and
+            buffers, so calling it again (see `watch()`) is cheap. """
+        try:
+            loaded = config is None
+            if loaded:
+                config = load_config(**kwargs)
+                if config is None:
+                    return  # called from the config script being loaded
+            options = config.handlers(self.__debug, resolve=False)
+            handlers = config.handlers(self.__debug)
+            if options is None and loaded:
+                options = self._DEFAULT_DEV_HANDLERS if self.__debug else self._DEFAULT_PROD_HANDLERS
+                handlers = resolve_handlers(options)
+        except Exception as e:
+            raise AutoSysLoggerError(e) from e
+
+        self._state.config = config
+        self._state.level = ''
+        _ = self.__level
+        if self._state.remote is not None:
+            options = handlers = None  # the writer process owns the sinks
+        elif not self.LOGGING and options is not None:
+            options = handlers = []
         try:
-            self.configure(**config)
+            if self.LOGGING:
+                self.level_filter.level = self._state.level
+            if options is None:
+                return
+            if self._state.config_handlers is None:
+                self.remove()
+                self._state.config_handlers = {}
+                if self._state.propagate:
+                    self.add(PropagateHandler(), filter=self.level_filter, format='{message}', level=0)
+            self._apply_handlers(options, handlers)
         except Exception as e:
-            raise LoggerError(e)
+            raise AutoSysLoggerError(e) from e
 
+    def _apply_handlers(self, options: List[Dict], handlers: List[Dict]):
+        """ Diff the handlers added by `config()` against `handlers`.
 
-__all__ = ['logger']
+            `options` are the unresolved handler options, used as keys. """
+        current = self._state.config_handlers
+        wanted: Dict = {}
+        for option, handler in zip(options, handlers):
+            key = repr(sorted(option.items(), key=lambda item: item[0]))
+            key = (key, sum(1 for other in wanted if other[0] == key))  # keep duplicates
+            wanted[key] = handler
+        for key in [key for key in current if key not in wanted]:
+            self.remove(current[key])
+        for key, handler in wanted.items():
+            if key not in current:
+                current[key] = self.add(**{'filter': self.level_filter, 'level': 0, **handler})
 
+    def watch(self, interval: float = 1.0, signum: int = getattr(signal, 'SIGHUP', None), **kwargs):
+        """ Reload the configuration when its files change or on `signum`.
 
-# TODO - pass in list of handlers instead of just one flag
+            The files are polled every `interval` seconds (None: only on
+            the signal); the signal handler can only be installed from the
+            main thread, pass `signum=None` elsewhere. Reloads go through
+            `config()`, so only changed handlers are touched. A failed reload
+            is reported on stderr and leaves the current configuration. """
+        self.unwatch()
+        if self._state.config is None:
+            self.config(**kwargs)
+        self._state.watcher = ConfigWatcher(lambda: self._state.config.sources,
+                                            functools.partial(self.config, **kwargs), interval, signum)
+        return self._state.watcher
 
-def _get_current_logger():
-    """ Returns the current logger instance if one is running,
-        else a new instance. """
-    try:
-        logger = logger or AutoSysLogger(debug=_debug_)
-    except NameError:
-        logger: AutoSysLogger = AutoSysLogger(debug=_debug_)
-    return logger
+    def unwatch(self):
+        if self._state.watcher is not None:
+            self._state.watcher.stop()
+            self._state.watcher = None
 
 
-logger: AutoSysLogger = _get_current_logger()
+__all__ = ['logger', 'DedupFilter', 'FilterChain', 'RateLimitFilter', 'SamplingFilter']
 
-logger.info(f"Logging is on. Severity level set to '{logger.level}'")
-logger.info(f'Current user is {logger.username}')
+
+class _LazyAutoSysLogger(AutoSysLogger):
+    """ The module `logger` before its first use.
+
+        Importing autosysloguru configures nothing. The first access to an
+        attribute the logger does not have yet (any logging call, `add()`,
+        ...) turns this object into a configured `AutoSysLogger` in place,
+        so references taken at import time stay valid and later calls cost
+        nothing extra. """
+
+    def __init__(self):
+        pass  # configured on first use
+
+    def __getattr__(self, name):
+        with _lazy_lock:
+            if type(self) is _LazyAutoSysLogger:
+                # other threads wait on the lock (every attribute is missing
+                # until the state is copied), so they never see it half built
+                configured = AutoSysLogger(debug=_debug_)
+                configured.level_filter._logger = self
+                self.__dict__.update(configured.__dict__)
+                self.__class__ = AutoSysLogger
+                self.info(f"Logging is on. Severity level set to '{self._state.level}'")
+        return getattr(self, name)
+
+    def __repr__(self):
+        return '<autosysloguru.logger (not configured yet)>'
+
+
+_lazy_lock = threading.Lock()
+
+logger: AutoSysLogger = _LazyAutoSysLogger()
 
 
 # this was the original default handler
@@ -387,4 +1443,17 @@ logger.info(f'Current user is {logger.username}')
 #     logger.add(_sys.stderr)
 
 
-_atexit.register(logger.remove)
+def _shutdown():
+    """ Log the timing summaries left, then remove the handlers if the logger was used. """
+    if any(stats.pending for stats in list(_timing.registry)):
+        _report_timings()  # configures the module logger if only logger_wraps() used it
+    if type(logger) is not _LazyAutoSysLogger:
+        logger.unwatch()
+        logger.stop_aggregating()
+        logger.stop_ring_buffer()
+        logger.stop_thread_buffers()
+        logger.disable_metrics()
+        logger.remove()
+
+
+_atexit.register(_shutdown)
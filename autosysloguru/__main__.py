@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+""" The `autosysloguru` command: read binary logs written with `add(path, binary=True)`.
+
+        autosysloguru tail output.bin [-n 20] [-f] [--level WARNING] [--json]
+        autosysloguru filter output.bin [--level ERROR] [--since 2020-08-01T10:00] [--until ...] [--json]
+        autosysloguru convert output.bin [-o output.json] [--fields time,level,message]
+
+    `--since` and `--until` take an ISO 8601 time (local time unless it has
+    an offset) or seconds since the epoch.
+    """
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from ._binary import (FILE_HEADER, _blocks, _check_header, _read_block, block_offsets, data_end,
+                      read_records)
+from ._serializer import DEFAULT_FIELDS, FIELDS, get_encoder
+
+
+def _level(value: str) -> int:
+    if value.isdigit():
+        return int(value)
+    from loguru import logger
+    try:
+        return logger.level(value.upper()).no
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'unknown level {value!r}')
+
+
+# what datetime.fromisoformat() reads (Python 3.7+), plus a 'Z' offset
+_ISO_TIME = re.compile(r'(\d{4})-(\d\d)-(\d\d)(?:[T ](\d\d)(?::(\d\d)(?::(\d\d)(?:\.(\d{1,6}))?)?)?'
+                       r'(?:(Z)|([+-])(\d\d):?(\d\d))?)?$')
+
+
+def _time(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    match = _ISO_TIME.match(value.strip())
+    try:
+        if match is None:
+            raise ValueError(value)
+        year, month, day, hour, minute, second, fraction, utc, sign, offset_hours, offset_minutes = match.groups()
+        tzinfo = None
+        if utc:
+            tzinfo = timezone.utc
+        elif sign:
+            offset = timedelta(hours=int(offset_hours), minutes=int(offset_minutes))
+            tzinfo = timezone(-offset if sign == '-' else offset)
+        return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                        int((fraction or '0').ljust(6, '0')), tzinfo).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected an ISO 8601 time or epoch seconds, got {value!r}')
+
+
+def format_text(record: Dict) -> str:
+    text = (f"{record['time']} | {record['level']: <8} | "
+            f"{record['name']}:{record['function']}:{record['line']} - {record['message']}\n")
+    if record['exception']:
+        text += record['exception']
+    return text
+
+
+def _printer(args):
+    if getattr(args, 'json', False):
+        encode = get_encoder()
+        fields = args.fields
+        return lambda record: encode({field: record[field] for field in fields})
+    return format_text
+
+
+def _write(records: Iterable[Dict], render, out) -> None:
+    for record in records:
+        out.write(render(record))
+
+
+def last_records(path, count: int, level: int = 0) -> List[Dict]:
+    """ The last `count` records from `level` up, reading blocks backwards from the end. """
+    offsets = [offset for offset, _ in block_offsets(path)]
+    records: List[Dict] = []
+    end: Optional[int] = None
+    for offset in reversed(offsets):
+        records[:0] = read_records(path, level=level, start=offset, end=end)
+        if len(records) >= count:
+            break
+        end = offset
+    return records[-count:] if count else []
+
+
+def follow(path, level: int, render, out, interval: float = 0.5) -> None:
+    """ Write the blocks appended to `path` from now on, starting over
+        when the file is replaced by a rotation. """
+    position = None
+    inode = None
+    while True:
+        try:
+            with open(path, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                if position is None:
+                    position = data_end(path)
+                elif stat.st_ino != inode or stat.st_size < position:
+                    position = len(FILE_HEADER)
+                inode = stat.st_ino
+                if _check_header(file):
+                    for header, offset in _blocks(file, max(position, len(FILE_HEADER))):
+                        _write((record for record in _read_block(file, header, offset)
+                                if record['levelno'] >= level), render, out)
+                        position = offset + header[1]
+                    out.flush()
+        except FileNotFoundError:
+            position = len(FILE_HEADER)  # rotated away, its successor is not created yet
+        time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='autosysloguru', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    def command(name, help):
+        sub = commands.add_parser(name, help=help)
+        sub.add_argument('file')
+        sub.add_argument('--level', type=_level, default=0, help='minimum level, name or number')
+        return sub
+
+    def output_options(sub, json_flag=True):
+        if json_flag:
+            sub.add_argument('--json', action='store_true', help='write JSON lines')
+        sub.add_argument('--fields', type=lambda value: value.split(','), default=list(DEFAULT_FIELDS),
+                         help=f"JSON fields, comma separated (of {', '.join(FIELDS)})")
+
+    tail = command('tail', 'print the last records')
+    tail.add_argument('-n', '--lines', type=int, default=10, help='records to print (10)')
+    tail.add_argument('-f', '--follow', action='store_true', help='print records as they are written')
+    output_options(tail)
+
+    filter_ = command('filter', 'print the records of a level and time range')
+    filter_.add_argument('--since', type=_time)
+    filter_.add_argument('--until', type=_time)
+    output_options(filter_)
+
+    convert = command('convert', 'convert to JSON lines')
+    convert.add_argument('-o', '--output', help='output file (default: standard output)')
+    convert.add_argument('--since', type=_time)
+    convert.add_argument('--until', type=_time)
+    output_options(convert, json_flag=False)
+    convert.set_defaults(json=True)
+
+    args = parser.parse_args(argv)
+    unknown = [field for field in args.fields if field not in FIELDS or field == 'elapsed']
+    if unknown:
+        parser.error(f'unknown fields {unknown}')
+    render = _printer(args)
+
+    out = sys.stdout
+    try:
+        if args.command == 'tail':
+            _write(last_records(args.file, args.lines, args.level), render, out)
+            if args.follow:
+                out.flush()
+                follow(args.file, args.level, render, out)
+        else:
+            records = read_records(args.file, args.since, args.until, args.level)
+            if args.command == 'convert' and args.output:
+                with open(args.output, 'w', encoding='utf8') as out:
+                    _write(records, render, out)
+            else:
+                _write(records, render, out)
+    except (ValueError, OSError) as error:
+        if isinstance(error, BrokenPipeError):
+            # the reader went away (`| head`), don't fail flushing stdout at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 0
+        print(f'autosysloguru: {error}', file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
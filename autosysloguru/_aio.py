@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+""" asyncio integration: `await logger.complete()` on an event loop, and
+    the loop check of nonblocking handlers added with `asyncio=True`.
+
+    asyncio is not imported here: when the application has not imported
+    it, no event loop can be running.
+    """
+import sys
+from typing import Callable
+
+
+def running_loop():
+    """ The event loop running in the calling thread, if any. """
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is None:
+        return None
+    get_running_loop = getattr(asyncio, 'get_running_loop', None)
+    if get_running_loop is None:  # Python 3.6
+        return asyncio._get_running_loop()
+    try:
+        return get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class Completion:
+    """ What `complete()` returns on the event loop `loop`.
+
+        `complete` (the blocking part: draining queues and buffers, which
+        may wait on a slow disk) starts at once in the loop's default
+        executor, so it runs even if this object is never awaited. Awaiting
+        it waits for that, then awaits the awaitable `complete` returns
+        (loguru's, which waits for the tasks of coroutine sinks) on the
+        loop. """
+
+    def __init__(self, complete: Callable, loop):
+        self._future = loop.run_in_executor(None, complete)
+
+    def __await__(self):
+        completer = yield from self._future.__await__()
+        yield from completer.__await__()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+""" Non-blocking sink: callers queue formatted messages and a dedicated
+    writer thread drains them into the real sink.
+
+    The queue is a bounded `collections.deque` (append/popleft are atomic),
+    so producers take no lock unless the `block` overflow policy makes them
+    wait for space. Overflow policies:
+
+    - `block`: wait for the writer to make room.
+    - `drop_oldest`: evict the oldest queued message.
+    - `drop_newest`: discard the incoming message.
+    - `sample`: once the queue is half full, only every `sample_every`-th
+      message is queued; when full, discard the incoming message.
+
+    With `loop_safe`, a thread running an asyncio event loop never waits:
+    `block` discards the incoming message there.
+    """
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+from ._aio import running_loop
+from ._common import report_error, target_methods
+
+
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest', 'sample')
+
+
+class BackgroundSink:
+    """ Stream-like wrapper loguru can `add()`; `target` is a stream, a
+        loguru file sink or a callable taking the formatted message. """
+
+    def __init__(self, target, queue_size: int = 10000, overflow: str = 'drop_newest',
+                 sample_every: int = 10, name: str = None, loop_safe: bool = False):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy '{overflow}', expected one of {OVERFLOW_POLICIES}")
+        if queue_size < 1:
+            raise ValueError(f'Invalid queue size {queue_size}, it should be a positive integer')
+        self.name = name or getattr(target, 'name', None) or repr(target)
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.sample_every = sample_every
+        self.loop_safe = loop_safe
+
+        self.queued: int = 0
+        self.dropped: int = 0
+        self.written: int = 0
+        self.errors: int = 0
+
+        self._target = target
+        self._write, self._flush = target_methods(target)
+
+        self._queue: deque = deque(maxlen=queue_size if overflow == 'drop_oldest' else None)
+        self._sampled: int = 0
+        self._idle: bool = False
+        self._busy: bool = False
+        self._stopping: bool = False
+        self._wakeup = threading.Event()
+        self._space = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f'autosysloguru-writer-{self.name}')
+        self._thread.start()
+
+    def isatty(self) -> bool:
+        isatty = getattr(self._target, 'isatty', None)
+        return bool(callable(isatty) and isatty())
+
+    @property
+    def depth(self) -> int:
+        """ Number of messages waiting to be written. """
+        return len(self._queue)
+
+    def stats(self) -> Dict:
+        return {'queued': self.queued, 'dropped': self.dropped, 'written': self.written,
+                'errors': self.errors, 'depth': len(self._queue)}
+
+    def write(self, message):
+        queue = self._queue
+        if len(queue) >= self.queue_size:
+            overflow = self.overflow
+            if overflow == 'drop_oldest':
+                self.dropped += 1  # the deque's maxlen evicts the oldest message
+            elif overflow == 'block' and not (self.loop_safe and running_loop() is not None):
+                while len(queue) >= self.queue_size and self._thread.is_alive():
+                    self._space.clear()
+                    self._wakeup.set()
+                    self._space.wait(0.05)
+            else:
+                self.dropped += 1
+                return
+        elif self.overflow == 'sample' and len(queue) >= self.queue_size // 2:
+            self._sampled += 1
+            if self._sampled % self.sample_every:
+                self.dropped += 1
+                return
+        queue.append(message)
+        self.queued += 1
+        if self._idle:
+            self._wakeup.set()
+
+    def drain(self, timeout: float = None) -> bool:
+        """ Wait until every queued message has been written. """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue or self._busy:
+            if not self._thread.is_alive():
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self._wakeup.set()
+            time.sleep(0.001)
+        return True
+
+    def stop(self):
+        """ Write what is left, stop the writer thread and the target (called by `logger.remove()`). """
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        stop = getattr(self._target, 'stop', None)
+        if callable(stop):
+            stop()
+
+    def _run(self):
+        queue = self._queue
+        write = self._write
+        while True:
+            self._busy = True
+            while queue:
+                try:
+                    message = queue.popleft()
+                except IndexError:
+                    break
+                try:
+                    write(message)
+                    self.written += 1
+                except Exception:
+                    self.errors += 1
+                    self._report_error(message)
+            if self._flush is not None:
+                try:
+                    self._flush()
+                except Exception:
+                    self.errors += 1
+                    self._report_error(None)
+            self._busy = False
+            self._space.set()
+            if self._stopping and not queue:
+                return
+            self._idle = True
+            if not queue:
+                self._wakeup.wait(0.1)
+            self._wakeup.clear()
+            self._idle = False
+
+    def _report_error(self, message):
+        report_error(f'background writer ({self.name})',
+                     None if message is None else f'Record was: {getattr(message, "record", message)!r}')
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+""" Binary log files: `add('output.bin', binary=True)` and the `autosysloguru` command.
+
+    A file is an 8-byte header followed by blocks. A block holds the
+    records buffered since the previous one (see `BufferedFileSink`: every
+    `buffer_size` bytes, `flush_interval` seconds and at `flush_level`),
+    behind a fixed header with the payload length, the number of records,
+    their time range and level range:
+
+        header   b'ASLK', length, count, min/max time (us), min/max levelno, flags
+        payload  (zlib compressed when flags & 1)
+                 string table: count, then (length, utf-8) per string
+                 records: (length, fields) per record
+
+    Level, logger name, function, file path, thread and process names are
+    strings of the block's table, referenced by index, so each appears once
+    per block; records hold fixed-size fields, the message, `extra` as
+    JSON and the rendered exception.
+
+    Readers go from header to header, seeking over the blocks outside the
+    requested time or level range without reading them. A block cut short
+    by a crash is ignored, and removed when the file is opened again for
+    writing.
+    """
+import json
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ._file_sinks import BufferedFileSink
+from ._serializer import format_exception, get_encoder
+
+
+FILE_HEADER = b'ASLB\x01\x00\x00\x00'
+BLOCK_MAGIC = b'ASLK'
+COMPRESSED = 1
+
+# magic, payload length, records, min time, max time, min levelno, max levelno, flags
+_BLOCK = struct.Struct('<4sIIqqIIB3x')
+# time (us), utc offset (s), levelno, level, name, function, path, line,
+# thread id, thread name, process id, process name
+_RECORD = struct.Struct('<qiIHHHHIQHIH')
+_LENGTH = struct.Struct('<I')
+_COUNT = struct.Struct('<H')
+
+_NONE = 0xFFFF  # string index of None
+MAX_STRINGS = 0xFFFF - 8  # a record adds up to 6 strings
+
+
+class _Block:
+    """ Records being encoded, with their string table. """
+
+    __slots__ = ('strings', 'table', 'records', 'size', 'min_time', 'max_time', 'min_level', 'max_level')
+
+    def __init__(self):
+        self.strings: Dict = {}
+        self.table: List[bytes] = []
+        self.records: List[bytes] = []
+        self.size: int = 0
+        self.min_time = self.max_time = self.min_level = self.max_level = None
+
+    def intern(self, value) -> int:
+        if value is None:
+            return _NONE
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.table)
+            data = value.encode('utf8', 'surrogatepass')
+            self.table.append(data)
+            self.size += 4 + len(data)
+        return index
+
+    def add(self, record, encode_json):
+        time = record['time']
+        microseconds = round(time.timestamp() * 1e6)
+        level = record['level']
+        file = record['file']
+        thread = record['thread']
+        process = record['process']
+        intern = self.intern
+        fields = _RECORD.pack(
+            microseconds, int(time.utcoffset().total_seconds()), level.no, intern(level.name),
+            intern(record['name']), intern(record['function']), intern(file.path), record['line'],
+            thread.id, intern(thread.name), process.id, intern(process.name))
+        message = record['message'].encode('utf8', 'surrogatepass')
+        extra = record['extra']
+        extra = encode_json(extra)[:-1].encode('utf8', 'surrogatepass') if extra else b''
+        exception = record['exception']
+        exception = b'' if exception is None else format_exception(exception).encode('utf8', 'surrogatepass')
+        data = b''.join((fields, _LENGTH.pack(len(message)), message, _LENGTH.pack(len(extra)), extra,
+                         _LENGTH.pack(len(exception)), exception))
+        self.records.append(_LENGTH.pack(len(data)) + data)
+        self.size += 4 + len(data)
+        if self.min_time is None:
+            self.min_time = self.max_time = microseconds
+            self.min_level = self.max_level = level.no
+        else:
+            self.min_time = min(self.min_time, microseconds)
+            self.max_time = max(self.max_time, microseconds)
+            self.min_level = min(self.min_level, level.no)
+            self.max_level = max(self.max_level, level.no)
+
+    def encode(self, compress: bool) -> bytes:
+        payload = b''.join([_COUNT.pack(len(self.table))]
+                           + [_LENGTH.pack(len(data)) + data for data in self.table] + self.records)
+        flags = 0
+        if compress:
+            payload = zlib.compress(payload, 1)
+            flags |= COMPRESSED
+        return _BLOCK.pack(BLOCK_MAGIC, len(payload), len(self.records), self.min_time, self.max_time,
+                           self.min_level, self.max_level, flags) + payload
+
+
+class BinaryFileSink(BufferedFileSink):
+    """ Write records as blocks of the binary format (see the module docstring).
+
+        Takes the options of `BufferedFileSink`, `buffer_size` being the
+        size of a block before compression. Size-based `rotation` is
+        checked against the written file and the pending block, so a file
+        may exceed the limit by one record. """
+
+    def __init__(self, path, *, compress: bool = True, **kwargs):
+        self.compress = compress
+        self._block = _Block()
+        self._encode_json = get_encoder()
+        super().__init__(path, encoding='utf8', **kwargs)
+
+    def write(self, message):
+        record = message.record
+        with self._lock:
+            if self._file is None:
+                self._initialize_file()
+
+            if self._size_limit is not None:
+                if self._size and self._size + self._block.size >= self._size_limit:
+                    self._terminate_file(is_rotating=True)
+            elif self._rotation_function is not None:
+                if self._rotation_reads_file:
+                    self._write_pending()
+                if self._rotation_function(message, self._file):
+                    self._terminate_file(is_rotating=True)
+
+            block = self._block
+            block.add(record, self._encode_json)
+            if block.size >= self.buffer_size or record['level'].no >= self.flush_level \
+                    or len(block.table) >= MAX_STRINGS:
+                self._write_pending()
+
+    def _write_pending(self):
+        block = self._block
+        if not block.records or self._file is None:
+            return
+        self._block = _Block()
+        data = block.encode(self.compress)
+        if not self._size:
+            data = FILE_HEADER + data
+        self._file.write(data)
+        self._size += len(data)
+
+    def _initialize_file(self):
+        super()._initialize_file()
+        if self._size:
+            # cut a block left incomplete by a crash, so the next ones can be found
+            try:
+                end = data_end(self._file_path)
+            except ValueError:
+                self._file.close()
+                self._file = None
+                raise
+            if end < self._size:
+                os.ftruncate(self._file.fileno(), end)
+                self._size = end
+
+
+def _blocks(file, start: int = len(FILE_HEADER), end: Optional[int] = None) -> Iterator[Tuple]:
+    """ (header fields, payload offset) of the complete blocks of an open
+        file, from the block at `start` to the one before `end`. """
+    size = os.fstat(file.fileno()).st_size
+    if end is not None:
+        size = min(size, end)
+    position = start
+    while position + _BLOCK.size <= size:
+        file.seek(position)
+        header = _BLOCK.unpack(file.read(_BLOCK.size))
+        if header[0] != BLOCK_MAGIC:
+            raise ValueError(f'{file.name}: no block at offset {position}, the file is damaged')
+        block_end = position + _BLOCK.size + header[1]
+        if block_end > size:
+            return  # being written, or cut by a crash
+        yield header, position + _BLOCK.size
+        position = block_end
+
+
+def _read_block(file, header, offset: int) -> List[Dict]:
+    file.seek(offset)
+    try:
+        return _decode_block(file.read(header[1]), header[7])
+    except (zlib.error, struct.error, IndexError, ValueError) as error:
+        raise ValueError(f'{file.name}: block at offset {offset - _BLOCK.size} cannot be decoded ({error}), '
+                         'the file is damaged') from error
+
+
+def _check_header(file):
+    header = file.read(len(FILE_HEADER))
+    if header and header != FILE_HEADER:
+        raise ValueError(f'{file.name} is not an autosysloguru binary log')
+    return bool(header)
+
+
+def data_end(path) -> int:
+    """ Length of the file up to the end of its last complete block. """
+    with open(path, 'rb') as file:
+        if not _check_header(file):
+            return 0
+        end = len(FILE_HEADER)
+        for header, offset in _blocks(file):
+            end = offset + header[1]
+        return end
+
+
+@lru_cache(maxsize=64)
+def _timezone(offset: int) -> timezone:
+    return timezone(timedelta(seconds=offset))
+
+
+def _decode_block(payload: bytes, flags: int) -> List[Dict]:
+    """ The records of a block as dicts with the fields of _serializer.FIELDS
+        (but `elapsed`, which is not stored). """
+    if flags & COMPRESSED:
+        payload = zlib.decompress(payload)
+    count, = _COUNT.unpack_from(payload, 0)
+    position = _COUNT.size
+    table = []
+    for _ in range(count):
+        length, = _LENGTH.unpack_from(payload, position)
+        position += 4
+        table.append(payload[position:position + length].decode('utf8', 'surrogatepass'))
+        position += length
+
+    def string(index):
+        return None if index == _NONE else table[index]
+
+    records = []
+    while position < len(payload):
+        length, = _LENGTH.unpack_from(payload, position)
+        end = position + 4 + length
+        (microseconds, offset, levelno, level, name, function, path, line, thread_id, thread_name,
+         process_id, process_name) = _RECORD.unpack_from(payload, position + 4)
+        position += 4 + _RECORD.size
+        texts = []
+        for _ in range(3):
+            size, = _LENGTH.unpack_from(payload, position)
+            position += 4
+            texts.append(payload[position:position + size].decode('utf8', 'surrogatepass'))
+            position += size
+        message, extra, exception = texts
+        time = datetime.fromtimestamp(microseconds / 1e6, _timezone(offset))
+        path = string(path)
+        file_name = None if path is None else os.path.basename(path)
+        records.append({
+            'time': time.isoformat(),
+            'timestamp': microseconds / 1e6,
+            'level': string(level),
+            'levelno': levelno,
+            'message': message,
+            'name': string(name),
+            'module': None if file_name is None else os.path.splitext(file_name)[0],
+            'function': string(function),
+            'line': line,
+            'file': file_name,
+            'path': path,
+            'process': process_id,
+            'process_name': string(process_name),
+            'thread': thread_id,
+            'thread_name': string(thread_name),
+            'extra': json.loads(extra) if extra else {},
+            'exception': exception or None,
+        })
+        position = end
+    return records
+
+
+def read_records(path, since: Optional[float] = None, until: Optional[float] = None, level: int = 0,
+                 start: int = len(FILE_HEADER), end: Optional[int] = None) -> Iterator[Dict]:
+    """ Records of a binary log from `level` up, logged between the
+        timestamps `since` and `until` (inclusive), reading only the blocks
+        that may hold some. `start` and `end` limit the search to the
+        blocks between these offsets (see `block_offsets()`). """
+    since_us = None if since is None else since * 1e6
+    until_us = None if until is None else until * 1e6
+    with open(path, 'rb') as file:
+        if not _check_header(file):
+            return
+        for header, offset in _blocks(file, start, end):
+            _, _, _, min_time, max_time, _, max_level, _ = header
+            if max_level < level or (since_us is not None and max_time < since_us) \
+                    or (until_us is not None and min_time > until_us):
+                continue
+            for record in _read_block(file, header, offset):
+                if record['levelno'] < level:
+                    continue
+                microseconds = record['timestamp'] * 1e6
+                if (since_us is not None and microseconds < since_us) \
+                        or (until_us is not None and microseconds > until_us):
+                    continue
+                yield record
+
+
+def block_offsets(path) -> List[Tuple[int, int]]:
+    """ (block offset, records) of each complete block, read from the headers. """
+    with open(path, 'rb') as file:
+        if not _check_header(file):
+            return []
+        return [(offset - _BLOCK.size, header[2]) for header, offset in _blocks(file)]
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+""" Helpers shared by the autosysloguru sinks and their threads. """
+import sys
+import traceback
+from typing import Callable, Optional, Tuple
+
+
+def report_error(origin: str, detail: str = None):
+    """ Write the current exception to stderr like loguru's error interceptor,
+        which cannot see errors raised in autosysloguru's own threads.
+
+        `origin` names what failed ("ring buffer", ...); `detail` is an optional
+        line written before the traceback. """
+    if sys.stderr is None:
+        return
+    try:
+        sys.stderr.write(f'--- Logging error in autosysloguru {origin} ---\n')
+        if detail is not None:
+            sys.stderr.write(detail + '\n')
+        traceback.print_exc(file=sys.stderr)
+        sys.stderr.write('--- End of logging error ---\n')
+    except OSError:
+        pass
+
+
+def target_methods(target) -> Tuple[Callable, Optional[Callable]]:
+    """ The `write` of a sink target (a stream, a loguru file sink or a
+        callable, which is its own `write`) and its `flush`, if any. """
+    write = getattr(target, 'write', None)
+    flush = getattr(target, 'flush', None)
+    return (write if callable(write) else target), (flush if callable(flush) else None)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+""" Configuration loading for `AutoSysLogger.config()`.
+
+    Sources, lowest priority first:
+
+    - the `[autosysloguru]` section of the nearest `pyproject.toml`
+      (current directory, then its parents)
+    - the Python script named by `LOGURU_CONFIG_FILENAME`
+    - `LOGURU_LEVEL` (overrides the configured levels) and
+      `LOGURU_DEFAULT_LEVEL` (used when no level is configured)
+
+    The file sources are compiled into plain data (string sinks such as
+    `"sys.stdout"` kept as names, `"True"`/`"False"` options made booleans)
+    and cached on disk, keyed by each file's mtime and size, with a content
+    hash as fallback. A valid cache entry is used without parsing TOML or
+    running the config script. The cache directory is `AUTOSYSLOGURU_CACHE_DIR`,
+    else `$XDG_CACHE_HOME/autosysloguru` (`~/.cache/autosysloguru`); an empty
+    `AUTOSYSLOGURU_CACHE_DIR` disables the cache.
+
+    Only the listed files are tracked: modules imported by a config script
+    are not.
+    """
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Sequence
+
+
+KEYS = ('dev_level', 'prod_level', 'dev_handlers', 'prod_handlers')
+
+# sink names resolved to the current stream when the handlers are built
+STREAMS = {'sys.stdout': 'stdout', 'stdout': 'stdout', 'sys.stderr': 'stderr', 'stderr': 'stderr'}
+
+# handler options taking a bool, also accepted as "True"/"False" strings
+BOOL_OPTIONS = frozenset(('colorize', 'serialize', 'backtrace', 'diagnose', 'enqueue', 'catch',
+                          'delay', 'json', 'per_run', 'buffered', 'nonblocking', 'compiled',
+                          'mapped', 'asyncio', 'binary'))
+
+_CACHE_VERSION = 5
+_SECTION = b'[autosysloguru]'
+_loading: List = []
+
+
+class LoguruConfig:
+    """ Configuration data for AutoSysLoguru
+
+        `sources` lists the files the configuration was read from. """
+
+    def __init__(self, dev_level: str, prod_level: str, dev_handlers: List, prod_handlers: List,
+                 sources: Sequence[str] = ()):
+        self.dev_level = dev_level
+        self.prod_level = prod_level
+        self.dev_handlers = dev_handlers
+        self.prod_handlers = prod_handlers
+        self.sources = list(sources)
+        super().__init__()
+
+    def level(self, debug: bool) -> Optional[str]:
+        return self.dev_level if debug else self.prod_level
+
+    def handlers(self, debug: bool, resolve: bool = True) -> Optional[List[Dict]]:
+        """ Handler options for `logger.add(**options)`, with stream names resolved. """
+        handlers = self.dev_handlers if debug else self.prod_handlers
+        if handlers is None or not resolve:
+            return handlers
+        return resolve_handlers(handlers)
+
+    def __repr__(self):
+        return 'LoguruConfig({})'.format(', '.join(f'{key}={getattr(self, key)!r}' for key in KEYS))
+
+
+def resolve_handlers(handlers: List[Dict]) -> List[Dict]:
+    """ Copies of `handlers` with stream names ("sys.stdout") replaced by the stream. """
+    return [dict(handler, sink=_resolve_sink(handler['sink'])) for handler in handlers]
+
+
+def _resolve_sink(sink):
+    if isinstance(sink, str) and sink in STREAMS:
+        return getattr(sys, STREAMS[sink])
+    return sink
+
+
+def _normalize_sink(sink):
+    for name in ('stdout', 'stderr'):
+        if sink is getattr(sys, name) or sink is getattr(sys, f'__{name}__'):
+            return f'sys.{name}'
+    return sink
+
+
+def _normalize_handler(handler, source: str) -> Dict:
+    if not isinstance(handler, dict) or 'sink' not in handler:
+        raise ValueError(f"Invalid handler {handler!r} in '{source}', expected a table with a 'sink'")
+    normalized = {}
+    for key, value in handler.items():
+        if key == 'sink':
+            value = _normalize_sink(value)
+        elif key in BOOL_OPTIONS and isinstance(value, str):
+            if value.strip().lower() not in ('true', 'false'):
+                raise ValueError(f"Invalid value {value!r} for '{key}' in '{source}', expected True or False")
+            value = value.strip().lower() == 'true'
+        normalized[key] = value
+    return normalized
+
+
+def _normalize(data: Dict, source: str) -> Dict:
+    compiled = {}
+    for key in KEYS:
+        if key not in data:
+            continue
+        value = data[key]
+        if key.endswith('_handlers'):
+            if not isinstance(value, (list, tuple)):
+                raise ValueError(f"Invalid '{key}' in '{source}', expected a list of handlers")
+            value = [_normalize_handler(handler, source) for handler in value]
+        elif not isinstance(value, (str, int)):
+            raise ValueError(f"Invalid '{key}' in '{source}', expected a level name or number")
+        compiled[key] = value
+    return compiled
+
+
+def _load_toml(text: str) -> Dict:
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            try:
+                import toml
+            except ImportError:
+                raise ImportError('Reading pyproject.toml needs Python 3.11+, tomli or toml') from None
+            return toml.loads(text)
+    return tomllib.loads(text)
+
+
+def _compile_pyproject(path: str, data: bytes) -> Dict:
+    if _SECTION not in data:
+        return {}  # nothing for us: skip the TOML parser entirely
+    return _normalize(_load_toml(data.decode()).get('autosysloguru', {}), path)
+
+
+def _compile_script(path: str, data: bytes) -> Dict:
+    namespace = {'__file__': path, '__name__': '__autosysloguru_config__'}
+    exec(compile(data, path, 'exec'), namespace)
+    return _normalize(namespace, path)
+
+
+def find_pyproject(start: str = None) -> Optional[str]:
+    """ Path of the nearest `pyproject.toml` from `start` (default: current directory) up. """
+    directory = os.path.abspath(start or os.getcwd())
+    while True:
+        path = os.path.join(directory, 'pyproject.toml')
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def cache_dir() -> Optional[str]:
+    directory = os.environ.get('AUTOSYSLOGURU_CACHE_DIR')
+    if directory is not None:
+        return directory or None
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'autosysloguru')
+
+
+def _cache_path(sources: Sequence[str]) -> Optional[str]:
+    directory = cache_dir()
+    if directory is None:
+        return None
+    key = hashlib.sha1('\0'.join(sources).encode()).hexdigest()[:16]
+    return os.path.join(directory, f'config-{key}.json')
+
+
+def _read_cache(path: str, sources: Sequence[str]) -> Optional[Dict]:
+    """ Cached compiled data if every source is unchanged, else None. """
+    try:
+        with open(path, 'rb') as file:
+            entry = json.loads(file.read())
+    except (OSError, ValueError):
+        return None
+    if entry.get('version') != _CACHE_VERSION or [source[0] for source in entry['sources']] != list(sources):
+        return None
+    touched = False
+    for source in entry['sources']:
+        source_path, mtime_ns, size, digest = source
+        try:
+            stat = os.stat(source_path)
+            if (stat.st_mtime_ns, stat.st_size) == (mtime_ns, size):
+                continue
+            with open(source_path, 'rb') as file:
+                if hashlib.sha256(file.read()).hexdigest() != digest:
+                    return None
+        except OSError:
+            return None
+        source[1:3] = [stat.st_mtime_ns, stat.st_size]  # touched but unchanged
+        touched = True
+    if touched:
+        _write_cache(path, entry)
+    return entry['data']
+
+
+def _write_cache(path: str, entry: Dict):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        text = json.dumps(entry)
+    except (TypeError, ValueError):
+        return  # e.g. a callable sink from a config script: not cacheable
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'w') as file:
+            file.write(text)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # read-only home, full disk, ...: load without the cache
+
+
+def _compile(sources: Sequence[str]):
+    """ Read and merge the configuration files, later sources taking priority. """
+    data: Dict = {}
+    stamps = []
+    for path in sources:
+        with open(path, 'rb') as file:
+            content = file.read()
+            stat = os.fstat(file.fileno())
+        if os.path.basename(path) == 'pyproject.toml':
+            data.update(_compile_pyproject(path, content))
+        else:
+            data.update(_compile_script(path, content))
+        stamps.append([path, stat.st_mtime_ns, stat.st_size, hashlib.sha256(content).hexdigest()])
+    return data, stamps
+
+
+def config_sources(start: str = None) -> List[str]:
+    """ Configuration files in priority order (lowest first). """
+    sources = []
+    pyproject = find_pyproject(start)
+    if pyproject is not None:
+        sources.append(pyproject)
+    filename = os.environ.get('LOGURU_CONFIG_FILENAME')
+    if filename:
+        path = os.path.abspath(os.path.expanduser(filename))
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"LOGURU_CONFIG_FILENAME: no such file '{path}'")
+        sources.append(path)
+    return sources
+
+
+def load_config(start: str = None, use_cache: bool = True) -> Optional[LoguruConfig]:
+    """ Resolve the environment and configuration files into a `LoguruConfig`.
+
+        Returns None when called again while a config script is running
+        (the script calling `logger.config()` itself). """
+    if _loading:
+        return None
+    sources = config_sources(start)
+    data = None
+    path = _cache_path(sources) if use_cache and sources else None
+    if path is not None:
+        data = _read_cache(path, sources)
+    if data is None:
+        _loading.append(sources)
+        try:
+            data, stamps = _compile(sources)
+        finally:
+            _loading.pop()
+        if path is not None:
+            _write_cache(path, {'version': _CACHE_VERSION, 'sources': stamps, 'data': data})
+
+    levels = {'dev_level': data.get('dev_level'), 'prod_level': data.get('prod_level')}
+    for key, level in levels.items():
+        if 'LOGURU_LEVEL' in os.environ:
+            levels[key] = os.environ['LOGURU_LEVEL']
+        elif level is None:
+            levels[key] = os.environ.get('LOGURU_DEFAULT_LEVEL')
+    return LoguruConfig(levels['dev_level'], levels['prod_level'], data.get('dev_handlers'),
+                        data.get('prod_handlers'), sources)
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+""" File sinks built on loguru's `FileSink`, keeping its `rotation`,
+    `retention` and `compression` options. """
+import decimal
+import errno
+import glob
+import mmap
+import numbers
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+from typing import Callable, Deque, List
+
+from loguru import _string_parsers as string_parsers
+from loguru._ctime_functions import get_ctime, set_ctime
+from loguru._datetime import datetime
+from loguru._file_sink import Compression, FileSink, Rotation, generate_rename_path
+
+from ._common import report_error
+
+
+_run_id: List = [None, '']
+
+
+def run_id() -> str:
+    """ Identifier of this run: start time, pid and a random suffix.
+
+        Computed once per process (again after a fork). """
+    pid = os.getpid()
+    if _run_id[0] != pid:
+        _run_id[:] = [pid, f"{time.strftime('%Y-%m-%d_%H-%M-%S')}_{pid}_{os.urandom(3).hex()}"]
+    return _run_id[1]
+
+
+def per_run_path(path) -> str:
+    """ `output.json` -> `output.<run id>.json` """
+    root, ext = os.path.splitext(str(path))
+    return f'{root}.{run_id()}{ext}'
+
+
+class _Maintenance:
+    """ Daemon thread running file maintenance (compression, retention) off the logging path. """
+
+    def __init__(self):
+        self._jobs: Deque = deque()  # (job, owner)
+        self._unfinished: int = 0
+        self._running = None  # owner of the job being run
+        self._thread = None
+        self._changed = threading.Condition()
+
+    def schedule(self, job: Callable, owner=None):
+        with self._changed:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                                                name='autosysloguru-maintenance')
+                self._thread.start()
+            self._jobs.append((job, owner))
+            self._unfinished += 1
+            self._changed.notify_all()
+
+    def wait(self, owner=None):
+        """ Block until the jobs scheduled for `owner` have run (every job
+            without `owner`). The jobs of `owner` still queued are run by
+            the calling thread, so a sink being stopped does not wait for
+            the compression of other sinks' files. """
+        with self._changed:
+            if owner is None:
+                self._changed.wait_for(lambda: not self._unfinished)
+                return
+            own = [entry for entry in self._jobs if entry[1] is owner]
+            for entry in own:
+                self._jobs.remove(entry)
+            self._changed.wait_for(lambda: self._running is not owner)
+        for job, _ in own:
+            self._call(job)
+        with self._changed:
+            self._unfinished -= len(own)
+            self._changed.notify_all()
+
+    def _run(self):
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._jobs)
+                job, self._running = self._jobs.popleft()
+            self._call(job)
+            with self._changed:
+                self._running = None
+                self._unfinished -= 1
+                self._changed.notify_all()
+
+    @staticmethod
+    def _call(job: Callable):
+        try:
+            job()
+        except Exception:
+            report_error('file maintenance')
+
+
+maintenance = _Maintenance()
+
+
+def _size_limit(rotation):
+    """ Byte limit of a size-based `rotation`, else None. """
+    if isinstance(rotation, str):
+        return string_parsers.parse_size(rotation)
+    if isinstance(rotation, (numbers.Real, decimal.Decimal)) and not isinstance(rotation, bool):
+        return rotation
+    return None
+
+
+def _zstd_open(path, mode='wb'):
+    import zstandard
+    return zstandard.open(path, mode)
+
+
+def has_zstandard() -> bool:
+    """ Whether the optional `zstandard` package is installed (imported on first use). """
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:  # pragma: no cover - optional dependency
+        return False
+    return True
+
+
+class AutoSysFileSink(FileSink):
+    """ loguru's `FileSink` with rotation finalization moved off the logging path.
+
+        On rotation the logging thread only closes the file, renames it and
+        opens the new one; compression of the old file, the retention scan
+        and old file deletion are scheduled on the maintenance thread.
+        `compression='zst'` uses `zstandard` when installed (gzip otherwise).
+
+        With `per_run`, the file name is computed once for the run (see
+        `per_run_path()`), and retention also applies to the files of previous
+        runs, starting in the background when the sink is created. """
+
+    def __init__(self, path, *, per_run: bool = False, retention=None, **kwargs):
+        self.base_path = str(path)
+        self.name = per_run_path(path) if per_run else self.base_path
+        # held while switching files, so retention never sees a file being opened
+        self._switch_lock = threading.Lock()
+        self.rotations: int = 0
+        super().__init__(self.name, retention=None, **kwargs)
+        # match every run and every rotation of the base path
+        self._glob_patterns = self._make_glob_patterns(self.base_path)
+        self._background_retention = self._make_retention_function(retention)
+        if per_run and self._background_retention is not None:
+            maintenance.schedule(self._apply_retention, self)
+
+    @staticmethod
+    def _make_compression_function(compression):
+        if isinstance(compression, str) and compression.strip().lstrip('.') in ('zst', 'zstd'):
+            if not has_zstandard():
+                return FileSink._make_compression_function('gz')
+            compress = partial(Compression.copy_compress, opener=_zstd_open, mode='wb')
+            return partial(Compression.compression, ext='.zst', compress_function=compress)
+        return FileSink._make_compression_function(compression)
+
+    def _terminate_file(self, *, is_rotating=False):
+        if not is_rotating:
+            super()._terminate_file(is_rotating=False)
+            if self._background_retention is not None and self._rotation_function is None:
+                self._apply_retention()  # stopping: loguru also cleans up here
+            return
+
+        with self._switch_lock:
+            old_path = self._file_path
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._file_path = None
+
+            new_path = self._prepare_new_path()
+            if new_path == old_path:
+                root, ext = os.path.splitext(old_path)
+                renamed_path = generate_rename_path(root, ext, get_ctime(old_path))
+                os.rename(old_path, renamed_path)
+                old_path = renamed_path
+
+            self._file = open(new_path, **self._kwargs)
+            set_ctime(new_path, datetime.now().timestamp())
+            self._file_path = new_path
+            self.rotations += 1
+
+        if self._compression_function is not None or self._background_retention is not None:
+            maintenance.schedule(partial(self._finalize, old_path), self)
+
+    def _finalize(self, old_path):
+        """ Compress a rotated file and apply retention (maintenance thread). """
+        if self._compression_function is not None and old_path is not None:
+            self._compression_function(old_path)
+        if self._background_retention is not None:
+            self._apply_retention()
+
+    def _apply_retention(self):
+        with self._switch_lock:
+            logs = {file for pattern in self._glob_patterns for file in glob.glob(pattern) if os.path.isfile(file)}
+            current = self._file_path
+            if current is not None:
+                logs.discard(current)
+        try:
+            self._background_retention(list(logs))
+        except FileNotFoundError:
+            pass  # removed concurrently (e.g. by another process)
+
+    def stop(self):
+        # pending retention runs must still see the current file as current
+        maintenance.wait(self)
+        super().stop()
+        # let compression of the last rotated file finish before exiting
+        maintenance.wait(self)
+
+
+class BufferedFileSink(AutoSysFileSink):
+    """ Coalesce messages into large writes.
+
+        Messages are encoded and kept in memory until `buffer_size` bytes
+        are pending, `flush_interval` seconds have passed, or a message at
+        `flush_level` or above arrives, then written with a single call.
+        Size-based rotation is checked against a byte count kept here
+        instead of seeking the file for every message.
+
+        loguru treats this object as a stream; there is deliberately no
+        `flush()` method, which loguru would call after every message. """
+
+    def __init__(self, path, *, buffer_size: int = 64 * 1024, flush_interval: float = 1.0,
+                 flush_level: int = 40, rotation=None, delay=False, mode='a', buffering=1,
+                 encoding=None, errors='strict', **kwargs):
+        super().__init__(path, rotation=rotation, delay=True, mode=mode, encoding=encoding, **kwargs)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self._errors = errors
+        self._kwargs = {'mode': mode.replace('b', '').replace('t', '') + 'b', 'buffering': 0}
+        self._size_limit = _size_limit(rotation)
+        # time-based rotation only looks at the file name, other callables may read the file
+        self._rotation_reads_file = not (self._size_limit is not None
+                                         or isinstance(self._rotation_function, Rotation.RotationTime))
+
+        self._lock = threading.Lock()
+        self._pending: List[bytes] = []
+        self._pending_size: int = 0
+        self._size: int = 0
+        self._stopped = threading.Event()
+        self._flusher = None
+
+        if not delay:
+            self._initialize_file()
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True,
+                                             name=f'autosysloguru-flush-{self.name}')
+            self._flusher.start()
+
+    def write(self, message):
+        data = message.encode(self.encoding, self._errors)
+        with self._lock:
+            if self._file is None:
+                self._initialize_file()
+
+            if self._size_limit is not None:
+                if self._size + self._pending_size + len(data) > self._size_limit:
+                    self._terminate_file(is_rotating=True)
+            elif self._rotation_function is not None:
+                if self._rotation_reads_file:
+                    self._write_pending()
+                if self._rotation_function(message, self._file):
+                    self._terminate_file(is_rotating=True)
+
+            self._pending.append(data)
+            self._pending_size += len(data)
+            if self._pending_size >= self.buffer_size or message.record['level'].no >= self.flush_level:
+                self._write_pending()
+
+    def flush_buffer(self):
+        """ Write pending messages now. """
+        with self._lock:
+            self._write_pending()
+
+    def _write_pending(self):
+        if not self._pending or self._file is None:
+            return
+        data = b''.join(self._pending)
+        self._pending.clear()
+        self._pending_size = 0
+        self._file.write(data)
+        self._size += len(data)
+
+    def _flush_periodically(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush_buffer()
+            except Exception:
+                pass  # the next write() reports the problem through loguru
+
+    def _initialize_file(self):
+        super()._initialize_file()
+        self._size = os.fstat(self._file.fileno()).st_size
+
+    def _terminate_file(self, *, is_rotating=False):
+        self._write_pending()
+        super()._terminate_file(is_rotating=is_rotating)
+        self._size = 0 if self._file is None else os.fstat(self._file.fileno()).st_size
+
+    def stop(self):
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            super().stop()
+
+
+def _data_end(fd: int, size: int, chunk: int = 1 << 16) -> int:
+    """ Length of the file without its zero-filled tail (preallocated space
+        a crashed process never wrote to). """
+    end = size
+    while end > 0:
+        start = max(end - chunk, 0)
+        data = os.pread(fd, end - start, start).rstrip(b'\0')
+        if data:
+            return start + len(data)
+        end = start
+    return 0
+
+
+def _preallocate(fd: int, size: int, end: int):
+    """ Grow the file to `end` bytes, reserving the blocks when the file system
+        supports it, so a full disk fails here rather than with SIGBUS on a
+        write to the mapping. """
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, size, end - size)
+            return
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                raise
+    os.ftruncate(fd, end)
+
+
+class MappedFileSink(AutoSysFileSink):
+    """ Copy messages into a memory mapping of the file.
+
+        The file is grown and mapped `segment_size` bytes at a time
+        (segments do not extend past a size-based `rotation` limit), so a
+        message costs a copy into the page cache and no system call; only
+        starting a segment does. The file is truncated to the written
+        length when it is closed or rotated. After a crash the kernel
+        still writes back what was copied, and the zero-filled tail of the
+        last segment is cut off when the file is opened again.
+
+        Readers of the live file see that zero-filled tail, and a callable
+        `rotation` gets a file whose size includes it. """
+
+    def __init__(self, path, *, segment_size: int = 64 * 1024 * 1024, rotation=None, delay=False,
+                 mode='a', buffering=1, encoding=None, errors='strict', **kwargs):
+        super().__init__(path, rotation=rotation, delay=True, mode=mode, encoding=encoding, **kwargs)
+        self._errors = errors
+        self._kwargs = {'mode': ('w' if 'w' in mode else 'a') + '+b', 'buffering': 0}
+        self._size_limit = _size_limit(rotation)
+        granularity = mmap.ALLOCATIONGRANULARITY
+        self.segment_size = -(-max(segment_size, 1) // granularity) * granularity
+        # mappings end at the rotation limit (rounded up to whole pages)
+        self._map_limit = None if self._size_limit is None else -(-int(self._size_limit) // granularity) * granularity
+        self._map = None
+        self._map_start: int = 0
+        self._map_end: int = -1  # nothing mapped
+        self._size: int = 0
+        if not delay:
+            self._initialize_file()
+
+    def write(self, message):
+        data = message.encode(self.encoding, self._errors)
+        if self._file is None:
+            self._initialize_file()
+
+        if self._size_limit is not None:
+            if self._size and self._size + len(data) > self._size_limit:
+                self._terminate_file(is_rotating=True)
+        elif self._rotation_function is not None and self._rotation_function(message, self._file):
+            self._terminate_file(is_rotating=True)
+
+        size = self._size
+        end = size + len(data)
+        if end <= self._map_end:
+            self._map[size - self._map_start:end - self._map_start] = data
+        else:
+            self._write_segments(data)
+        self._size = end
+
+    def _write_segments(self, data: bytes):
+        view = memoryview(data)
+        offset = self._size
+        while view:
+            if offset >= self._map_end:
+                self._map_segment(offset)
+            count = min(len(view), self._map_end - offset)
+            start = offset - self._map_start
+            self._map[start:start + count] = view[:count]
+            view = view[count:]
+            offset += count
+
+    def _map_segment(self, offset: int):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        start = offset - offset % mmap.ALLOCATIONGRANULARITY
+        end = start + self.segment_size
+        if self._map_limit is not None and self._map_limit > offset:
+            end = min(end, self._map_limit)
+        fd = self._file.fileno()
+        size = os.fstat(fd).st_size
+        if size < end:
+            _preallocate(fd, size, end)
+        self._map = mmap.mmap(fd, end - start, offset=start)
+        self._map_start, self._map_end = start, end
+
+    def _open_mapping(self):
+        """ Find the written length of the new file (see `_data_end()`); the
+            first write maps it. """
+        fd = self._file.fileno()
+        size = os.fstat(fd).st_size
+        self._size = _data_end(fd, size)
+        if self._size != size:
+            os.ftruncate(fd, self._size)
+        self._map_start, self._map_end = self._size, -1
+
+    def _close_mapping(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            os.ftruncate(self._file.fileno(), self._size)
+        self._map_start, self._map_end, self._size = 0, -1, 0
+
+    def _initialize_file(self):
+        super()._initialize_file()
+        self._open_mapping()
+
+    def _terminate_file(self, *, is_rotating=False):
+        self._close_mapping()
+        super()._terminate_file(is_rotating=is_rotating)
+        if self._file is not None:
+            self._open_mapping()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+""" Filters that keep log storms off the sinks: per call site rate
+    limiting, per level sampling and deduplication of repeated messages.
+
+    They compose with `AutoSysLevelChangeFilter` in a `FilterChain`
+    (`logger.add(sink, filter=[logger.level_filter, RateLimitFilter(10)])`),
+    which checks the level first so dropped levels cost no tokens.
+
+    One instance can be shared by several handlers: the decision for a
+    record is taken by the first handler and reused by the others (loguru
+    hands the same record to every handler), so each record is counted once
+    and every handler sees the same sample. Call sites are keyed by the
+    record's file and line, in an LRU of `maxsize` entries.
+    """
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+from weakref import WeakSet
+
+
+class FilterChain:
+    """ Accept the records every filter of `filters` accepts, checked in order. """
+
+    def __init__(self, *filters):
+        self.filters: Tuple = filters
+
+    def __call__(self, record):
+        for filter_ in self.filters:
+            if not filter_(record):
+                return False
+        return True
+
+    def __repr__(self):
+        return f'FilterChain{self.filters!r}'
+
+
+class _RecordFilter:
+    """ Base class: `_accept()` is called once per record and thread. """
+
+    def __init__(self):
+        self.passed: int = 0
+        self.dropped: int = 0
+        self._lock = threading.Lock()
+        self._last = threading.local()
+
+    def __call__(self, record):
+        # handlers sharing the filter get the verdict of the first one. The record's own `elapsed`
+        # is kept instead of the record and its traceback: with id(record), it tells the same
+        # record from a new one that reuses the id of a freed record
+        last = self._last
+        if getattr(last, 'id', None) == id(record) and last.elapsed is record['elapsed']:
+            return last.verdict
+        verdict = self._accept(record)
+        if verdict:
+            self.passed += 1
+        else:
+            self.dropped += 1
+        last.id, last.elapsed, last.verdict = id(record), record['elapsed'], verdict
+        return verdict
+
+    def _accept(self, record) -> bool:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        return {'passed': self.passed, 'dropped': self.dropped}
+
+
+class RateLimitFilter(_RecordFilter):
+    """ Token bucket per call site: `rate` records per second, in bursts of
+        up to `burst` (default: `rate`) records. """
+
+    def __init__(self, rate: float, burst: float = None, maxsize: int = 1024):
+        if rate <= 0:
+            raise ValueError(f"Invalid rate '{rate}', it should be a positive number")
+        super().__init__()
+        self.rate = rate
+        self.burst = max(burst or rate, 1)
+        self.maxsize = maxsize
+        self._buckets: OrderedDict = OrderedDict()
+
+    def _accept(self, record) -> bool:
+        key = (record['file'].path, record['line'])
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = [self.burst - 1, now]
+                if len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+                return True
+            self._buckets.move_to_end(key)
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return True
+            bucket[0] = tokens
+            return False
+
+
+class SamplingFilter(_RecordFilter):
+    """ Keep each record with the probability given for its level name in
+        `rates` (`{'DEBUG': 0.01, 'INFO': 0.1}`), `default` for other levels. """
+
+    def __init__(self, rates: Dict[str, float], default: float = 1.0):
+        super().__init__()
+        self.rates = dict(rates)
+        self.default = default
+        from random import random  # not needed at import time
+        self._random = random
+
+    def _accept(self, record) -> bool:
+        rate = self.rates.get(record['level'].name, self.default)
+        return rate >= 1 or self._random() < rate
+
+
+class DedupFilter(_RecordFilter):
+    """ Drop a message repeated at the same call site, and write a
+        "repeated N times" summary record when another message is logged
+        there or, while the repetition lasts, every `interval` seconds.
+
+        Summaries are written by the handlers using this filter and carry
+        the number of dropped records in `extra['repeated']`. A thread
+        started while records are being dropped writes the summaries of
+        repetitions that stopped; `flush()` (called by the logger's
+        `complete()` and `remove()`) writes the pending ones at once. """
+
+    def __init__(self, interval: float = 10.0, maxsize: int = 1024):
+        super().__init__()
+        self.interval = interval
+        self.maxsize = maxsize
+        self.summaries: int = 0
+        self._cores: WeakSet = WeakSet()
+        # call site -> [message, dropped, start of the summary period, last dropped record]
+        self._sites: OrderedDict = OrderedDict()
+        self._flusher = None
+
+    def _accept(self, record) -> bool:
+        key = (record['file'].path, record['line'])
+        message = record['message']
+        now = time.monotonic()
+        summary = None
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                self._sites[key] = [message, 0, now, None]
+                if len(self._sites) > self.maxsize:
+                    _, evicted = self._sites.popitem(last=False)
+                    if evicted[1]:
+                        summary = (evicted[3], evicted[1])
+                accept = True
+            elif site[0] != message:
+                if site[1]:
+                    summary = (site[3], site[1])
+                site[:] = [message, 0, now, None]
+                accept = True
+            elif now - site[2] >= self.interval:
+                summary = (record, site[1] + 1)
+                site[1:] = [0, now, None]
+                accept = False
+            else:
+                site[1] += 1
+                site[3] = record
+                accept = False
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_periodically, daemon=True,
+                                                     name='autosysloguru-dedup')
+                    self._flusher.start()
+            self._sites.move_to_end(key)
+        if summary is not None:
+            self._write_summary(*summary)
+        return accept
+
+    def flush(self, age: float = 0.0):
+        """ Write the pending summaries of the call sites whose summary
+            period started `age` seconds ago or more. """
+        now = time.monotonic()
+        summaries = []
+        with self._lock:
+            for site in self._sites.values():
+                if site[1] and now - site[2] >= age:
+                    summaries.append((site[3], site[1]))
+                    site[1:] = [0, now, None]
+        for summary in summaries:
+            self._write_summary(*summary)
+
+    def _flush_periodically(self):
+        # runs while some records are dropped, a new thread is started for the next repetition
+        while True:
+            time.sleep(self.interval)
+            self.flush(self.interval)
+            with self._lock:
+                if not any(site[1] for site in self._sites.values()):
+                    self._flusher = None
+                    return
+
+    def _write_summary(self, record, repeated: int):
+        summary = dict(record, exception=None, extra={**record['extra'], 'repeated': repeated},
+                       message=f"{record['message']} (repeated {repeated} times)")
+        self.summaries += 1
+        last = self._last
+        previous = getattr(last, 'id', None), getattr(last, 'elapsed', None), getattr(last, 'verdict', None)
+        last.id, last.elapsed, last.verdict = id(summary), summary['elapsed'], True
+        try:
+            for core in list(self._cores):
+                level = core.levels.get(summary['level'].name)
+                level_id = summary['level'].name if level is not None and level.no == summary['level'].no else None
+                for handler in list(core.handlers.values()):
+                    if _uses(handler._filter, self):
+                        handler.emit(summary, level_id, False, False, None)
+        finally:
+            last.id, last.elapsed, last.verdict = previous
+
+    def stats(self) -> Dict:
+        return {'passed': self.passed, 'dropped': self.dropped, 'summaries': self.summaries}
+
+
+def chained_filters(filter_) -> Tuple:
+    """ The filters a handler filter is made of. """
+    if isinstance(filter_, FilterChain):
+        return filter_.filters
+    return (filter_,)
+
+
+def _uses(filter_, target) -> bool:
+    return any(member is target for member in chained_filters(filter_))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+""" Per-thread record buffers merged by one flusher, for `AutoSysLogger.thread_buffers()`.
+
+    With many threads logging, each record normally takes every handler's
+    lock in the logging thread to be formatted and written. Here a logging
+    thread builds the record (message, patchers, context) and appends it to
+    its own deque, so producers share no lock; a single flusher thread
+    takes the records older than `lag` from every deque, merges them in the
+    order they were logged and hands them to the handlers, where formatting
+    and writing happen without contention.
+
+    Each thread's records stay in order. Across threads, the order is the
+    order of the calls as long as building a record takes less than `lag`.
+    A full deque makes its thread wait for the flusher, and ERROR records
+    wake the flusher at once.
+    """
+import heapq
+import threading
+import time
+from collections import deque
+from operator import itemgetter
+from typing import Dict, List
+
+from ._common import report_error
+from ._template import coloring
+from ._timing import perf_counter_ns
+
+
+class ThreadBuffers:
+    """ Per-thread deques of records, written to the handlers of `core`
+        every `interval` seconds. """
+
+    def __init__(self, core, interval: float = 0.01, lag: float = 0.005, buffer_size: int = 10000,
+                 wake_level: int = 40):
+        self.core = core
+        self.interval = interval
+        self.lag_ns = int(lag * 1e9)
+        self.buffer_size = buffer_size
+        self.wake_level = wake_level
+        self.written: int = 0
+        self.flushes: int = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()  # registration of new threads only
+        self._flush_lock = threading.RLock()  # sinks may log from the flusher
+        self._buffers: List = []  # (thread, deque)
+        self._stopping = False
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='autosysloguru-thread-buffers')
+        self._thread.start()
+
+    def _buffer(self) -> deque:
+        buffer = self._local.buffer = deque()
+        with self._lock:
+            self._buffers.append((threading.current_thread(), buffer))
+        return buffer
+
+    def append(self, record, level_id, from_decorator, raw, colored_message):
+        try:
+            buffer = self._local.buffer
+        except AttributeError:
+            buffer = self._buffer()
+        if len(buffer) >= self.buffer_size:
+            self._wait_for_room(buffer)
+        buffer.append((perf_counter_ns(), record, level_id, from_decorator, raw, colored_message))
+        if record['level'].no >= self.wake_level:
+            self._wakeup.set()
+
+    def _wait_for_room(self, buffer: deque):
+        if threading.current_thread() is self._thread or self._stopping:
+            self.flush()  # a sink logging from the flusher, or records logged while stopping
+            return
+        while len(buffer) >= self.buffer_size and self._thread.is_alive():
+            self._wakeup.set()
+            time.sleep(0.001)
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(buffer) for _, buffer in self._buffers)
+
+    def flush(self, lag_ns: int = 0):
+        """ Write the records logged more than `lag_ns` ago (all by default). """
+        with self._flush_lock:
+            cutoff = perf_counter_ns() - lag_ns
+            with self._lock:
+                buffers = list(self._buffers)
+            batches = []
+            for thread, buffer in buffers:
+                batch = []
+                while buffer and buffer[0][0] <= cutoff:
+                    batch.append(buffer.popleft())
+                if batch:
+                    batches.append(batch)
+                if not buffer and not thread.is_alive():
+                    with self._lock:
+                        self._buffers = [entry for entry in self._buffers if entry[1] is not buffer]
+            if not batches:
+                return
+            entries = batches[0] if len(batches) == 1 else heapq.merge(*batches, key=itemgetter(0))
+            for _, record, level_id, from_decorator, raw, colored_message in entries:
+                coloring.message = colored_message
+                for handler in self.core.handlers.values():
+                    handler.emit(record, level_id, from_decorator, raw, colored_message)
+                self.written += 1
+            coloring.message = None
+            self.flushes += 1
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            try:
+                self.flush(self.lag_ns)
+            except Exception:
+                # handlers added with catch=False raise here, in no caller's thread
+                report_error('thread buffers')
+
+    def stats(self) -> Dict:
+        return {'written': self.written, 'flushes': self.flushes, 'pending': self.pending(),
+                'threads': len(self._buffers)}
+
+    def stop(self):
+        """ Write everything pending and stop the flusher. """
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+""" Counters and timings of the logging pipeline, for `AutoSysLogger.enable_metrics()`.
+
+    Counting is a dict update in a shard owned by the calling thread, so
+    producers never share a lock or a cache line; `ShardedCounters.totals()`
+    merges the shards on read (and folds the shards of finished threads).
+
+    Measured: records built per level (through the core's patcher), calls
+    and records dropped by the level gate and `level_filter`, and per
+    handler the messages written, bytes written (UTF-8) and write latency
+    (log-linear buckets, see _timing.py). Latency is the time the logging
+    thread spends in the sink's `write()`: for nonblocking handlers, the
+    time to enqueue. Queue depth and drops, remote sink counters and file
+    rotations are read from the sinks when a snapshot is taken.
+
+    `to_prometheus()` renders a snapshot in the Prometheus text format,
+    which `PrometheusExporter` writes to a file (for node_exporter's
+    textfile collector) and/or serves over HTTP on a TCP or Unix socket.
+    """
+import os
+import socket
+import threading
+import time
+from math import ceil
+from typing import Dict, Iterator, List
+
+from ._background import BackgroundSink
+from ._common import report_error
+from ._file_sinks import AutoSysFileSink
+from ._remote import RemoteSink
+from ._timing import bucket_index, bucket_upper, perf_counter_ns
+
+
+# upper bounds (seconds) of the exported write latency buckets
+PROMETHEUS_BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0)
+
+
+class ShardedCounters:
+    """ Integer counters kept in one dict per thread, merged on read. """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List = []  # (thread, counts)
+        self._retired: Dict = {}  # totals of finished threads
+
+    def shard(self) -> Dict:
+        """ The calling thread's counts (key -> int), to update in place. """
+        try:
+            return self._local.counts
+        except AttributeError:
+            counts = self._local.counts = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), counts))
+            return counts
+
+    def add(self, key, n: int = 1):
+        counts = self.shard()
+        counts[key] = counts.get(key, 0) + n
+
+    def totals(self) -> Dict:
+        with self._lock:
+            totals = dict(self._retired)
+            live = []
+            for thread, counts in self._shards:
+                for key, n in counts.copy().items():
+                    totals[key] = totals.get(key, 0) + n
+                if thread.is_alive():
+                    live.append((thread, counts))
+                else:
+                    for key, n in counts.items():
+                        self._retired[key] = self._retired.get(key, 0) + n
+            self._shards = live
+        return totals
+
+
+class MeteredSink:
+    """ Stands in for a handler's sink, counting and timing its writes. """
+
+    def __init__(self, sink, counters: ShardedCounters, handler_id: int):
+        self._sink = sink
+        self._write = sink.write
+        self._counters = counters
+        self._id = handler_id
+        self._written_key = ('written', handler_id)
+        self._bytes_key = ('bytes', handler_id)
+        self._time_key = ('write_ns', handler_id)
+
+    def write(self, message):
+        start = perf_counter_ns()
+        self._write(message)
+        elapsed = perf_counter_ns() - start
+        counts = self._counters.shard()
+        key = self._written_key
+        counts[key] = counts.get(key, 0) + 1
+        key = self._bytes_key
+        counts[key] = counts.get(key, 0) + len(message.encode('utf8', 'surrogatepass'))
+        key = self._time_key
+        counts[key] = counts.get(key, 0) + elapsed
+        key = ('latency', self._id, bucket_index(elapsed))
+        counts[key] = counts.get(key, 0) + 1
+
+    def __getattr__(self, name):
+        return getattr(self._sink, name)
+
+
+def sink_chain(sink) -> Iterator:
+    """ `sink` and the sinks it wraps (loguru's, autosysloguru's and `MeteredSink`). """
+    while sink is not None:
+        yield sink
+        sink = next((vars(sink)[name] for name in ('_sink', '_stream', '_function', '_target', '_handler')
+                     if name in getattr(sink, '__dict__', ())), None)
+
+
+def _percentile(buckets: Dict[int, int], count: int, q: float) -> int:
+    rank = ceil(q * count)
+    seen = 0
+    for index in sorted(buckets):
+        seen += buckets[index]
+        if seen >= rank:
+            return bucket_upper(index)
+    return 0
+
+
+class Metrics:
+    """ Metrics of the handlers of `core`, attached with `attach()`. """
+
+    def __init__(self, core):
+        self.core = core
+        self.counters = ShardedCounters()
+        self._previous_patcher = None
+        self._exporters: List = []
+
+    def start(self):
+        self.chain_patcher()
+        for handler in list(self.core.handlers.values()):
+            self.attach(handler)
+
+    def chain_patcher(self):
+        """ Count the records, then call the core's patcher; called again
+            when a patcher is set with `configure()`. """
+        if self.core.patcher != self._count_record:
+            self._previous_patcher = self.core.patcher
+            self.core.patcher = self._count_record
+
+    def stop(self):
+        for exporter in self._exporters:
+            exporter.stop()
+        self._exporters.clear()
+        if self.core.patcher == self._count_record:
+            self.core.patcher = self._previous_patcher
+        for handler in list(self.core.handlers.values()):
+            if isinstance(handler._sink, MeteredSink):
+                handler._sink = handler._sink._sink
+
+    def attach(self, handler):
+        if not isinstance(handler._sink, MeteredSink):
+            handler._sink = MeteredSink(handler._sink, self.counters, handler._id)
+
+    def _count_record(self, record):
+        counts = self.counters.shard()
+        key = ('emitted', record['level'].name)
+        counts[key] = counts.get(key, 0) + 1
+        if self._previous_patcher is not None:
+            self._previous_patcher(record)
+
+    def capture(self, level_name, levelno, message, args, kwargs, options, frame):
+        """ Count a call dropped by the level gate (see `AutoSysLogger._keep`). """
+        self.counters.add(('dropped', level_name))
+
+    def snapshot(self) -> Dict:
+        """ {'emitted': {level: n}, 'dropped': {level: n}, 'sinks': {handler id: {...}}}
+
+            Each sink has its name, `written` messages, `bytes` written (UTF-8),
+            write `latency` (count, sum and percentiles in ns, and the
+            histogram as {bucket upper bound in ns: count}) and, when the
+            sink has them, `rotations`, `queue` and `remote` counters. """
+        totals = self.counters.totals()
+        snapshot: Dict = {'emitted': {}, 'dropped': {}, 'sinks': {}}
+        handlers = dict(self.core.handlers)
+        sinks = snapshot['sinks']
+        for handler_id, handler in handlers.items():
+            sinks[handler_id] = {'name': handler._name, 'written': 0, 'bytes': 0}
+        buckets: Dict = {}
+        for key, n in totals.items():
+            kind = key[0]
+            if kind in ('emitted', 'dropped'):
+                snapshot[kind][key[1]] = n
+            elif key[1] in sinks:
+                if kind == 'latency':
+                    buckets.setdefault(key[1], {})[key[2]] = n
+                else:
+                    sinks[key[1]][kind] = n
+        for handler_id, sink in sinks.items():
+            histogram = buckets.get(handler_id, {})
+            count = sum(histogram.values())
+            sink['latency'] = {
+                'count': count, 'sum_ns': sink.pop('write_ns', 0),
+                'p50_ns': _percentile(histogram, count, 0.5), 'p95_ns': _percentile(histogram, count, 0.95),
+                'p99_ns': _percentile(histogram, count, 0.99),
+                'buckets': {bucket_upper(index): histogram[index] for index in sorted(histogram)},
+            }
+            for member in sink_chain(handlers[handler_id]._sink):
+                if isinstance(member, AutoSysFileSink):
+                    sink['rotations'] = member.rotations
+                elif isinstance(member, BackgroundSink):
+                    sink['queue'] = member.stats()
+                elif isinstance(member, RemoteSink):
+                    sink['remote'] = member.stats()
+        return snapshot
+
+    def to_prometheus(self, snapshot: Dict = None) -> str:
+        return to_prometheus(self.snapshot() if snapshot is None else snapshot)
+
+    def export(self, path: str = None, address=None, interval: float = 15.0) -> 'PrometheusExporter':
+        exporter = PrometheusExporter(self, path, address, interval)
+        self._exporters.append(exporter)
+        return exporter
+
+
+def _label(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def to_prometheus(snapshot: Dict) -> str:
+    """ A `Metrics.snapshot()` in the Prometheus text exposition format. """
+    lines: List[str] = []
+
+    def family(name, kind, help_, samples):
+        lines.extend((f'# HELP autosysloguru_{name} {help_}', f'# TYPE autosysloguru_{name} {kind}'))
+        for suffix, labels, value in samples:
+            text = ','.join(f'{key}="{_label(label)}"' for key, label in labels.items())
+            lines.append(f'autosysloguru_{name}{suffix}{{{text}}} {value}')
+
+    family('records_emitted_total', 'counter', 'Records built, per level.',
+           [('', {'level': level}, n) for level, n in snapshot['emitted'].items()])
+    family('records_dropped_total', 'counter', 'Calls and records dropped by the level gate and level_filter.',
+           [('', {'level': level}, n) for level, n in snapshot['dropped'].items()])
+
+    sinks = snapshot['sinks']
+
+    def labels(handler_id):
+        return {'handler': handler_id, 'sink': sinks[handler_id]['name']}
+
+    family('sink_writes_total', 'counter', 'Messages written, per handler.',
+           [('', labels(i), sink['written']) for i, sink in sinks.items()])
+    family('sink_written_bytes_total', 'counter', 'Bytes written (UTF-8 encoded), per handler.',
+           [('', labels(i), sink['bytes']) for i, sink in sinks.items()])
+    samples = []
+    for i, sink in sinks.items():
+        latency = sink['latency']
+        for bound in PROMETHEUS_BUCKETS:
+            count = sum(n for upper, n in latency['buckets'].items() if upper <= bound * 1e9)
+            samples.append(('_bucket', {**labels(i), 'le': repr(bound)}, count))
+        samples.append(('_bucket', {**labels(i), 'le': '+Inf'}, latency['count']))
+        samples.append(('_sum', labels(i), latency['sum_ns'] / 1e9))
+        samples.append(('_count', labels(i), latency['count']))
+    family('sink_write_seconds', 'histogram', 'Time spent in sink writes by the logging thread.', samples)
+    family('sink_rotations_total', 'counter', 'File rotations, per handler.',
+           [('', labels(i), sink['rotations']) for i, sink in sinks.items() if 'rotations' in sink])
+    family('queue_depth', 'gauge', 'Messages waiting in a nonblocking handler queue.',
+           [('', labels(i), sink['queue']['depth']) for i, sink in sinks.items() if 'queue' in sink])
+    family('queue_dropped_total', 'counter', 'Messages dropped by a nonblocking handler queue.',
+           [('', labels(i), sink['queue']['dropped']) for i, sink in sinks.items() if 'queue' in sink])
+    family('remote_dropped_total', 'counter', 'Records a remote sink dropped from its spool.',
+           [('', labels(i), sink['remote']['dropped']) for i, sink in sinks.items() if 'remote' in sink])
+    family('remote_spooled', 'gauge', 'Records waiting to be sent by a remote sink.',
+           [('', labels(i), sink['remote']['spooled']) for i, sink in sinks.items() if 'remote' in sink])
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusExporter:
+    """ Write the metrics to `path` every `interval` seconds (atomically,
+        and once more when stopped), and/or answer HTTP requests on
+        `address` (a Unix socket path or a (host, port) tuple) with them. """
+
+    def __init__(self, metrics: Metrics, path: str = None, address=None, interval: float = 15.0):
+        if path is None and address is None:
+            raise ValueError("PrometheusExporter needs a 'path', an 'address' or both")
+        self.metrics = metrics
+        self.path = None if path is None else os.fspath(path)
+        self.interval = interval
+        self._listener = None
+        if address is not None:
+            family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+            self._listener = socket.socket(family, socket.SOCK_STREAM)
+            if family == socket.AF_UNIX and os.path.exists(address):
+                os.unlink(address)
+            self._listener.bind(address)
+            self._listener.listen(8)
+            self._listener.settimeout(0.2)  # checks for stop()
+            address = self._listener.getsockname()
+        self.address = address
+        self._stopping = False
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='autosysloguru-metrics')
+        self._thread.start()
+
+    def write_file(self):
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as file:
+            file.write(self.metrics.to_prometheus())
+        os.replace(temporary, self.path)
+
+    def _run(self):
+        next_write = 0.0
+        while not self._stopping:
+            try:
+                if self.path is not None and time.monotonic() >= next_write:
+                    self.write_file()
+                    next_write = time.monotonic() + self.interval
+                if self._listener is None:
+                    self._wakeup.wait(max(next_write - time.monotonic(), 0))
+                    continue
+                try:
+                    connection, _ = self._listener.accept()
+                except socket.timeout:
+                    continue
+                with connection:
+                    self._respond(connection)
+            except Exception:
+                self._report_error()
+                self._wakeup.wait(1.0)
+        if self.path is not None:
+            try:
+                self.write_file()
+            except Exception:
+                self._report_error()
+
+    def _respond(self, connection):
+        connection.settimeout(1.0)
+        try:
+            connection.recv(4096)  # the request; any request gets the metrics
+        except socket.timeout:
+            pass
+        body = self.metrics.to_prometheus().encode()
+        connection.sendall(b'HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                           b'Content-Length: %d\r\n\r\n' % len(body) + body)
+
+    def _report_error(self):
+        report_error(f'metrics exporter ({self.path or self.address})')
+
+    def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        if self._listener is not None:
+            self._listener.close()
+            if isinstance(self.address, str):
+                try:
+                    os.unlink(self.address)
+                except OSError:
+                    pass
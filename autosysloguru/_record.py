@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+""" The parts of a loguru record that do not change from one record to the
+    next, built once (see `AutoSysLogger._log`).
+
+    A record is a dict of a dozen objects, and loguru allocates each of
+    them for every call: the level, the file and module names of the call
+    site, the process, the thread, and the local timezone of the time.
+    Here the level, file, process and thread objects are kept per level,
+    source file, process and thread (and made again when a thread or the
+    process is renamed), and the timezone is looked up once per second, so
+    a record only allocates its dict, time, elapsed time, `extra` dict and
+    message.
+
+    The shared objects are loguru's own `__slots__` classes and must be
+    treated as read-only, as loguru's handlers do.
+    """
+import os
+import threading
+from datetime import timedelta, timezone
+from multiprocessing import current_process
+from os.path import basename, splitext
+from threading import current_thread
+from time import localtime, time
+from typing import Dict, Tuple
+
+from loguru._datetime import datetime
+from loguru._recattrs import RecordFile, RecordLevel, RecordProcess, RecordThread
+
+
+# source files kept before the cache is cleared
+MAX_FILES: int = 1024
+
+
+class RecordParts:
+    """ Shared level, file, process and thread objects, and the current time. """
+
+    def __init__(self):
+        self._levels: Dict = {}  # loguru Level tuple -> RecordLevel
+        self._files: Dict = {}  # code file name -> (RecordFile, module)
+        self._process: Tuple = (None, None, None)  # process, name, RecordProcess
+        self._threads = threading.local()
+        self._zone: Tuple = (None, None)  # second, timezone
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forget_process)
+
+    def level(self, level) -> RecordLevel:
+        """ The record level for one of `core.levels`. """
+        try:
+            return self._levels[level]
+        except KeyError:
+            record_level = self._levels[level] = RecordLevel(level.name, level.no, level.icon)
+            return record_level
+
+    def file(self, path: str) -> Tuple:
+        """ (RecordFile, module name) of a code file name. """
+        try:
+            return self._files[path]
+        except KeyError:
+            if len(self._files) >= MAX_FILES:
+                self._files = {}
+            name = basename(path)
+            parts = self._files[path] = (RecordFile(name, path), splitext(name)[0])
+            return parts
+
+    def process(self) -> RecordProcess:
+        process = current_process()
+        cached = self._process
+        if cached[0] is not process or cached[1] is not process.name:
+            cached = self._process = (process, process.name, RecordProcess(process.ident, process.name))
+        return cached[2]
+
+    def _forget_process(self):
+        self._process = (None, None, None)
+
+    def thread(self) -> RecordThread:
+        thread = current_thread()
+        cached = getattr(self._threads, 'record', None)
+        if cached is None or cached.name is not thread.name:
+            cached = self._threads.record = RecordThread(thread.ident, thread.name)
+        return cached
+
+    def now(self) -> datetime:
+        """ Like loguru's `aware_now()`, with the local timezone of the current second. """
+        timestamp = time()
+        second = int(timestamp)
+        zone = self._zone
+        if zone[0] != second:
+            local = localtime(timestamp)
+            zone = self._zone = (second, timezone(timedelta(seconds=local.tm_gmtoff), local.tm_zone))
+        return datetime.fromtimestamp(timestamp, zone[1])
+
+
+parts = RecordParts()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+""" Configuration hot reload for `AutoSysLogger.watch()`.
+
+    A daemon thread polls the configuration files (one `os.stat()` per file
+    and interval) and calls `reload` when one of them changes. A signal
+    (SIGHUP by default) requests a reload too: the signal handler only
+    wakes the thread, so no logging lock is ever taken from a handler.
+    """
+import os
+import signal
+import threading
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from ._common import report_error
+
+
+def file_stamps(paths: Sequence[str]) -> Dict[str, Optional[Tuple[int, int]]]:
+    """ (mtime_ns, size) of each path, None for missing files. """
+    stamps = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stamps[path] = None
+        else:
+            stamps[path] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+class ConfigWatcher:
+    """ Call `reload()` when a file of `sources()` changes or `signum` is received.
+
+        `sources` is called again after each reload, as the set of
+        configuration files may change. With `interval=None`, only the
+        signal triggers reloads. """
+
+    def __init__(self, sources: Callable[[], Sequence[str]], reload: Callable[[], None],
+                 interval: Optional[float] = 1.0, signum: Optional[int] = getattr(signal, 'SIGHUP', None)):
+        self.interval = interval
+        self.signum = signum
+        self.reloads: int = 0
+        self._sources = sources
+        self._reload = reload
+        self._stamps = file_stamps(sources())
+        self._requested = False
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._previous_handler = None
+
+        if signum is not None:
+            # raises ValueError outside the main thread, like signal.signal()
+            self._previous_handler = signal.signal(signum, self._on_signal)
+        self._thread = threading.Thread(target=self._run, daemon=True, name='autosysloguru-config-watcher')
+        self._thread.start()
+
+    def request(self):
+        """ Reload as soon as possible (safe to call from a signal handler). """
+        self._requested = True
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+        if self.signum is not None and signal.getsignal(self.signum) == self._on_signal:
+            signal.signal(self.signum, self._previous_handler or signal.SIG_DFL)
+
+    def _on_signal(self, signum, frame):
+        self.request()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopped:
+                return
+            stamps = file_stamps(self._sources() if self._requested else self._stamps)
+            if not self._requested and stamps == self._stamps:
+                continue
+            self._requested = False
+            try:
+                self._reload()
+                self.reloads += 1
+            except Exception:
+                report_error('configuration reload')
+            self._stamps = file_stamps(self._sources())
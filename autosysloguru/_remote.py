@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+""" Sending records to another process: multi-process aggregation and
+    network logging.
+
+    `RemoteSink` encodes records into compact tuples of plain values and
+    sends them in batches over a Unix or TCP socket. `LogReceiver` accepts
+    any number of senders on one thread and writes every record with the
+    handlers of its logger, so only that process opens, rotates and
+    compresses the log files.
+
+    Wire format: frames of a 1-byte format version (`WIRE_VERSION`) and a
+    4-byte big-endian payload length, followed by the UTF-8 JSON array of
+    the batch's record arrays (see `encode_record()`). Decoding never runs
+    code and does not depend on the Python version of either side; frames
+    of another version are rejected. Records are not authenticated, so TCP
+    receivers should still listen on loopback or a private network (Unix
+    sockets are created with 0600 permissions).
+
+    Reference receiver, printing what it gets to stderr:
+
+        python -m autosysloguru._remote tcp://127.0.0.1:9999
+    """
+import functools
+import json
+import os
+import selectors
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from datetime import timedelta, timezone
+from typing import Dict, List, Sequence, Tuple
+
+from loguru._datetime import datetime
+from loguru._recattrs import RecordFile, RecordLevel, RecordProcess, RecordThread
+
+from ._common import report_error
+from ._serializer import format_exception
+
+
+# version of the frame format, the first byte of every frame
+WIRE_VERSION = 1
+_HEADER = struct.Struct('>BI')
+# `extra` key marking records replayed by a RingBuffer (see _ring.py)
+RING_KEY = 'ring_buffer'
+_encode_json = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=repr).encode
+_decode_json = json.JSONDecoder().decode
+
+
+def encode_record(record: Dict) -> Tuple:
+    """ The fields of a loguru record as a tuple of plain values. """
+    time = record['time']
+    level = record['level']
+    exception = record['exception']
+    return (time.timestamp(), time.utcoffset().total_seconds(), record['elapsed'].total_seconds(),
+            level.name, level.no, record['message'], record['name'], record['module'],
+            record['function'], record['line'], record['file'].name, record['file'].path,
+            record['process'].id, record['process'].name, record['thread'].id, record['thread'].name,
+            record['extra'], None if exception is None else format_exception(exception))
+
+
+def encode_batch(records: List[Tuple]) -> bytes:
+    """ One frame holding `records` (`extra` values JSON can't hold are sent as their repr). """
+    try:
+        payload = _encode_json(records)
+    except (TypeError, ValueError):  # keys that are not strings, or circular values
+        records = [fields[:16] + ({str(key): _plain(value) for key, value in fields[16].items()}, fields[17])
+                   for fields in records]
+        payload = _encode_json(records)
+    payload = payload.encode('utf8', 'surrogatepass')
+    return _HEADER.pack(WIRE_VERSION, len(payload)) + payload
+
+
+def decode_batch(payload: bytes) -> List:
+    """ The record field lists of a frame's payload. """
+    records = _decode_json(payload.decode('utf8', 'surrogatepass'))
+    if not isinstance(records, list):
+        raise ValueError(f'expected a list of records, got {type(records).__name__}')
+    return records
+
+
+@functools.lru_cache(maxsize=16)
+def _timezone(utcoffset: float) -> timezone:
+    return timezone(timedelta(seconds=utcoffset))
+
+
+def _plain(value):
+    try:
+        _encode_json(value)
+    except (TypeError, ValueError):
+        return repr(value)
+    return value
+
+
+def parse_address(address):
+    """ (family, address) of a Unix socket path, a (host, port) tuple or 'tcp://host:port'. """
+    if isinstance(address, str) and address.startswith('tcp://'):
+        host, _, port = address[len('tcp://'):].rpartition(':')
+        address = (host.strip('[]') or 'localhost', int(port))
+    if isinstance(address, (tuple, list)):
+        return socket.AF_INET, (address[0], int(address[1]))
+    return socket.AF_UNIX, os.fspath(address)
+
+
+class RemoteSink:
+    """ Send records to a `LogReceiver` listening on `address` (a Unix
+        socket path, a (host, port) tuple or 'tcp://host:port').
+
+        `write()` only queues the encoded record; a sender thread keeps one
+        connection open and sends batches of up to `batch_size` records
+        every `flush_interval` seconds, as soon as `batch_size` records are
+        waiting, or at `flush_level` (ERROR) and above. While the receiver
+        is unreachable, records are kept in a spool of `spool_size` records
+        (the oldest are dropped when full) and connecting is retried with an
+        exponential backoff between `backoff` seconds (min, max). Records in
+        a batch whose send fails are sent again, so the receiver may see
+        them twice; there are no acknowledgements, so a batch written just
+        as the receiver went away can be lost. After a fork, the child
+        starts with an empty spool and its own connection.
+
+        Like `BufferedFileSink`, this has no `flush()` method on purpose. """
+
+    def __init__(self, address, batch_size: int = 256, flush_interval: float = 0.1,
+                 flush_level: int = 40, spool_size: int = 100000, backoff: Tuple = (0.1, 30.0),
+                 timeout: float = 5.0):
+        self.family, self.address = parse_address(address)
+        self.name = f'remote:{address}'
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self.spool_size = spool_size
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.sent: int = 0
+        self.batches: int = 0
+        self.dropped: int = 0
+        self.reconnects: int = 0
+
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._spool: deque = deque()
+        self._socket = None
+        self._delay: float = self.backoff[0]
+        self._retry_at: float = 0.0
+        self._busy: bool = False
+        self._urgent: bool = False  # send partial batches too
+        self._stopping: bool = False
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f'autosysloguru-sender-{self.name}')
+        self._thread.start()
+
+    @property
+    def connected(self) -> bool:
+        return self._socket is not None
+
+    def stats(self) -> Dict:
+        return {'sent': self.sent, 'batches': self.batches, 'dropped': self.dropped,
+                'reconnects': self.reconnects, 'spooled': len(self._spool)}
+
+    def write(self, message):
+        record = message.record
+        fields = encode_record(record)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()  # forked: the parent's records, connection and thread are not ours
+            spool = self._spool
+            if len(spool) >= self.spool_size:
+                spool.popleft()
+                self.dropped += 1
+            spool.append(fields)
+            if record['level'].no >= self.flush_level:
+                self._urgent = True
+                self._wakeup.set()
+            elif len(spool) >= self.batch_size:
+                self._wakeup.set()
+
+    def send_pending(self, timeout: float = None) -> bool:
+        """ Send spooled records now, retrying the connection at once; False
+            if they could not all be sent within `timeout` (default: the
+            sink's `timeout`). """
+        if self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        self._retry_at = 0.0
+        while self._spool or self._busy:
+            if not self._thread.is_alive() or time.monotonic() >= deadline:
+                return False
+            self._urgent = True
+            self._wakeup.set()
+            time.sleep(0.001)
+        return True
+
+    def stop(self):
+        """ Try once more to send what is spooled, then close the connection. """
+        if self._pid != os.getpid():
+            return
+        self._stopping = True
+        self._urgent = True
+        self._retry_at = 0.0
+        self._wakeup.set()
+        self._thread.join()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        try:
+            while True:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                self._busy = True
+                now = time.monotonic()
+                if self._urgent or now - last_flush >= self.flush_interval:
+                    self._urgent = False
+                    last_flush = now
+                    self._send_spool(partial=True)
+                else:
+                    self._send_spool(partial=False)
+                self._busy = False
+                if self._stopping:
+                    return
+        finally:
+            self._busy = False
+            self._close()
+
+    def _send_spool(self, partial: bool):
+        spool = self._spool
+        while len(spool) >= (1 if partial else self.batch_size):
+            if self._socket is None:
+                if time.monotonic() < self._retry_at:
+                    return
+                try:
+                    self._socket = self._connect()
+                except OSError:
+                    self._retry_later()
+                    return
+            with self._lock:
+                batch = [spool.popleft() for _ in range(min(len(spool), self.batch_size))]
+            try:
+                self._socket.sendall(encode_batch(batch))
+            except OSError:
+                self._close()
+                with self._lock:
+                    spool.extendleft(reversed(batch))
+                    while len(spool) > self.spool_size:
+                        spool.popleft()
+                        self.dropped += 1
+                self._retry_later()
+                return
+            self.sent += len(batch)
+            self.batches += 1
+            self._delay = self.backoff[0]
+
+    def _connect(self) -> socket.socket:
+        if self.family == socket.AF_UNIX:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.address)
+            except OSError:
+                sock.close()
+                raise
+        else:
+            sock = socket.create_connection(self.address, self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.batches or self.reconnects:
+            self.reconnects += 1
+        return sock
+
+    def _retry_later(self):
+        self._retry_at = time.monotonic() + self._delay
+        self._delay = min(self._delay * 2, self.backoff[1])
+
+    def _close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class LogReceiver:
+    """ Accept `RemoteSink` producers on `address` (as for `RemoteSink`; TCP
+        port 0 picks a free port, see `address` once started) and write their
+        records with the handlers of `logger`, from a single thread.
+
+        A connection sending a frame larger than `max_frame_size` bytes, or
+        one that cannot be decoded or written, is reported on stderr and
+        closed; other producers are not affected. """
+
+    def __init__(self, address, logger, max_frame_size: int = 16 * 1024 * 1024):
+        self.received: int = 0
+        self.batches: int = 0
+        self.connections: int = 0
+        self.rejected: int = 0  # connections closed on a bad frame
+        self.max_frame_size = max_frame_size
+        self._core = logger._core
+
+        self.family, address = parse_address(address)
+        if self.family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.unlink(address)  # left over by a writer that was killed
+            self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._listener.bind(address)
+            os.chmod(address, 0o600)
+            self.address = address
+        else:
+            self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._listener.bind(address)
+            self.address = self._listener.getsockname()[:2]
+        self._listener.listen(128)
+        self._listener.setblocking(False)
+        self._stopping = False
+        self._wakeup_read, self._wakeup_write = socket.socketpair()
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._run, daemon=True, name='autosysloguru-receiver')
+        self._thread.start()
+
+    def stats(self) -> Dict:
+        return {'received': self.received, 'batches': self.batches, 'connections': self.connections,
+                'rejected': self.rejected}
+
+    def stop(self):
+        """ Read what connected producers already sent, then close everything. """
+        self._stopping = True
+        self._wakeup_write.send(b'\0')
+        self._thread.join()
+        self._wakeup_read.close()
+        self._wakeup_write.close()
+        if self.family == socket.AF_UNIX:
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+    def _run(self):
+        selector = self._selector
+        buffers: Dict = {}
+        try:
+            while True:
+                events = selector.select(0 if self._stopping else None)
+                if self._stopping and not events:
+                    return
+                for key, _ in events:
+                    sock = key.fileobj
+                    if sock is self._listener:
+                        self._accept(buffers)
+                    elif sock is self._wakeup_read:
+                        sock.recv(64)
+                    else:
+                        self._read(sock, buffers)
+        finally:
+            for sock in buffers:
+                sock.close()
+            self._listener.close()
+            selector.close()
+
+    def _accept(self, buffers: Dict):
+        try:
+            sock, _ = self._listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        buffers[sock] = bytearray()
+        self._selector.register(sock, selectors.EVENT_READ)
+        self.connections += 1
+
+    def _read(self, sock, buffers: Dict):
+        try:
+            data = sock.recv(1 << 18)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._close(sock, buffers)
+            return
+        buffer = buffers[sock]
+        buffer += data
+        offset = 0
+        try:
+            while len(buffer) - offset >= _HEADER.size:
+                version, size = _HEADER.unpack_from(buffer, offset)
+                if version != WIRE_VERSION:
+                    raise ValueError(f'frame format version {version}, expected {WIRE_VERSION}')
+                if size > self.max_frame_size:
+                    raise ValueError(f'frame of {size} bytes, above max_frame_size ({self.max_frame_size})')
+                end = offset + _HEADER.size + size
+                if len(buffer) < end:
+                    break
+                self._emit_batch(decode_batch(bytes(buffer[offset + _HEADER.size:end])))
+                offset = end
+        except Exception:
+            self._reject(sock, buffers)
+            return
+        del buffer[:offset]
+
+    def _reject(self, sock, buffers: Dict):
+        """ Report the current exception and close the connection it came from. """
+        self.rejected += 1
+        try:
+            peer = sock.getpeername()
+        except OSError:
+            peer = None
+        self._close(sock, buffers)
+        report_error(f'receiver ({peer or self.address})', 'Bad frame, the connection was closed')
+
+    def _close(self, sock, buffers: Dict):
+        self._selector.unregister(sock)
+        del buffers[sock]
+        sock.close()
+
+    def _emit_batch(self, records: List):
+        self.batches += 1
+        core = self._core
+        for fields in records:
+            # records replayed from a RingBuffer are below the handlers' level on purpose
+            if fields[4] >= core.min_level or RING_KEY in fields[16]:
+                emit_record(core, fields)
+            self.received += 1
+
+
+def emit_record(core, fields: Sequence):
+    """ Build the loguru record for `fields` (see `encode_record()`) and
+        hand it to the handlers of `core`, as loguru's _log() would do,
+        without its frame inspection. The patcher of `core` (`configure()`)
+        is applied, not the one of the producing logger's `patch()`. """
+    (timestamp, utcoffset, elapsed, level_name, level_no, message, name, module, function, line,
+     file_name, file_path, process_id, process_name, thread_id, thread_name, extra,
+     exception) = fields
+    level = core.levels.get(level_name)
+    if level is None or level.no != level_no:
+        level_id, icon = None, ' '
+    else:
+        level_id, icon = level_name, level.icon
+    if exception is not None:
+        # rendered by the producer, where the frames were
+        message = f'{message}\n{exception.rstrip()}'
+    record = {
+        'elapsed': timedelta(seconds=elapsed),
+        'exception': None,
+        'extra': {**core.extra, **extra},
+        'file': RecordFile(file_name, file_path),
+        'function': function,
+        'level': RecordLevel(level_name, level_no, icon),
+        'line': line,
+        'message': message,
+        'module': module,
+        'name': name,
+        'process': RecordProcess(process_id, process_name),
+        'thread': RecordThread(thread_id, thread_name),
+        'time': datetime.fromtimestamp(timestamp, _timezone(utcoffset)),
+    }
+    if core.patcher:
+        core.patcher(record)
+    for handler in core.handlers.values():
+        handler.emit(record, level_id, False, False, None)
+
+
+def main():
+    import argparse
+
+    from . import AutoSysLogger
+
+    parser = argparse.ArgumentParser(description='Print records sent by RemoteSink to stderr.')
+    parser.add_argument('address', help="Unix socket path or tcp://host:port")
+    args = parser.parse_args()
+    log = AutoSysLogger(level='TRACE', propagate=False)
+    receiver = LogReceiver(args.address, log)
+    print(f'listening on {receiver.address}', file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        receiver.stop()
+        log.remove()
+
+
+if __name__ == '__main__':
+    main()
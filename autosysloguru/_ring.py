@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+""" Keeping low-level context in memory for `AutoSysLogger.ring_buffer()`.
+
+    Calls below the level of every handler return early (see
+    _update_min_level); with a ring buffer, those at or above its level are
+    captured instead: a tuple of the message, its arguments and the caller's
+    frame details goes into a preallocated list of `size` slots, overwriting
+    the oldest.
+    No record is built until the buffer is dumped, when an ERROR record is
+    logged, `dump()` is called or, if enabled, `signum` is received; the
+    records are then written by the logger's handlers, oldest first, before
+    the record that triggered the dump.
+
+    Messages are only formatted for the records that are dumped, so the
+    arguments stay referenced until their slot is overwritten or dumped;
+    captured keyword arguments other than plain scalars are written as a
+    bounded repr. Exceptions are rendered when captured, before their
+    traceback is gone. Replayed records carry the `ring_buffer` extra key,
+    which `AutoSysLevelChangeFilter` lets through.
+    """
+import itertools
+import os
+import reprlib
+import signal
+import sys
+import threading
+import time
+import traceback
+from multiprocessing import current_process
+from typing import Dict, Optional, Tuple
+
+from loguru._logger import start_time
+
+from ._common import report_error
+from ._remote import RING_KEY, emit_record
+
+
+_repr = reprlib.Repr()
+_repr.maxstring = _repr.maxother = 200
+
+
+class RingBuffer:
+    """ The last `size` records from `level` up that no handler accepts,
+        written by the handlers of `core` when a record at `dump_level` or
+        above is logged, when `signum` is received or when `dump()` is
+        called.
+
+        No signal handler is installed unless `signum` is given, and none is
+        installed outside the main thread, where Python can't set one. """
+
+    def __init__(self, core, size: int = 10000, level: int = 0, dump_level: int = 40,
+                 signum: Optional[int] = None):
+        if size < 1:
+            raise ValueError(f"Invalid ring buffer size '{size}', it should be a positive integer")
+        self.size = size
+        self.levelno = level
+        self.dump_levelno = dump_level
+        if threading.current_thread() is not threading.main_thread():
+            signum = None
+        self.signum = signum
+        self.dumps: int = 0
+        self.dumped: int = 0
+        self._core = core
+        self._slots = [None] * size
+        self._sequence = itertools.count()  # next() is atomic under the GIL
+        self._dump_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._previous_handler = None
+        self._thread = None
+
+        if signum is not None:
+            self._previous_handler = signal.signal(signum, self._on_signal)
+            self._thread = threading.Thread(target=self._run, daemon=True, name='autosysloguru-ring-buffer')
+            self._thread.start()
+
+    def capture(self, level_name: str, levelno: int, message, args: Tuple, kwargs: Dict, options: Tuple, frame):
+        """ Keep one call (`frame` is the caller's). """
+        if levelno < self.levelno:
+            return
+        exception = options[0]
+        if exception:
+            # the traceback will be gone by the time of the dump
+            exception = _render_exception(exception)
+        else:
+            exception = None
+        code = frame.f_code
+        thread = threading.current_thread()
+        sequence = next(self._sequence)
+        self._slots[sequence % self.size] = (
+            sequence, time.time(), level_name, levelno, message, args, kwargs, options[3], options[6],
+            options[-1], frame.f_globals.get('__name__'), code.co_name, frame.f_lineno, code.co_filename,
+            thread.ident, thread.name, exception)
+
+    def __len__(self):
+        return sum(1 for entry in self._slots if entry is not None)
+
+    def dump(self) -> int:
+        """ Write and forget the buffered records; returns their number. """
+        with self._dump_lock:
+            slots, self._slots = self._slots, [None] * self.size
+            entries = sorted((entry for entry in slots if entry is not None), key=lambda entry: entry[0])
+            if not entries:
+                return 0
+            process_id, process_name = os.getpid(), current_process().name
+            enabled = self._core.enabled
+            started = start_time.timestamp()
+            for entry in entries:
+                if enabled.get(entry[10]) is False:  # logger.disable(name)
+                    continue
+                emit_record(self._core, _fields(entry, started, process_id, process_name))
+            self.dumps += 1
+            self.dumped += len(entries)
+            return len(entries)
+
+    def stats(self) -> Dict:
+        return {'size': self.size, 'buffered': len(self), 'dumps': self.dumps, 'dumped': self.dumped}
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None and threading.current_thread() is not self._thread:
+            self._thread.join()
+        if self.signum is not None and signal.getsignal(self.signum) == self._on_signal:
+            signal.signal(self.signum, self._previous_handler or signal.SIG_DFL)
+
+    def _on_signal(self, signum, frame):
+        # only wake the thread: no logging lock is taken from a signal handler
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._stopped:
+                return
+            try:
+                self.dump()
+            except Exception:
+                report_error('ring buffer')
+
+
+def _format(message, args: Tuple, kwargs: Dict, lazy: bool, capture: bool, extra: Dict) -> Tuple:
+    """ The message and `extra` of a captured call, as loguru's _log() would make them. """
+    if not (args or kwargs):
+        return str(message), extra
+    if lazy:
+        args = [arg() for arg in args]
+        kwargs = {key: value() for key, value in kwargs.items()}
+    if capture and kwargs:
+        extra = {**extra, **{key: _bounded(value) for key, value in kwargs.items()}}
+    try:
+        message = message.format(*args, **kwargs)
+    except Exception:
+        # loguru would raise in the caller; the ring buffer must not
+        message = f'{message} {_repr.repr(args)} {_repr.repr(kwargs)}'
+    return message, extra
+
+
+def _bounded(value):
+    """ `value` if it is a plain scalar, otherwise its repr cut to a bounded length. """
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return _repr.repr(value)
+
+
+def _fields(entry: Tuple, started: float, process_id: int, process_name: str) -> Tuple:
+    """ The `encode_record()` tuple of a captured call. """
+    (_, timestamp, level_name, levelno, message, args, kwargs, lazy, capture, extra, name, function, line, path,
+     thread_id, thread_name, exception) = entry
+    message, extra = _format(message, args, kwargs, lazy, capture, extra)
+    file_name = os.path.basename(path)
+    return (timestamp, time.localtime(timestamp).tm_gmtoff, timestamp - started, level_name, levelno,
+            message, name, os.path.splitext(file_name)[0], function, line, file_name, path,
+            process_id, process_name, thread_id, thread_name, {**extra, RING_KEY: True}, exception)
+
+
+def _render_exception(exception) -> str:
+    if isinstance(exception, BaseException):
+        exception = (type(exception), exception, exception.__traceback__)
+    elif not isinstance(exception, tuple):
+        exception = sys.exc_info()
+    return ''.join(traceback.format_exception(*exception))
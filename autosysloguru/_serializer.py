@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+""" JSON-lines serialization with a fixed field layout.
+
+    The record-to-dict function is compiled once per field layout, and
+    `orjson` is used for encoding when it is installed (stdlib `json`
+    otherwise), imported when the first sink is created.
+    """
+import json
+import traceback
+from typing import Callable, Dict, Sequence
+
+from loguru._handler import Message
+
+from ._common import target_methods
+
+
+# field name -> expression evaluated against the loguru `record` dict
+FIELDS: Dict[str, str] = {
+    'time': "record['time'].isoformat()",
+    'timestamp': "record['time'].timestamp()",
+    'elapsed': "record['elapsed'].total_seconds()",
+    'level': "record['level'].name",
+    'levelno': "record['level'].no",
+    'message': "record['message']",
+    'name': "record['name']",
+    'module': "record['module']",
+    'function': "record['function']",
+    'line': "record['line']",
+    'file': "record['file'].name",
+    'path': "record['file'].path",
+    'process': "record['process'].id",
+    'process_name': "record['process'].name",
+    'thread': "record['thread'].id",
+    'thread_name': "record['thread'].name",
+    'extra': "record['extra']",
+    'exception': "format_exception(record['exception'])",
+}
+
+DEFAULT_FIELDS = ('time', 'level', 'message', 'name', 'function', 'line', 'extra', 'exception')
+
+
+def format_exception(exception):
+    if exception is None:
+        return None
+    type_, value, tb = exception
+    return ''.join(traceback.format_exception(type_, value, tb))
+
+
+def compile_layout(fields: Sequence[str]):
+    """ Return a function building the dict for `fields` from a loguru record. """
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown JSON fields {unknown}, expected some of {list(FIELDS)}')
+    source = 'lambda record: {' + ', '.join(f'{field!r}: {FIELDS[field]}' for field in fields) + '}'
+    return eval(source, {'format_exception': format_exception})
+
+
+_encoder = None
+
+
+def get_encoder() -> Callable:
+    """ Function encoding an object as one JSON line, `orjson` based when installed. """
+    global _encoder
+    if _encoder is None:
+        try:
+            import orjson
+        except ImportError:  # pragma: no cover - optional dependency
+            dumps = json.JSONEncoder(default=str, ensure_ascii=False).encode
+
+            def encode_json(obj) -> str:
+                return dumps(obj) + '\n'
+            _encoder = encode_json
+        else:
+            options = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+
+            def encode_orjson(obj) -> str:
+                return orjson.dumps(obj, default=str, option=options).decode()
+            _encoder = encode_orjson
+    return _encoder
+
+
+class JsonLinesSink:
+    """ Write each record as one JSON line to `target` (a loguru file sink,
+        a stream or a callable), ignoring the handler's formatted text. """
+
+    def __init__(self, target, fields: Sequence[str] = DEFAULT_FIELDS):
+        self.fields = tuple(fields)
+        self.name = getattr(target, 'name', None) or repr(target)
+        self._layout = compile_layout(self.fields)
+        self._encode = get_encoder()
+        self._target = target
+        self._write, flush = target_methods(target)
+        if flush is not None:
+            self.flush = flush  # only streams: loguru calls it after each message
+
+    def write(self, message):
+        record = message.record
+        line = Message(self._encode(self._layout(record)))
+        line.record = record
+        self._write(line)
+
+    def stop(self):
+        stop = getattr(self._target, 'stop', None)
+        if callable(stop):
+            stop()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+""" Compiled format templates for `add(..., compiled=True)`.
+
+    A loguru format string (markup included) is turned into one function
+    per level: the color tags become the level's ANSI sequences once, the
+    fields become a `%` template filled from the record, and `{time}` is
+    rendered once per second, only the fraction of a second being formatted
+    for each record. The handler itself only renders tracebacks, which
+    skips loguru's per-record markup handling and datetime formatting.
+
+    The output is the same as loguru's for the same format string. Messages
+    with color markup (`opt(colors=True)`) are rare and their colors depend
+    on the tags around `{message}`, so a colorizing handler leaves them to
+    loguru's formatting (see `TemplateSink.handler_format()`).
+    """
+import re
+import threading
+from _string import formatter_field_name_split
+from datetime import datetime as datetime_
+from datetime import timezone
+from string import Formatter
+from typing import Callable, Dict
+
+from loguru._colorizer import Colorizer, TokenType
+from loguru._datetime import pattern as _time_tokens
+from loguru._handler import Message
+
+from ._common import target_methods
+
+
+_DEFAULT_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f%z'
+_STRFTIME_DIRECTIVE = re.compile('%.')
+# fields loguru stores as str: no format() call needed without a spec
+_TEXT_FIELDS = frozenset(('message', 'name', 'function', 'module'))
+# starts the text of a handler that formatted the whole record
+_FORMATTED = '\0'
+
+
+class _Coloring(threading.local):
+    # the `ColoredMessage` the handlers are being given, set by AutoSysLogger._log()
+    message = None
+
+
+coloring = _Coloring()
+
+
+class TimeFormat:
+    """ Render a datetime like loguru's `{time:spec}`, caching everything
+        but the fraction of a second (and `x`) for the current second. """
+
+    def __init__(self, spec: str = ''):
+        self.utc = spec.endswith('!UTC')
+        if self.utc:
+            spec = spec[:-len('!UTC')]
+        self.spec = spec = spec or _DEFAULT_TIME_FORMAT
+        # static chunks, rendered once per second, around per-record fields
+        if '%' in spec:
+            self._render_chunk = datetime_.__format__
+            tokens = _STRFTIME_DIRECTIVE
+        else:
+            self._render_chunk = format
+            tokens = _time_tokens
+        chunks, placeholders, fields = [], [], []
+        start = 0
+        for match in tokens.finditer(spec):
+            token = match.group(0)
+            if token == '%f':
+                placeholder, field = '%06d', 'us'
+            elif token == 'x':
+                placeholder, field = '%d', 'int(ts) * 1000000 + us'
+            elif set(token) == {'S'}:
+                placeholder, field = f'%0{len(token)}d', f'us // {10 ** (6 - len(token))}'
+            else:
+                continue
+            chunks.append(spec[start:match.start()])
+            placeholders.append(placeholder)
+            fields.append(field)
+            start = match.end()
+        chunks.append(spec[start:])
+        self._chunks = chunks
+        self._placeholders = placeholders
+        self._values = eval(f"lambda us, ts: ({''.join(field + ', ' for field in fields)})") if fields else None
+        self._cache = (None, '')
+
+    def __call__(self, dt) -> str:
+        if self.utc:
+            dt = dt.astimezone(timezone.utc)
+        ts = dt.timestamp()
+        key = (int(ts), dt.tzinfo)
+        cache = self._cache
+        if cache[0] != key:
+            cache = self._cache = (key, self._render(dt))
+        if self._values is None:
+            return cache[1]
+        return cache[1] % self._values(dt.microsecond, ts)
+
+    def _render(self, dt) -> str:
+        def render(chunk):
+            return self._render_chunk(dt, chunk) if chunk else ''
+        if self._values is None:
+            return render(self._chunks[0])
+        text = ''.join(render(chunk).replace('%', '%%') + placeholder
+                       for chunk, placeholder in zip(self._chunks, self._placeholders))
+        return text + render(self._chunks[-1]).replace('%', '%%')
+
+
+def compile_template(template: str) -> Callable:
+    """ Function `(record, exception) -> str` for a str.format template
+        (already colorized or stripped, see `Colorizer.prepare_format()`). """
+    text = ''
+    values = []
+    namespace = {}
+    for literal, field, spec, conversion in Formatter().parse(template):
+        text += literal.replace('%', '%%')
+        if field is None:
+            continue
+        if '{' in (spec or ''):
+            # nested fields in the spec: leave it to str.format
+            return lambda record, exception: template.format_map({**record, 'exception': exception})
+        text += '%s'
+        root, rest = formatter_field_name_split(field)
+        rest = list(rest)
+        if root == 'exception' and not rest and not spec and not conversion:
+            values.append('exception')
+            continue
+        if root == 'time' and not rest and not conversion:
+            name = f'time_{len(namespace)}'
+            namespace[name] = TimeFormat(spec)
+            values.append(f"{name}(record['time'])")
+            continue
+        value = 'exception' if root == 'exception' else f'record[{root!r}]'
+        for is_attribute, key in rest:
+            # names from the format string only ever appear as literals in the source
+            value = f'getattr({value}, {key!r})' if is_attribute else f'{value}[{key!r}]'
+        if conversion:
+            value = {'r': 'repr', 's': 'str', 'a': 'ascii'}[conversion] + f'({value})'
+        if spec or conversion or root not in _TEXT_FIELDS or rest:
+            value = f'format({value}, {spec or ""!r})'
+        values.append(value)
+    source = f"lambda record, exception: {text!r} % ({''.join(value + ', ' for value in values)})"
+    return eval(source, namespace)
+
+
+class TemplateSink:
+    """ Write records to `target` (a stream, a loguru file sink or a
+        callable) formatted with the compiled `format`, colored with the
+        ANSI codes of `ansi_codes` (a core's `levels_ansi_codes`) when
+        `colorize` is true. The handler must use `handler_format` and the
+        same `colorize`, so tracebacks are rendered by loguru as usual. """
+
+    def __init__(self, target, format: str, colorize: bool, ansi_codes: Dict):
+        self.format = format
+        self.colorize = colorize
+        self.name = getattr(target, 'name', None) or repr(target)
+        # what loguru would use to pick the traceback characters
+        self.encoding = getattr(target, 'encoding', None) if hasattr(target, 'write') else 'utf8'
+        # loguru's terminator and exception field
+        self._colored = Colorizer.prepare_format(format + '\n{exception}')
+        self._loguru_format = _FORMATTED + format + '\n{exception}'
+        self._ansi_codes = ansi_codes
+        self._stripped = compile_template(self._colored.strip())
+        self._compiled: Dict = {}
+        self._target = target
+        self._write, flush = target_methods(target)
+        if flush is not None:
+            self.flush = flush  # only streams: loguru calls it after each message
+
+    def handler_format(self, record) -> str:
+        """ Format of the handler: loguru only renders the exception (a
+            format function gets no terminator appended), or the whole record
+            for a message with color markup when colorizing. """
+        colored = coloring.message
+        if colored is not None and self.colorize and colored.stripped == record['message'] \
+                and any(token[0] != TokenType.TEXT for token in colored.tokens):
+            return self._loguru_format
+        return '{exception}'
+
+    def _formatter(self, level_name: str) -> Callable:
+        ansi = self._ansi_codes.get(level_name, '')
+        compiled = self._compiled.get(level_name)
+        if compiled is None or compiled[0] != ansi:
+            compiled = self._compiled[level_name] = (ansi, compile_template(self._colored.colorize(ansi)))
+        return compiled[1]
+
+    def write(self, message):
+        record = message.record
+        exception = message  # see handler_format()
+        if message[:1] == _FORMATTED:
+            text = message[1:]
+        elif self.colorize:
+            text = self._formatter(record['level'].name)(record, exception)
+        else:
+            text = self._stripped(record, exception)
+        line = Message(text)
+        line.record = record
+        self._write(line)
+
+    def stop(self):
+        stop = getattr(self._target, 'stop', None)
+        if callable(stop):
+            stop()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+""" Per-function latency histograms for `logger_wraps(timing=True)`.
+
+    Durations are counted in log-linear buckets (8 sub-buckets per power of
+    two, so percentiles are within ~12% of the true value) and summarized as
+    count, p50/p95/p99 and max, instead of one log line per call.
+    """
+import threading
+from math import ceil
+from typing import List
+from weakref import WeakSet
+
+try:
+    from time import perf_counter_ns, process_time_ns
+except ImportError:  # Python < 3.7
+    from time import perf_counter, process_time
+
+    def perf_counter_ns() -> int:
+        return int(perf_counter() * 1e9)
+
+    def process_time_ns() -> int:
+        return int(process_time() * 1e9)
+
+
+_SUB_BITS: int = 3
+_SUB: int = 1 << _SUB_BITS
+_BUCKETS: int = (64 - _SUB_BITS) * _SUB + _SUB
+
+
+def bucket_index(ns: int) -> int:
+    """ Bucket of a non-negative duration in nanoseconds. """
+    shift = ns.bit_length() - _SUB_BITS - 1
+    if shift <= 0:
+        return ns
+    return shift * _SUB + (ns >> shift)
+
+
+def bucket_upper(index: int) -> int:
+    """ Largest duration (ns) counted in bucket `index`. """
+    if index < 2 * _SUB:
+        return index
+    shift = index // _SUB - 1
+    return ((index - shift * _SUB + 1) << shift) - 1
+
+
+def format_ns(ns: int) -> str:
+    for unit, scale in (('s', 1e9), ('ms', 1e6), ('us', 1e3)):
+        if ns >= scale:
+            return f'{ns / scale:.3g}{unit}'
+    return f'{ns}ns'
+
+
+class LatencyHistogram:
+    """ Counts of durations (ns) in fixed log-linear buckets. """
+
+    __slots__ = ('counts', 'count', 'max')
+
+    def __init__(self):
+        self.counts: List[int] = [0] * _BUCKETS
+        self.count: int = 0
+        self.max: int = 0
+
+    def record(self, ns: int):
+        self.counts[bucket_index(ns)] += 1
+        self.count += 1
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, q: float) -> int:
+        """ Upper bound of the bucket holding the `q` quantile (0 < q <= 1). """
+        rank = ceil(q * self.count)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bucket_upper(index), self.max)
+        return self.max
+
+    def summary(self) -> str:
+        return 'p50={} p95={} p99={} max={}'.format(
+            *(format_ns(self.percentile(q)) for q in (0.5, 0.95, 0.99)), format_ns(self.max))
+
+
+class TimingStats:
+    """ Wall and CPU time histograms for one decorated function.
+
+        `record()` returns True when `interval` seconds have passed since the
+        last summary, so the caller can emit one. """
+
+    def __init__(self, name: str, level, interval: float = None):
+        self.name = name
+        self.level = level
+        self.interval_ns = None if interval is None else int(interval * 1e9)
+        self._lock = threading.Lock()
+        self._wall = LatencyHistogram()
+        self._cpu = LatencyHistogram()
+        self._last_report_ns: int = 0
+
+    def record(self, wall_ns: int, cpu_ns: int, now_ns: int) -> bool:
+        with self._lock:
+            self._wall.record(wall_ns)
+            self._cpu.record(cpu_ns)
+            if not self._last_report_ns:
+                self._last_report_ns = now_ns
+            elif self.interval_ns is not None and now_ns - self._last_report_ns >= self.interval_ns:
+                self._last_report_ns = now_ns
+                return True
+        return False
+
+    @property
+    def pending(self) -> bool:
+        """ Whether calls were recorded since the last summary. """
+        return self._wall.count > 0
+
+    def take_summary(self) -> str:
+        """ Summarize and reset the histograms; '' if nothing was recorded. """
+        with self._lock:
+            wall, cpu = self._wall, self._cpu
+            if not wall.count:
+                return ''
+            self._wall, self._cpu = LatencyHistogram(), LatencyHistogram()
+        return f'count={wall.count} wall {wall.summary()} cpu {cpu.summary()}'
+
+
+# the TimingStats of live logger_wraps functions, summarized at exit
+registry: WeakSet = WeakSet()
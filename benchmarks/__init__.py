@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+""" Logging overhead benchmarks for autosysloguru.
+
+    Run from the repository root, e.g.
+
+        python -m benchmarks.bench_level_filter
+
+    `python -m benchmarks.suite` runs the main logging paths and writes the
+    results as JSON, to compare versions (`--compare before.json`).
+    """
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+""" Benchmark for multi-process logging: every process appending to the
+    same file versus one aggregating writer (`AutoSysLogger.aggregate()`).
+
+    Each run forks 1 to 32 processes sharing `--records` records (200k by
+    default) and reports records/sec from the first fork until every
+    record is on disk, plus the number of open log file handles.
+
+        python -m benchmarks.bench_aggregate [--records N] [--processes 1,2,4,...]
+    """
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger
+
+
+def _new_logger(**kwargs) -> AutoSysLogger:
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[lambda message: None], **kwargs)
+    log.remove()
+    return log
+
+
+def _direct_worker(path: str, records: int):
+    log = _new_logger()
+    log.add(path, format='{message}')
+    for i in range(records):
+        log.info('benchmark line {}', i)
+    log.remove()
+
+
+def _remote_worker(log: AutoSysLogger, records: int):
+    # forked from the writer: the handlers were replaced by a RemoteSink
+    for i in range(records):
+        log.info('benchmark line {}', i)
+    log.complete()
+
+
+def _run(processes, target, args):
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=target, args=args) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def bench_direct(directory: str, processes: int, records: int) -> float:
+    path = os.path.join(directory, 'direct.log')
+    start = time.perf_counter()
+    _run(processes, _direct_worker, (path, records // processes))
+    return records / (time.perf_counter() - start)
+
+
+def bench_aggregated(directory: str, processes: int, records: int) -> float:
+    log = _new_logger()
+    log.add(os.path.join(directory, 'aggregated.log'), format='{message}', buffered=True)
+    receiver = log.aggregate(os.path.join(directory, 'writer.sock'))
+    total = records // processes * processes
+    start = time.perf_counter()
+    _run(processes, _remote_worker, (log, records // processes))
+    while receiver.received < total:
+        time.sleep(0.001)
+    log.stop_aggregating()
+    log.remove()
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--processes', default='1,2,4,8,16,32')
+    args = parser.parse_args()
+
+    print(f'{args.records} records, cpus={os.cpu_count()}')
+    print(f"  {'processes':>9} {'direct':>14} {'aggregated':>14}   file handles")
+    for processes in map(int, args.processes.split(',')):
+        with tempfile.TemporaryDirectory() as directory:
+            direct = bench_direct(directory, processes, args.records)
+            aggregated = bench_aggregated(directory, processes, args.records)
+        print(f'  {processes:>9} {direct:>14,.0f} {aggregated:>14,.0f}   {processes} -> 1')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+""" Benchmark for the `output.log` file sink.
+
+    Writes N lines (1M by default) through the current configuration
+    (loguru's line-buffered FileSink with size rotation), the buffered sink
+    and the memory-mapped sink, reporting throughput and write syscalls
+    (from /proc/self/io, Linux only), and the binary format with the
+    size of its file against the text one.
+
+        python -m benchmarks.bench_file_sink [--lines N]
+    """
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict
+
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger
+
+
+def io_counters() -> Dict:
+    try:
+        with open('/proc/self/io') as file:
+            return {key: int(value) for key, value in (line.split(': ') for line in file)}
+    except OSError:
+        return {}
+
+
+def bench(lines: int, **options) -> Dict:
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[lambda message: None])
+    log.remove()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'output.bin' if options.get('binary') else 'output.log')
+        log.add(path, format='{message}', rotation='500 MB', **options)
+        before = io_counters()
+        start = time.perf_counter()
+        for i in range(lines):
+            log.info('benchmark line {}', i)
+        log.remove()
+        elapsed = time.perf_counter() - start
+        after = io_counters()
+        size = os.path.getsize(path)
+    result = {'lines_per_sec': lines / elapsed, 'file_size': size}
+    if before:
+        result['write_syscalls'] = after['syscw'] - before['syscw']
+        result['bytes_written'] = after['wchar'] - before['wchar']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1000000)
+    args = parser.parse_args()
+
+    cases = [
+        ('default', {}),
+        ('buffered', {'buffered': True}),
+        ('buffered, nonblocking', {'buffered': True, 'nonblocking': True, 'overflow': 'block'}),
+        ('mapped', {'mapped': True}),
+        ('binary', {'binary': True}),
+    ]
+    for label, options in cases:
+        result = bench(args.lines, **options)
+        syscalls = result.get('write_syscalls', 'n/a')
+        print(f"  {label:<22} {result['lines_per_sec']:>12,.0f} lines/sec  {syscalls:>10} write syscalls"
+              f"  {result['file_size'] / 1e6:>8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+""" Benchmark for the default stdout handler format.
+
+    Compares loguru's formatting of
+    '<green>{time}</green> <level>{message}</level>' with the compiled
+    template (`compiled=True`), colored and plain, writing to a stream
+    that discards its input: through `logger.info()` and through the
+    handler alone, for one record.
+
+        python -m benchmarks.bench_format [--records N]
+    """
+import argparse
+import time
+
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger
+
+FORMAT = '<green>{time}</green> <level>{message}</level>'
+
+
+class NullTerminal:
+    """ A terminal that drops what it is given. """
+
+    def __init__(self, tty: bool):
+        self.tty = tty
+
+    def isatty(self):
+        return self.tty
+
+    def write(self, message):
+        pass
+
+    def flush(self):
+        pass
+
+
+def bench(records: int, tty: bool, **options) -> float:
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[lambda message: None])
+    log.remove()
+    log.add(NullTerminal(tty), format=FORMAT, **options)
+    start = time.perf_counter()
+    for i in range(records):
+        log.info('benchmark record {}', i)
+    elapsed = time.perf_counter() - start
+    log.remove()
+    return records / elapsed
+
+
+def bench_handler(records: int, tty: bool, **options) -> float:
+    """ Records/sec through the handler alone, for one record built by loguru. """
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[lambda message: None])
+    log.remove()
+    captured = []
+    log.add(lambda message: captured.append(message.record), format='{message}')
+    log.info('benchmark record {}', 0)
+    log.remove()
+    record = captured[0]
+    handler_id = log.add(NullTerminal(tty), format=FORMAT, **options)
+    emit = log._core.handlers[handler_id].emit
+    start = time.perf_counter()
+    for _ in range(records):
+        emit(record, 'INFO', False, False, None)
+    elapsed = time.perf_counter() - start
+    log.remove()
+    return records / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000)
+    args = parser.parse_args()
+
+    cases = [
+        ('loguru, colorize=True', True, {'colorize': True}),
+        ('compiled, terminal', True, {'compiled': True}),
+        ('loguru, colorize=False', False, {'colorize': False}),
+        ('compiled, not a tty', False, {'compiled': True}),
+    ]
+    print(f"  {'':<24} {'logger.info()':>14} {'handler only':>14}   records/sec")
+    for label, tty, options in cases:
+        print(f'  {label:<24} {bench(args.records, tty, **options):>14,.0f} '
+              f'{bench_handler(args.records, tty, **options):>14,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+""" Import time of autosysloguru, measured with `python -X importtime`.
+
+    Each run imports the package in a fresh interpreter. The reported cost
+    is the time spent in modules that `import loguru` alone does not load,
+    i.e. what this package adds on top of its dependency; the best of
+    `--runs` is kept to filter out noise. With `--budget-ms`, exits with
+    status 1 when that cost is over budget (used in CI).
+
+        python -m benchmarks.bench_import [--runs N] [--budget-ms MS]
+    """
+import argparse
+import subprocess
+import sys
+from typing import Dict
+
+
+def import_times(module: str = 'autosysloguru') -> Dict[str, int]:
+    """ Self import time (us) of every module loaded by `import module`. """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                            universal_newlines=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    import_times()  # warm up the bytecode cache
+    baseline = set(import_times('loguru'))
+    runs = [import_times() for _ in range(args.runs)]
+    total = min(sum(times.values()) for times in runs) / 1000
+    own = min(sum(us for name, us in times.items() if name not in baseline) for times in runs) / 1000
+    optional = sorted({name for times in runs for name in times if name in ('orjson', 'zstandard')})
+
+    print(f'import autosysloguru (best of {args.runs})')
+    print(f'  total            {total:>8.1f} ms')
+    print(f'  without loguru   {own:>8.1f} ms')
+    print(f"  optional imports {', '.join(optional) or 'none'}")
+
+    if args.budget_ms is not None and own > args.budget_ms:
+        print(f'over budget: {own:.1f} ms > {args.budget_ms:.1f} ms', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
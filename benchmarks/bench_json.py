@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+""" Benchmark for the `output.json` sink.
+
+    Compares loguru's `serialize=True` with the JSON-lines serializer
+    (`json=True`), with the default and a minimal field layout.
+
+        python -m benchmarks.bench_json [--records N]
+    """
+import argparse
+import os
+import tempfile
+import time
+
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger
+from autosysloguru._serializer import get_encoder
+
+
+def bench(records: int, **options) -> float:
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[lambda message: None])
+    log.remove()
+    with tempfile.TemporaryDirectory() as directory:
+        log.add(os.path.join(directory, 'output.json'), **options)
+        start = time.perf_counter()
+        for i in range(records):
+            log.bind(request=i).info('benchmark record {}', i)
+        log.remove()
+        return records / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"encoder: {get_encoder().__name__}")
+    cases = [
+        ('serialize=True', {'serialize': True}),
+        ('json=True', {'json': True}),
+        ('json=True, 3 fields', {'json': True, 'json_fields': ('time', 'level', 'message')}),
+        ('json=True, buffered', {'json': True, 'buffered': True}),
+    ]
+    for label, options in cases:
+        print(f'  {label:<22} {bench(args.records, **options):>12,.0f} records/sec')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+""" Microbenchmark for AutoSysLevelChangeFilter.
+
+    Compares the original per-record level lookup with the cached numeric
+    threshold, both called directly and with many handlers sharing one
+    filter instance.
+
+        python -m benchmarks.bench_level_filter [--records N] [--handlers N]
+    """
+import argparse
+import time
+
+from loguru import _Core, _Logger
+
+from autosysloguru import AutoSysLevelChangeFilter
+
+
+class LookupLevelFilter:
+    """ The original filter: resolves the level name for every record. """
+
+    def __init__(self, level, logger):
+        self.level = level
+        self._logger = logger
+
+    def __call__(self, record):
+        levelno = self._logger.level(self.level).no
+        return record['level'].no >= levelno
+
+
+def _null_sink(message):
+    pass
+
+
+def bench_filter_calls(level_filter, records: int) -> float:
+    """ Records/sec for calling the filter directly. """
+    record = {'level': _Core().levels['INFO']}
+    start = time.perf_counter()
+    for _ in range(records):
+        level_filter(record)
+    return records / (time.perf_counter() - start)
+
+
+def bench_handlers(filter_factory, records: int, handlers: int) -> float:
+    """ Records/sec through a logger with many handlers sharing one filter. """
+    log = _Logger(_Core(), None, 0, False, False, False, False, True, None, {})
+    level_filter = filter_factory(log)
+    for _ in range(handlers):
+        log.add(_null_sink, filter=level_filter, level=0, format='{message}')
+    start = time.perf_counter()
+    for _ in range(records):
+        log.debug('benchmark')
+    return records / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--handlers', type=int, default=32)
+    args = parser.parse_args()
+
+    log = _Logger(_Core(), None, 0, False, False, False, False, True, None, {})
+    filters = {
+        'lookup (before)': lambda log: LookupLevelFilter('INFO', log),
+        'cached (after)': lambda log: AutoSysLevelChangeFilter('INFO', log),
+    }
+
+    print(f'filter call only ({args.records * 10} records)')
+    for name, factory in filters.items():
+        rate = bench_filter_calls(factory(log), args.records * 10)
+        print(f'  {name:<16} {rate:>14,.0f} records/sec')
+
+    print(f'{args.handlers} handlers sharing one filter ({args.records} records)')
+    for name, factory in filters.items():
+        rate = bench_handlers(factory, args.records, args.handlers)
+        print(f'  {name:<16} {rate:>14,.0f} records/sec')
+
+
+if __name__ == '__main__':
+    main()
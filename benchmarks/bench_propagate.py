@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+""" Microbenchmark for PropagateHandler.
+
+    Sends records through a stdlib logger tree of NullHandlers, comparing the
+    original per-emit import/getLogger handler with the cached one, with and
+    without batching, and with the target level disabled.
+
+        python -m benchmarks.bench_propagate [--records N]
+    """
+import argparse
+import logging
+import time
+from logging import Handler, NullHandler
+
+from autosysloguru import PropagateHandler
+
+
+class LookupPropagateHandler(Handler):
+    """ The original handler: imports and resolves the logger per record. """
+
+    def emit(self, record):
+        import logging
+        logging.getLogger(record.name).handle(record)
+
+
+def _tree(name: str, level: int):
+    for node in (name, name + '.a', name + '.a.b'):
+        logging.getLogger(node).addHandler(NullHandler())
+    logging.getLogger(name).propagate = False
+    logging.getLogger(name).setLevel(level)
+    return name + '.a.b'
+
+
+def bench(handler: Handler, name: str, records: int) -> float:
+    record = logging.getLogger(name).makeRecord(name, logging.INFO, __file__, 1, 'bench', (), None)
+    start = time.perf_counter()
+    for _ in range(records):
+        handler.handle(record)
+    handler.flush()
+    return records / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=200000)
+    args = parser.parse_args()
+
+    enabled = _tree('bench_enabled', logging.DEBUG)
+    disabled = _tree('bench_disabled', logging.WARNING)
+    cases = [
+        ('lookup (before)', LookupPropagateHandler(), enabled),
+        ('cached (after)', PropagateHandler(), enabled),
+        ('cached, batch=64', PropagateHandler(batch_size=64), enabled),
+        ('lookup, disabled', LookupPropagateHandler(), disabled),
+        ('cached, disabled', PropagateHandler(), disabled),
+    ]
+    for label, handler, name in cases:
+        rate = bench(handler, name, args.records)
+        print(f'  {label:<18} {rate:>14,.0f} records/sec')
+
+
+if __name__ == '__main__':
+    main()
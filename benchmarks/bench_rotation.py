@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+""" Benchmark for the `output.json` file policy.
+
+    Logs N records with the previous configuration (loguru `serialize=True`
+    with `rotation='1 KB'` to force a new file per run) and with the per-run
+    policy (`per_run=True`, size rotation, retention in the background),
+    counting the file system calls made on the logging thread.
+
+        python -m benchmarks.bench_rotation [--records N]
+    """
+import argparse
+import builtins
+import glob
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from loguru import _Core, _Logger
+
+from autosysloguru import AutoSysLogger
+from autosysloguru._file_sinks import maintenance
+
+
+@contextmanager
+def count_calls(counter: Counter):
+    """ Count file system calls made by the current thread. """
+    thread = threading.get_ident()
+    patched = [(os, 'rename'), (os, 'stat'), (os, 'remove'), (glob, 'glob'), (builtins, 'open')]
+    originals = [(module, name, getattr(module, name)) for module, name in patched]
+
+    def counting(name, function):
+        def wrapper(*args, **kwargs):
+            if threading.get_ident() == thread:
+                counter[name] += 1
+            return function(*args, **kwargs)
+        return wrapper
+
+    for module, name, function in originals:
+        setattr(module, name, counting(name, function))
+    try:
+        yield counter
+    finally:
+        for module, name, function in originals:
+            setattr(module, name, function)
+
+
+def bench(log, records: int):
+    counter = Counter()
+    with count_calls(counter):
+        start = time.perf_counter()
+        for i in range(records):
+            log.info('benchmark record {}', i)
+        elapsed = time.perf_counter() - start
+    log.remove()
+    maintenance.wait()
+    return records / elapsed, counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'output.json')
+
+        before = _Logger(_Core(), None, 0, False, False, False, False, True, None, {})
+        before.add(path, serialize=True, rotation='1 KB', retention='10 days')
+        rate, counter = bench(before, args.records)
+        print(f"  {'rotation=1 KB (before)':<24} {rate:>10,.0f} records/sec  {dict(counter)}")
+
+        after = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[lambda message: None])
+        after.remove()
+        after.add(path, json=True, per_run=True, rotation='100 MB', retention='10 days')
+        rate, counter = bench(after, args.records)
+        print(f"  {'per_run (after)':<24} {rate:>10,.0f} records/sec  {dict(counter)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+""" Benchmark for many threads logging through one logger.
+
+    Every thread logs N records to a file sink, through the handlers'
+    locks (the default) and with `thread_buffers()`; reports the records
+    per second over all threads (including writing what is still pending)
+    and the p50/p99 latency of one call, for each thread count.
+
+        python -m benchmarks.bench_threads [--records N] [--threads 1,4,16,64]
+    """
+import argparse
+import os
+import tempfile
+import threading
+import time
+from typing import Dict
+
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger
+from autosysloguru._timing import LatencyHistogram, format_ns, perf_counter_ns
+
+
+def bench(threads: int, records: int, directory: str, buffered: bool) -> Dict:
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[])
+    log.remove()
+    log.add(os.path.join(directory, f'threads-{threads}-{buffered}.log'), format='{time} {level} {message}')
+    if buffered:
+        log.thread_buffers()
+    histograms = [LatencyHistogram() for _ in range(threads)]
+    start_line = threading.Barrier(threads + 1)
+
+    def work(histogram):
+        record = histogram.record
+        info = log.info
+        start_line.wait()
+        for i in range(records):
+            started = perf_counter_ns()
+            info('benchmark record {}', i)
+            record(perf_counter_ns() - started)
+
+    workers = [threading.Thread(target=work, args=(histogram,)) for histogram in histograms]
+    for worker in workers:
+        worker.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    log.complete()
+    elapsed = time.perf_counter() - start
+    log.stop_thread_buffers()
+    log.remove()
+
+    merged = LatencyHistogram()
+    for histogram in histograms:
+        merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+        merged.count += histogram.count
+        merged.max = max(merged.max, histogram.max)
+    return {'records_per_sec': threads * records / elapsed,
+            'p50': merged.percentile(0.5), 'p99': merged.percentile(0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=5000, help='per thread')
+    parser.add_argument('--threads', default='1,4,16,64')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for threads in map(int, args.threads.split(',')):
+            for label, buffered in (('locking', False), ('thread_buffers', True)):
+                result = bench(threads, args.records, directory, buffered)
+                print(f"  {threads:>3} threads {label:<15} {result['records_per_sec']:>10,.0f} records/sec"
+                      f"  p50 {format_ns(result['p50']):>8}  p99 {format_ns(result['p99']):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+""" Logging overhead suite: cost per call of the main logging paths, as JSON.
+
+    Cases: a call below the handlers' level, the stdout handler (loguru's
+    formatting and `compiled=True`), file, buffered file, mapped file and
+    JSON lines sinks, `PropagateHandler`, `logger_wraps` (enabled and disabled),
+    threads sharing one file sink (locking and `thread_buffers()`), and the
+    import time. Each case keeps the
+    best of `--repeat` runs, in nanoseconds per call (per import for
+    `import`, per record over all threads for `threads_*`).
+
+        python -m benchmarks.suite [--calls N] [--repeat N] [--output results.json]
+        python -m benchmarks.suite --compare before.json [--tolerance 0.1]
+
+    With `--compare`, cases slower than the previous results by more than
+    `--tolerance` (10%) are listed and the exit status is 1.
+    """
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict
+
+import loguru
+from loguru import _Core
+
+import autosysloguru
+from autosysloguru import AutoSysLogger, PropagateHandler, logger_wraps
+from autosysloguru._timing import perf_counter_ns
+
+from .bench_format import FORMAT, NullTerminal
+from .bench_import import import_times
+
+
+def _new_logger(level: str = 'TRACE') -> AutoSysLogger:
+    log = AutoSysLogger(core=_Core(), level=level, propagate=False, handlers=[])
+    log.remove()
+    return log
+
+
+def _best(run: Callable[[int], None], calls: int, repeat: int) -> float:
+    """ Lowest ns per call of `run(calls)` over `repeat` runs. """
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter_ns()
+        run(calls)
+        best = min(best, (perf_counter_ns() - start) / calls)
+    return best
+
+
+def _logging(log) -> Callable[[int], None]:
+    def run(calls):
+        for i in range(calls):
+            log.info('benchmark record {}', i)
+    return run
+
+
+def bench_filtered_out(calls, repeat, directory):
+    log = _new_logger('SUCCESS')
+    log.add(lambda message: None, filter=log.level_filter, level=0)
+
+    def run(calls):
+        for i in range(calls):
+            log.debug('benchmark record {}', i)
+    return _best(run, calls, repeat)
+
+
+def bench_stdout(calls, repeat, directory, **options):
+    log = _new_logger()
+    log.add(NullTerminal(True), format=FORMAT, **options)
+    return _best(_logging(log), calls, repeat)
+
+
+def bench_file(calls, repeat, directory, **options):
+    log = _new_logger()
+    name = 'output.bin' if options.get('binary') else 'output.log'
+    log.add(os.path.join(directory, name), rotation='500 MB', **options)
+    try:
+        return _best(_logging(log), calls, repeat)
+    finally:
+        log.remove()
+
+
+def bench_propagate(calls, repeat, directory):
+    stdlib = logging.getLogger(__name__)  # the name of the records logged here
+    stdlib.addHandler(logging.NullHandler())
+    stdlib.propagate = False
+    log = _new_logger()
+    log.add(PropagateHandler(), format='{message}')
+    return _best(_logging(log), calls, repeat)
+
+
+def bench_logger_wraps(calls, repeat, directory, level):
+    log = _new_logger('INFO')
+    log.add(lambda message: None, filter=log.level_filter, level=0)
+    # logger_wraps logs with the module logger, resolved on the first call
+    module_logger, autosysloguru.logger = autosysloguru.logger, log
+    try:
+        @logger_wraps(level=level)
+        def wrapped(value):
+            return value
+        wrapped(0)
+    finally:
+        autosysloguru.logger = module_logger
+
+    def run(calls):
+        for i in range(calls):
+            wrapped(i)
+    return _best(run, calls, repeat)
+
+
+def bench_threads(calls, repeat, directory, threads, buffers=False):
+    log = _new_logger()
+    log.add(os.path.join(directory, f'threads-{threads}-{buffers}.log'), format='{message}')
+    if buffers:
+        log.thread_buffers()
+    per_thread = max(calls // threads, 1)
+
+    def run(calls):
+        workers = [threading.Thread(target=_logging(log), args=(per_thread,)) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        log.complete()
+    try:
+        # wall time per record over all threads
+        return _best(run, per_thread * threads, repeat)
+    finally:
+        log.stop_thread_buffers()
+        log.remove()
+
+
+def bench_import(calls, repeat, directory):
+    """ Import time (ns) of the modules loguru does not load itself. """
+    baseline = set(import_times('loguru'))
+    return min(sum(us for name, us in times.items() if name not in baseline)
+               for times in (import_times() for _ in range(repeat))) * 1000
+
+
+CASES = {
+    'filtered_out': (bench_filtered_out, {}),
+    'stdout': (bench_stdout, {'colorize': True}),
+    'stdout_compiled': (bench_stdout, {'compiled': True}),
+    'file': (bench_file, {}),
+    'file_buffered': (bench_file, {'buffered': True}),
+    'file_mapped': (bench_file, {'mapped': True}),
+    'file_binary': (bench_file, {'binary': True}),
+    'json': (bench_file, {'json': True}),
+    'propagate': (bench_propagate, {}),
+    'logger_wraps': (bench_logger_wraps, {'level': 'INFO'}),
+    'logger_wraps_disabled': (bench_logger_wraps, {'level': 'DEBUG'}),
+    'threads_1': (bench_threads, {'threads': 1}),
+    'threads_4': (bench_threads, {'threads': 4}),
+    'threads_16': (bench_threads, {'threads': 16}),
+    'threads_16_buffers': (bench_threads, {'threads': 16, 'buffers': True}),
+    'import': (bench_import, {}),
+}
+
+
+def metadata() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, universal_newlines=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    try:
+        from importlib.metadata import version
+        package_version = version('autosysloguru')
+    except Exception:
+        package_version = None
+    return {
+        'autosysloguru': package_version,
+        'commit': commit,
+        'loguru': loguru.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def run(calls: int, repeat: int, cases=None) -> Dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (bench, options) in CASES.items():
+            if cases and name not in cases:
+                continue
+            results[name] = {'ns_per_call': round(bench(calls, repeat, directory, **options), 1)}
+            print(f"  {name:<22} {results[name]['ns_per_call']:>14,.0f} ns", file=sys.stderr)
+    return {'metadata': metadata(), 'calls': calls, 'repeat': repeat, 'results': results}
+
+
+def compare(before: Dict, after: Dict, tolerance: float) -> list:
+    """ (case, before ns, after ns) of the cases slower than `tolerance` allows. """
+    slower = []
+    for name, result in after['results'].items():
+        previous = before['results'].get(name)
+        if previous and result['ns_per_call'] > previous['ns_per_call'] * (1 + tolerance):
+            slower.append((name, previous['ns_per_call'], result['ns_per_call']))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cases', default=None, help=f"comma separated, of {', '.join(CASES)}")
+    parser.add_argument('--output', default=None, help='write the results to this file (default: stdout)')
+    parser.add_argument('--compare', default=None, help='previous results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = run(args.calls, args.repeat, args.cases and args.cases.split(','))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as file:
+            before = json.load(file)
+        slower = compare(before, results, args.tolerance)
+        for name, previous, current in slower:
+            print(f'slower: {name} {previous:,.0f} -> {current:,.0f} ns ({current / previous - 1:+.0%})',
+                  file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,3 +10,34 @@
 
     Reference: https://stackoverflow.com/a/50610630
     '''
+import time
+
+import pytest
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger
+
+
+@pytest.fixture
+def new_logger():
+    """ Make `AutoSysLogger`s with their own core that do not propagate to `logging`.
+
+        The handlers are added with the logger's level filter; without handlers,
+        the logger has none at all (not even the default stderr one). """
+    def factory(*handlers, level='TRACE', **options):
+        log = AutoSysLogger(core=_Core(), level=level, propagate=False, handlers=list(handlers), **options)
+        if not handlers:
+            log.remove()
+        return log
+    return factory
+
+
+@pytest.fixture
+def wait_for():
+    """ Wait until `condition()` is true, failing the test after `timeout` seconds. """
+    def wait(condition, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, 'timed out'
+            time.sleep(0.01)
+    return wait
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+""" Tests for multi-process aggregation (RemoteSink -> LogReceiver). """
+import multiprocessing
+import os
+import socket
+
+import pytest
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger
+from autosysloguru._remote import RemoteSink
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX') or 'fork' not in multiprocessing.get_all_start_methods(),
+                                reason='needs Unix sockets and fork')
+
+RECORDS = 200
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    monkeypatch.delenv(AutoSysLogger.AGGREGATE_ENV, raising=False)
+    records = []
+    log = AutoSysLogger(core=_Core(), level='DEBUG', propagate=False, handlers=[records.append])
+    receiver = log.aggregate(str(tmp_path / 'writer.sock'))
+    yield log, receiver, records
+    log.stop_aggregating()
+    log.remove()
+
+
+def _produce(address, worker):
+    log = AutoSysLogger(core=_Core(), level='DEBUG', propagate=False, handlers=[RemoteSink(address)])
+    log = log.bind(worker=worker)
+    for i in range(RECORDS):
+        log.info('worker {} record {}', worker, i)
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        log.exception('worker {} failed', worker)
+    log.complete()
+
+
+def test_many_producers(writer, wait_for):
+    log, receiver, records = writer
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=_produce, args=(receiver.address, worker)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    wait_for(lambda: receiver.received == 4 * (RECORDS + 1))
+
+    pids = {process.pid for process in processes}
+    by_worker = {}
+    for message in records:
+        record = message.record
+        assert record['process'].id in pids
+        assert record['function'] == '_produce'
+        by_worker.setdefault(record['extra']['worker'], []).append(record)
+    for worker, worker_records in by_worker.items():
+        # each producer's records arrive in order
+        assert [r['message'] for r in worker_records[:-1]] == [f'worker {worker} record {i}' for i in range(RECORDS)]
+        assert worker_records[-1]['level'].name == 'ERROR'
+        assert 'ZeroDivisionError' in worker_records[-1]['message']
+    assert receiver.batches < len(records)
+
+
+def _forked_child(log):
+    log.info('from the child {}', os.getpid())
+    log.complete()
+
+
+def test_forked_children_send_to_writer(writer, wait_for):
+    log, receiver, records = writer
+    handlers = dict(log._core.handlers)
+    process = multiprocessing.get_context('fork').Process(target=_forked_child, args=(log,))
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    wait_for(lambda: receiver.received == 1)
+    assert records[-1].record['message'] == f'from the child {process.pid}'
+    assert records[-1].record['process'].id == process.pid
+    assert log._core.handlers == handlers  # the writer keeps its sinks
+
+
+def test_child_environment_selects_remote_sink(writer, wait_for):
+    log, receiver, records = writer
+    # a process started with the writer's environment (spawn, exec, ...)
+    import autosysloguru
+    old_address, autosysloguru._receiver_address = autosysloguru._receiver_address, None
+    try:
+        child = AutoSysLogger(core=_Core(), level='DEBUG', propagate=False, handlers=[print])
+    finally:
+        autosysloguru._receiver_address = old_address
+    assert child._state.remote is not None
+    child.info('via the environment')
+    child.remove()
+    wait_for(lambda: receiver.received == 1)
+    assert records[-1].record['message'] == 'via the environment'
+
+
+def test_unplain_extra_is_sent_as_repr(writer, wait_for):
+    log, receiver, records = writer
+    producer = AutoSysLogger(core=_Core(), level='DEBUG', propagate=False,
+                             handlers=[RemoteSink(receiver.address)])
+    producer.bind(obj=object).info('extra')
+    producer.remove()
+    wait_for(lambda: receiver.received == 1)
+    assert records[-1].record['extra']['obj'] == repr(object)
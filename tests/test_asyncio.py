@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+""" Tests for asyncio handlers: event loop lag under heavy logging to a slow sink. """
+import asyncio
+import time
+
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger, DedupFilter
+
+
+class SlowDisk:
+    """ A sink taking `delay` seconds per write. """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.lines = []
+
+    def write(self, message):
+        time.sleep(self.delay)
+        self.lines.append(message)
+
+
+def _run(coroutine):
+    """ Run `coroutine` on a new event loop (`asyncio.run()` needs Python 3.7). """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def _max_loop_lag(work) -> float:
+    """ Run `work()` and return the longest delay of a 1 ms tick meanwhile (seconds). """
+    lag = 0.0
+    done = False
+
+    async def tick():
+        nonlocal lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - start - 0.001)
+    ticker = asyncio.ensure_future(tick())
+    try:
+        await work()
+    finally:
+        done = True
+        await ticker
+    return lag
+
+
+def _log_heavily(log, records=500):
+    async def work():
+        for i in range(records):
+            log.info('request {}', i)
+            if i % 50 == 0:
+                await asyncio.sleep(0)  # the rest of the request handler
+        await log.complete()
+    return work
+
+
+def test_loop_lag_with_slow_sink():
+    disk = SlowDisk(0.002)  # 500 records: ~1 s of writes
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[], asyncio=True)
+    log.remove()
+    log.add(disk, format='{message}', queue_size=1000, overflow='block')
+    try:
+        lag = _run(_max_loop_lag(_log_heavily(log)))
+        assert len(disk.lines) == 500  # complete() awaited every write
+    finally:
+        log.remove()
+    assert lag < 0.5  # the writes take about 1 s, see the next test
+
+
+def test_blocking_sink_stalls_the_loop():
+    # the same sink written from the loop, for comparison
+    disk = SlowDisk(0.002)
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[])
+    log.remove()
+    log.add(disk, format='{message}')
+    try:
+        lag = _run(_max_loop_lag(_log_heavily(log)))
+    finally:
+        log.remove()
+    assert lag >= 0.1
+
+
+def test_block_policy_drops_on_the_loop():
+    disk = SlowDisk(0.01)
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[], asyncio=True)
+    log.remove()
+    handler_id = log.add(disk, format='{message}', queue_size=5, overflow='block')
+
+    async def work():
+        for i in range(50):
+            log.info('{}', i)
+        await log.complete()
+    try:
+        _run(work())
+        assert log.queue_stats()[handler_id]['dropped'] > 0
+    finally:
+        log.remove()
+
+
+def test_task_context_reaches_the_writer():
+    disk = SlowDisk(0)
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[], asyncio=True)
+    log.remove()
+    log.add(disk, format='{extra[request]} {message}')
+
+    async def handle(request):
+        with log.contextualize(request=request):
+            await asyncio.sleep(0.001)
+            log.info('handled')
+
+    async def main():
+        await asyncio.gather(*(handle(request) for request in range(10)))
+        await log.complete()
+    try:
+        _run(main())
+    finally:
+        log.remove()
+    assert sorted(disk.lines) == sorted(f'{request} handled\n' for request in range(10))
+
+
+def test_complete_works_without_await():
+    disk = SlowDisk(0)
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[], asyncio=True)
+    log.remove()
+    log.add(disk, format='{message}', filter=DedupFilter(interval=3600))
+
+    async def main():
+        for _ in range(5):
+            log.info('same')
+        log.complete()  # not awaited: the pending summary is still written
+    try:
+        _run(main())
+        deadline = time.monotonic() + 5
+        while len(disk.lines) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert disk.lines == ['same\n', 'same (repeated 4 times)\n']
+    finally:
+        log.remove()
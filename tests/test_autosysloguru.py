@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
 """ Tests for the autosysloguru wrapper for Loguru. """
 from __future__ import annotations
-from autosysloguru import logger
+import asyncio
+import gc
+import subprocess
+import sys
+
+import pytest
+
+from autosysloguru import AutoSysLevelChangeFilter, AutoSysLogger, _report_timings, _timing, logger, logger_wraps
 
 from typing import List, Dict
 
@@ -16,3 +23,309 @@ def bad_filter(record: loguru.Record):
     return record['invalid']
 
     logger.add(good_sink, filter=bad_filter)
+
+
+def test_no_propagation_by_default():
+    # stdlib's last resort handler would print WARNING records a second time
+    code = ('import autosysloguru\n'
+            'autosysloguru.logger.warning("hello warn")\n')
+    result = subprocess.run([sys.executable, '-c', code], stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stderr.count('hello warn') == 1
+
+
+def test_level_filter_caches_levelno():
+    level_filter = AutoSysLevelChangeFilter('WARNING', logger)
+    assert level_filter.levelno == 30
+    level_filter.level = 'DEBUG'
+    assert level_filter.level == 'DEBUG'
+    assert level_filter.levelno == 10
+    level_filter.level = 25
+    assert level_filter.levelno == 25
+
+
+def test_level_filter_compares_levelno():
+    level_filter = AutoSysLevelChangeFilter('INFO', logger)
+    assert level_filter({'level': logger.level('ERROR')})
+    assert level_filter({'level': logger.level('INFO')})
+    assert not level_filter({'level': logger.level('DEBUG')})
+
+
+def test_level_filter_unknown_level():
+    with pytest.raises(ValueError):
+        AutoSysLevelChangeFilter('NOT_A_LEVEL', logger)
+
+
+def test_level_filter_refreshed_by_logger_level():
+    level_filter = AutoSysLevelChangeFilter('INFO', logger)
+    level_filter.levelno = -1  # simulate a stale cache
+    logger.level('AUTOSYS_TEST_LEVEL', no=27)
+    assert level_filter.levelno == 20
+
+
+def test_early_gate_skips_disabled_levels(monkeypatch, new_logger):
+    messages: List = []
+    log = new_logger(messages.append, level='SUCCESS')
+    calls: List = []
+    original = AutoSysLogger._log
+    monkeypatch.setattr(AutoSysLogger, '_log', lambda *a: calls.append(a) or original(*a))
+
+    log.trace('trace')
+    log.debug('debug')
+    log.info('info')
+    log.log('DEBUG', 'log')
+    assert calls == []
+    assert messages == []
+
+    log.success('success')
+    log.log('ERROR', 'log')
+    assert len(calls) == 2
+    assert len(messages) == 2
+
+
+def test_early_gate_follows_level_filter(new_logger):
+    messages: List = []
+    log = new_logger(messages.append, level='SUCCESS')
+    assert log._core.min_level == 25
+    log.level_filter.level = 'DEBUG'
+    assert log._core.min_level == 10
+    log.debug('debug')
+    assert len(messages) == 1
+
+
+def test_early_gate_follows_add_and_remove(new_logger):
+    messages: List = []
+    log = new_logger(messages.append, level='ERROR')
+    handler_id = log.add(messages.append, level='INFO')
+    assert log._core.min_level == 20
+    log.remove(handler_id)
+    assert log._core.min_level == 40
+    log.remove()
+    assert log._core.min_level == float('inf')
+
+
+def test_early_gate_derived_loggers(new_logger):
+    messages: List = []
+    log = new_logger(messages.append, level='SUCCESS')
+    for derived in (log.opt(depth=0), log.bind(x=1), log.patch(lambda r: None)):
+        assert isinstance(derived, AutoSysLogger)
+        derived.debug('debug')
+        derived.success('success')
+    assert len(messages) == 3
+
+
+def test_derived_loggers_share_the_state(new_logger):
+    log = new_logger(level='SUCCESS')
+    derived = log.bind(x=1).opt(depth=0)
+    assert vars(derived).keys() == {'_core', '_options', '_state'}
+    assert derived.level_filter is log.level_filter
+    ring = log.ring_buffer(level='DEBUG')  # started after deriving
+    try:
+        derived.debug('kept')
+        assert len(ring) == 1
+    finally:
+        log.stop_ring_buffer()
+
+
+@pytest.fixture
+def wraps_messages():
+    """ Collect messages sent to the module logger, gated by its level filter. """
+    messages: List = []
+    handler_id = logger.add(messages.append, filter=logger.level_filter, level=0,
+                            format='{function} {message}')
+    previous = logger.level_filter.level
+    yield messages
+    logger.level_filter.level = previous
+    logger.remove(handler_id)
+
+
+def test_logger_wraps_messages(wraps_messages):
+    @logger_wraps()
+    def add(a, b=0):
+        return a + b
+
+    assert add(1, b=2) == 3
+    assert wraps_messages == [
+        "test_logger_wraps_messages Entering 'add' (args=(1,), kwargs={'b': 2})\n",
+        "test_logger_wraps_messages Exiting 'add' (result=3)\n",
+    ]
+
+
+def test_logger_wraps_disabled_level_renders_nothing(wraps_messages):
+    rendered: List = []
+
+    @logger_wraps(summarize=lambda value: rendered.append(value) or 'x')
+    def identity(value):
+        return value
+
+    logger.level_filter.level = 'INFO'
+    assert identity(1) == 1
+    assert rendered == []
+    assert wraps_messages == []
+
+    logger.level_filter.level = 'DEBUG'
+    identity(1)
+    assert rendered == [1, 1]
+    assert len(wraps_messages) == 2
+
+
+def test_logger_wraps_max_repr(wraps_messages):
+    @logger_wraps(entry=False, max_repr=10)
+    def blob():
+        return b'x' * 1000
+
+    blob()
+    assert wraps_messages == ["test_logger_wraps_max_repr Exiting 'blob' (result=b'xxxxx...)\n"]
+
+
+def test_logger_wraps_coroutine(wraps_messages):
+    @logger_wraps()
+    async def double(value):
+        await asyncio.sleep(0)
+        return value * 2
+
+    loop = asyncio.new_event_loop()  # asyncio.run() needs Python 3.7
+    try:
+        assert loop.run_until_complete(double(2)) == 4
+    finally:
+        loop.close()
+    assert wraps_messages[-1].endswith("Exiting 'double' (result=4)\n")
+
+
+def test_logger_wraps_unknown_level(wraps_messages):
+    @logger_wraps(level='NO SUCH LEVEL')
+    def work():
+        pass
+
+    with pytest.raises(ValueError, match='does not exist'):
+        work()
+
+
+def test_logger_wraps_generator(wraps_messages):
+    @logger_wraps()
+    def count(n):
+        yield from range(n)
+        return 'done'
+
+    assert list(count(3)) == [0, 1, 2]
+    assert wraps_messages == [
+        "test_logger_wraps_generator Entering 'count' (args=(3,), kwargs={})\n",
+        "test_logger_wraps_generator Exiting 'count' (result=done)\n",
+    ]
+
+
+def test_logger_wraps_timing_summary(wraps_messages):
+    @logger_wraps(timing=True)
+    def work(n):
+        return sum(range(n))
+
+    for _ in range(100):
+        work(100)
+    assert wraps_messages == []
+
+    _report_timings()
+    assert len(wraps_messages) == 1
+    summary = wraps_messages[0]
+    assert "Timing 'test_logger_wraps_timing_summary.<locals>.work' (count=100 wall p50=" in summary
+    assert ' cpu p50=' in summary and ' p99=' in summary and ' max=' in summary
+
+    _report_timings()  # histograms were reset
+    assert len(wraps_messages) == 1
+
+
+def test_logger_wraps_timing_interval(wraps_messages):
+    @logger_wraps(timing=True, interval=0)
+    def work():
+        pass
+
+    work()  # starts the interval
+    work()
+    assert len(wraps_messages) == 1
+    assert '(count=2 ' in wraps_messages[0]
+
+
+def test_logger_wraps_timing_at_any_level(wraps_messages):
+    @logger_wraps(timing=True)
+    def fail():
+        raise ValueError
+
+    logger.level_filter.level = 'SUCCESS'  # DEBUG summaries are not written
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            fail()
+    stats, = [stats for stats in _timing.registry if stats.name.endswith('fail')]
+    assert stats.take_summary().startswith('count=3 ')
+
+
+def test_timing_summaries_at_exit_without_other_logging():
+    code = ('import autosysloguru\n'
+            '@autosysloguru.logger_wraps(entry=False, exit=False, timing=True)\n'
+            'def work():\n'
+            '    pass\n'
+            'work()\n'
+            'assert type(autosysloguru.logger) is autosysloguru._LazyAutoSysLogger\n')
+    result = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    assert result.returncode == 0, result.stderr
+    assert "Timing 'work' (count=1 " in result.stdout + result.stderr
+
+
+def test_logger_wraps_timing_registry_is_weak():
+    @logger_wraps(timing=True)
+    def short_lived():
+        pass
+
+    short_lived()
+    name = short_lived.__qualname__
+    del short_lived
+    gc.collect()
+    assert not [stats for stats in _timing.registry if stats.name == name]
+
+
+def test_latency_histogram_percentiles():
+    histogram = _timing.LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.record(value * 1000)
+    assert histogram.count == 1000
+    assert histogram.max == 1000000
+    for q, expected in ((0.5, 500000), (0.95, 950000), (0.99, 990000)):
+        assert expected <= histogram.percentile(q) <= expected * 1.125
+
+
+def test_import_has_no_side_effects():
+    code = ('import sys, autosysloguru\n'
+            'assert type(autosysloguru.logger) is autosysloguru._LazyAutoSysLogger\n'
+            "assert not {'orjson', 'zstandard'} & set(sys.modules)\n"
+            'autosysloguru.logger.debug("first use")\n'
+            'assert type(autosysloguru.logger) is autosysloguru.AutoSysLogger\n')
+    result = subprocess.run([sys.executable, '-c', code], stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0, result.stderr
+    lines = result.stderr.splitlines()
+    assert 'Logging is on' in lines[0]
+    assert lines[1].endswith('first use')
+
+
+def test_first_use_from_many_threads():
+    code = ('import threading, autosysloguru\n'
+            'start = threading.Barrier(8)\n'
+            'def work(i):\n'
+            '    start.wait()\n'
+            '    autosysloguru.logger.debug("thread {}", i)\n'
+            'threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]\n'
+            'for thread in threads: thread.start()\n'
+            'for thread in threads: thread.join()\n')
+    for _ in range(5):
+        result = subprocess.run([sys.executable, '-c', code], stderr=subprocess.PIPE, universal_newlines=True)
+        assert result.returncode == 0, result.stderr
+        messages = sorted(line.rsplit(' - ', 1)[1] for line in result.stderr.splitlines())
+        assert messages == ["Logging is on. Severity level set to 'TRACE'"] + [f'thread {i}' for i in range(8)]
+
+
+def test_level_filter_does_not_configure_the_module_logger():
+    code = ('import autosysloguru\n'
+            'level_filter = autosysloguru.AutoSysLevelChangeFilter("WARNING")\n'
+            'assert level_filter.levelno == 30\n'
+            'assert type(autosysloguru.logger) is autosysloguru._LazyAutoSysLogger\n')
+    result = subprocess.run([sys.executable, '-c', code], stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stderr == ''
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+""" Tests for nonblocking (background writer) handlers. """
+import threading
+import time
+from typing import List
+
+import pytest
+
+from autosysloguru._background import BackgroundSink
+
+
+class SlowSink:
+    """ A sink whose writes stall until released, like a blocked disk. """
+
+    def __init__(self):
+        self.messages: List = []
+        self.release = threading.Event()
+
+    def __call__(self, message):
+        self.release.wait()
+        self.messages.append(message)
+
+
+def test_nonblocking_writes_everything_in_order(tmpdir, new_logger):
+    log = new_logger(nonblocking=True)
+    messages: List = []
+    log.add(messages.append, format='{message}')
+    path = tmpdir.join('output.log')
+    file_id = log.add(str(path), format='{message}', rotation='1 MB')
+    for i in range(1000):
+        log.info('message {}', i)
+    log.complete()
+    assert messages == ['message %d\n' % i for i in range(1000)]
+    log.remove(file_id)
+    assert path.read().splitlines() == ['message %d' % i for i in range(1000)]
+
+
+def test_nonblocking_handler_option(new_logger):
+    log = new_logger()
+    handler_id = log.add(lambda message: None, nonblocking=True)
+    assert list(log.queue_stats()) == [handler_id]
+    log.remove(handler_id)
+    assert log.queue_stats() == {}
+
+
+def test_drop_newest_keeps_caller_latency_flat(new_logger):
+    sink = SlowSink()
+    log = new_logger()
+    handler_id = log.add(sink, format='{message}', nonblocking=True, queue_size=10, overflow='drop_newest')
+    start = time.perf_counter()
+    for i in range(100):
+        log.info('message {}', i)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 1.0
+
+    stats = log.queue_stats()[handler_id]
+    assert stats['queued'] + stats['dropped'] == 100
+    assert stats['dropped'] >= 89
+    sink.release.set()
+    log.complete()
+    assert sink.messages[0] == 'message 0\n'
+    log.remove()
+
+
+def test_drop_oldest_keeps_newest():
+    target = SlowSink()
+    sink = BackgroundSink(target, queue_size=5, overflow='drop_oldest')
+    for i in range(50):
+        sink.write(i)
+    assert sink.dropped >= 44
+    target.release.set()
+    sink.drain()
+    assert target.messages[-5:] == [45, 46, 47, 48, 49]
+    sink.stop()
+
+
+def test_block_drops_nothing():
+    target = SlowSink()
+    sink = BackgroundSink(target, queue_size=5, overflow='block')
+    threading.Timer(0.05, target.release.set).start()
+    for i in range(50):
+        sink.write(i)
+    sink.stop()
+    assert target.messages == list(range(50))
+    assert sink.dropped == 0
+
+
+def test_sample_thins_out_overflow():
+    target = SlowSink()
+    sink = BackgroundSink(target, queue_size=100, overflow='sample', sample_every=10)
+    for i in range(1000):
+        sink.write(i)
+    target.release.set()
+    sink.stop()
+    assert 0 < sink.dropped < 1000
+    assert sink.written == sink.queued == len(target.messages)
+
+
+def test_errors_are_reported(capsys):
+    def broken(message):
+        raise RuntimeError('broken sink')
+
+    sink = BackgroundSink(broken)
+    sink.write('message')
+    sink.stop()
+    assert sink.errors == 1
+    assert 'broken sink' in capsys.readouterr().err
+
+
+def test_invalid_overflow():
+    with pytest.raises(ValueError):
+        BackgroundSink(print, overflow='explode')
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+""" Tests for the binary log format and the `autosysloguru` command. """
+import json
+import os
+import time
+
+import pytest
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger
+from autosysloguru import _binary
+from autosysloguru.__main__ import _time, main
+from autosysloguru._binary import block_offsets, read_records
+
+
+def test_round_trip(tmp_path, new_logger):
+    path = tmp_path / 'output.bin'
+    log = new_logger({'sink': path, 'binary': True})
+    log.bind(user='ada').debug('hello {}', 'world')
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        log.exception('failed')
+    log.remove()
+
+    debug, error = read_records(path)
+    assert debug['message'] == 'hello world' and debug['level'] == 'DEBUG' and debug['levelno'] == 10
+    assert debug['extra'] == {'user': 'ada'} and debug['exception'] is None
+    assert debug['function'] == 'test_round_trip' and debug['name'] == __name__
+    assert debug['file'] == 'test_binary.py' and debug['process'] == os.getpid()
+    assert abs(debug['timestamp'] - time.time()) < 60
+    assert error['level'] == 'ERROR' and 'ZeroDivisionError' in error['exception']
+    assert [record['message'] for record in read_records(path, level=30)] == ['failed']
+
+
+def test_smaller_than_json_lines(tmp_path):
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[])
+    log.remove()
+    log.add(tmp_path / 'output.bin', binary=True)
+    log.add(tmp_path / 'output.json', json=True, buffered=True)
+    for i in range(5000):
+        log.bind(request=i).info('request {} handled in {} ms', i, i % 13)
+    log.remove()
+    binary = os.path.getsize(tmp_path / 'output.bin')
+    text = os.path.getsize(tmp_path / 'output.json')
+    assert text / binary > 4, f'json lines: {text} bytes, binary: {binary} bytes'
+
+
+def test_time_range_seeks_over_blocks(tmp_path, monkeypatch, new_logger):
+    path = tmp_path / 'output.bin'
+    log = new_logger({'sink': path, 'binary': True, 'flush_interval': 0})
+    bounds = []
+    for batch in range(10):
+        bounds.append(time.time())
+        for i in range(100):
+            log.info('batch {} record {}', batch, i)
+        log.complete()  # one block per batch
+        time.sleep(0.01)
+    log.remove()
+    assert len(block_offsets(path)) == 10
+
+    decoded = []
+    decode = _binary._decode_block
+    monkeypatch.setattr(_binary, '_decode_block', lambda *args: decoded.append(1) or decode(*args))
+    records = list(read_records(path, since=bounds[4], until=bounds[6] - 0.001))
+    assert [record['message'] for record in records] == \
+        [f'batch {batch} record {i}' for batch in (4, 5) for i in range(100)]
+    assert len(decoded) == 2
+
+
+def test_incomplete_block_is_ignored_then_cut(tmp_path, new_logger):
+    path = tmp_path / 'output.bin'
+    log = new_logger({'sink': path, 'binary': True})
+    log.info('before the crash')
+    log.remove()
+    complete = os.path.getsize(path)
+    with open(path, 'ab') as file:
+        file.write(_binary._BLOCK.pack(_binary.BLOCK_MAGIC, 1000, 1, 0, 0, 20, 20, 0) + b'partial')
+    assert [record['message'] for record in read_records(path)] == ['before the crash']
+
+    log = new_logger({'sink': path, 'binary': True})
+    assert os.path.getsize(path) == complete
+    log.info('after the restart')
+    log.remove()
+    assert [record['message'] for record in read_records(path)] == ['before the crash', 'after the restart']
+
+
+def test_not_a_binary_log(tmp_path, new_logger):
+    path = tmp_path / 'output.log'
+    path.write_text('plain text\n')
+    with pytest.raises(ValueError):
+        new_logger({'sink': path, 'binary': True})
+    with pytest.raises(ValueError):
+        list(read_records(path))
+
+
+def test_command(tmp_path, capsys, new_logger):
+    path = tmp_path / 'output.bin'
+    log = new_logger({'sink': path, 'binary': True, 'buffer_size': 200})  # a few records per block
+    for i in range(50):
+        log.log('WARNING' if i % 10 == 0 else 'INFO', 'record {}', i)
+    log.remove()
+
+    assert main(['tail', str(path), '-n', '3']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.rsplit(' - ', 1)[1] for line in lines] == ['record 47', 'record 48', 'record 49']
+
+    assert main(['filter', str(path), '--level', 'warning', '--json']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)['message'] for line in lines] == [f'record {i}' for i in range(0, 50, 10)]
+
+    output = tmp_path / 'output.json'
+    assert main(['convert', str(path), '-o', str(output), '--fields', 'level,message,line']) == 0
+    lines = output.read_text().splitlines()
+    assert len(lines) == 50 and set(json.loads(lines[1])) == {'level', 'message', 'line'}
+
+
+@pytest.mark.parametrize('flags, payload', [(_binary.COMPRESSED, b'garbage'), (0, b'\0')])
+def test_command_reports_damaged_blocks(tmp_path, capsys, flags, payload, new_logger):
+    path = tmp_path / 'output.bin'
+    log = new_logger({'sink': path, 'binary': True})
+    log.info('before the damage')
+    log.remove()
+    with open(path, 'ab') as file:
+        file.write(_binary._BLOCK.pack(_binary.BLOCK_MAGIC, len(payload), 1, 0, 0, 20, 20, flags) + payload)
+    assert main(['filter', str(path)]) == 1
+    assert 'the file is damaged' in capsys.readouterr().err
+
+
+def test_time_arguments():
+    assert _time('1596268800.5') == 1596268800.5
+    assert _time('2020-08-01T10:00:00.5+02:00') == 1596268800.5
+    assert _time('2020-08-01T08:00Z') == 1596268800
+    assert _time('2020-08-01') == time.mktime((2020, 8, 1, 0, 0, 0, 0, 0, -1))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+""" Tests for configuration loading (pyproject.toml, config script, environment, cache). """
+import os
+import sys
+
+import pytest
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger, AutoSysLoggerError, LoguruConfig, _config, load_config
+from autosysloguru._metrics import sink_chain
+from autosysloguru._template import TemplateSink
+
+
+PYPROJECT = '''
+[tool.other]
+name = "x"
+
+[autosysloguru]
+dev_level = "DEBUG"
+dev_handlers = [
+    {sink = "sys.stdout", colorize = "True", format = "{message}"},
+    {sink = "output.log", backtrace = "False", rotation = "500 MB"},
+]
+prod_level = "SUCCESS"
+'''
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    (tmp_path / 'pyproject.toml').write_text(PYPROJECT)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('AUTOSYSLOGURU_CACHE_DIR', str(tmp_path / 'cache'))
+    for name in ('LOGURU_LEVEL', 'LOGURU_DEFAULT_LEVEL', 'LOGURU_CONFIG_FILENAME'):
+        monkeypatch.delenv(name, raising=False)
+    return tmp_path
+
+
+def test_pyproject_is_normalized(project):
+    config = load_config()
+    assert config.sources == [str(project / 'pyproject.toml')]
+    assert config.level(debug=True) == 'DEBUG'
+    assert config.level(debug=False) == 'SUCCESS'
+    assert config.dev_handlers == [
+        {'sink': 'sys.stdout', 'colorize': True, 'format': '{message}'},
+        {'sink': 'output.log', 'backtrace': False, 'rotation': '500 MB'},
+    ]
+    assert config.handlers(debug=True)[0]['sink'] is sys.stdout
+    assert config.handlers(debug=False) is None
+
+
+def test_pyproject_found_in_parent(project):
+    (project / 'sub').mkdir()
+    assert load_config(start=str(project / 'sub')).level(debug=True) == 'DEBUG'
+
+
+def test_cache_skips_parsing(project, monkeypatch):
+    first = load_config()
+
+    def fail(*args):
+        raise AssertionError('parsed again')
+    monkeypatch.setattr(_config, '_compile_pyproject', fail)
+    second = load_config()
+    assert second.dev_handlers == first.dev_handlers
+
+    # touched, same content: still served from the cache (hash fallback)
+    path = project / 'pyproject.toml'
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_config().dev_level == 'DEBUG'
+
+
+def test_cache_invalidated_by_change(project):
+    load_config()
+    (project / 'pyproject.toml').write_text(PYPROJECT.replace('"DEBUG"', '"INFO"'))
+    assert load_config().dev_level == 'INFO'
+
+
+def test_invalid_boolean(project):
+    (project / 'pyproject.toml').write_text('[autosysloguru]\ndev_handlers = [{sink = "x.log", colorize = "yes"}]\n')
+    with pytest.raises(ValueError, match='colorize'):
+        load_config()
+
+
+def test_config_script_overrides_pyproject(project, monkeypatch):
+    script = project / 'log_config.py'
+    script.write_text('import sys\n'
+                      'from autosysloguru import logger\n'
+                      'dev_level = "WARNING"\n'
+                      'dev_handlers = [{"sink": sys.stderr, "serialize": "true"}]\n'
+                      'logger.config()  # ignored while loading\n')
+    monkeypatch.setenv('LOGURU_CONFIG_FILENAME', str(script))
+    config = load_config()
+    assert config.sources == [str(project / 'pyproject.toml'), str(script)]
+    assert config.dev_level == 'WARNING'
+    assert config.prod_level == 'SUCCESS'
+    assert config.dev_handlers == [{'sink': 'sys.stderr', 'serialize': True}]
+
+
+def test_environment_levels(project, monkeypatch):
+    (project / 'pyproject.toml').write_text('[autosysloguru]\ndev_level = "DEBUG"\n')
+    monkeypatch.setenv('LOGURU_DEFAULT_LEVEL', 'ERROR')
+    config = load_config()
+    assert (config.dev_level, config.prod_level) == ('DEBUG', 'ERROR')
+    monkeypatch.setenv('LOGURU_LEVEL', 'CRITICAL')
+    config = load_config()
+    assert (config.dev_level, config.prod_level) == ('CRITICAL', 'CRITICAL')
+
+
+def test_logger_config_applies_handlers(project):
+    messages = []
+    config = LoguruConfig('INFO', 'ERROR', [{'sink': messages.append, 'format': '{message}'}], None)
+    log = AutoSysLogger(core=_Core(), debug=True, propagate=False, handlers=[lambda message: None])
+    log.config(config)
+    log.debug('hidden')
+    log.info('shown')
+    assert messages == ['shown\n']
+    assert len(log._core.handlers) == 1
+
+
+def test_logger_config_uses_defaults_last(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('AUTOSYSLOGURU_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.delenv('LOGURU_CONFIG_FILENAME', raising=False)
+    log = AutoSysLogger(core=_Core(), debug=True, propagate=False, handlers=[lambda message: None])
+    log.config(start=str(tmp_path))
+    try:
+        handlers = log._core.handlers.values()
+        assert len(handlers) == len(AutoSysLogger._DEFAULT_DEV_HANDLERS)
+        assert any(isinstance(sink, TemplateSink)
+                   for handler in handlers for sink in sink_chain(handler._sink))
+        assert sorted(path.name.split('.')[0] for path in tmp_path.glob('output.*')) == ['output', 'output']
+    finally:
+        log.remove()
+
+
+def test_logger_config_error(project):
+    (project / 'pyproject.toml').write_text('[autosysloguru]\ndev_handlers = "output.log"\n')
+    log = AutoSysLogger(core=_Core(), debug=True, propagate=False, handlers=[lambda message: None])
+    with pytest.raises(AutoSysLoggerError):
+        log.config()
+
+
+def test_pyproject_without_tomllib(monkeypatch):
+    pytest.importorskip('tomli')  # installed with autosysloguru before Python 3.11
+    monkeypatch.setitem(sys.modules, 'tomllib', None)
+    assert _config._load_toml(PYPROJECT)['autosysloguru']['prod_level'] == 'SUCCESS'
+
+
+def test_no_toml_parser(monkeypatch):
+    for name in ('tomllib', 'tomli', 'toml'):
+        monkeypatch.setitem(sys.modules, name, None)
+    with pytest.raises(ImportError, match='tomli'):
+        _config._load_toml(PYPROJECT)
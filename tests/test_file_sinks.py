@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+""" Tests for the autosysloguru file sinks. """
+import mmap
+import os
+import threading
+import time
+
+import pytest
+
+from autosysloguru._file_sinks import has_zstandard, maintenance, per_run_path, run_id
+
+
+def test_buffered_coalesces_writes(tmpdir, new_logger):
+    log = new_logger()
+    path = tmpdir.join('output.log')
+    log.add(str(path), format='{message}', buffered=True, buffer_size=1000, flush_interval=0)
+    for i in range(10):
+        log.info('message {}', i)
+    assert path.read() == ''
+    for i in range(10, 100):
+        log.info('message {}', i)
+    assert 0 < len(path.read()) < len(''.join('message %d\n' % i for i in range(100)))
+    log.remove()
+    assert path.read().splitlines() == ['message %d' % i for i in range(100)]
+
+
+def test_buffered_flushes_on_error(tmpdir, new_logger):
+    log = new_logger()
+    path = tmpdir.join('output.log')
+    log.add(str(path), format='{message}', buffered=True, flush_interval=0)
+    log.info('info')
+    assert path.read() == ''
+    log.error('error')
+    assert path.read() == 'info\nerror\n'
+    log.remove()
+
+
+def test_buffered_flush_level_name(tmpdir, new_logger):
+    log = new_logger()
+    path = tmpdir.join('output.log')
+    log.add(str(path), format='{message}', buffered=True, flush_interval=0, flush_level='WARNING')
+    log.info('info')
+    assert path.read() == ''
+    log.warning('warning')
+    assert path.read() == 'info\nwarning\n'
+    log.remove()
+
+
+def test_buffered_flushes_on_interval(tmpdir, new_logger):
+    log = new_logger()
+    path = tmpdir.join('output.log')
+    log.add(str(path), format='{message}', buffered=True, flush_interval=0.01)
+    log.info('info')
+    for _ in range(100):
+        if path.read():
+            break
+        time.sleep(0.01)
+    assert path.read() == 'info\n'
+    log.remove()
+
+
+def test_buffered_size_rotation(tmpdir, new_logger):
+    log = new_logger()
+    path = tmpdir.join('output.log')
+    log.add(str(path), format='{message}', buffered=True, rotation='1 KB', flush_interval=0)
+    lines = ['message %04d' % i for i in range(500)]
+    for line in lines:
+        log.info(line)
+    log.remove()
+
+    files = sorted(tmpdir.listdir(), key=lambda file: file.mtime())
+    assert len(files) > 1
+    assert all(file.size() <= 1000 for file in files)
+    written = sorted(line for file in files for line in file.read().splitlines())
+    assert written == lines
+
+
+def test_buffered_retention(tmpdir, new_logger):
+    log = new_logger()
+    path = tmpdir.join('output.log')
+    log.add(str(path), format='{message}', buffered=True, rotation=100, retention=2, flush_interval=0)
+    for i in range(100):
+        log.info('message {}', i)
+    log.remove()
+    maintenance.wait()
+    # like loguru: two rotated files are kept, plus the current one
+    assert len(tmpdir.listdir()) == 3
+
+
+def test_buffered_and_nonblocking(tmpdir, new_logger):
+    log = new_logger()
+    path = tmpdir.join('output.log')
+    log.add(str(path), format='{message}', buffered=True, nonblocking=True)
+    for i in range(100):
+        log.info('message {}', i)
+    log.remove()
+    assert path.read().splitlines() == ['message %d' % i for i in range(100)]
+
+
+def test_per_run_path():
+    assert run_id() == run_id()
+    assert str(os.getpid()) in run_id()
+    assert per_run_path('logs/output.json') == 'logs/output.%s.json' % run_id()
+
+
+def test_per_run_file_and_retention_of_old_runs(tmpdir, new_logger):
+    old = tmpdir.join('output.2000-01-01_00-00-00_1_abcdef.json')
+    old.write('old run\n')
+    os.utime(str(old), (0, 0))
+    recent = tmpdir.join('output.2099-01-01_00-00-00_2_abcdef.json')
+    recent.write('recent run\n')
+
+    log = new_logger()
+    log.add(str(tmpdir.join('output.json')), format='{message}', per_run=True, retention='1 day')
+    maintenance.wait()
+    log.info('this run')
+
+    assert not old.exists()
+    assert recent.exists()
+    current = tmpdir.join('output.%s.json' % run_id())
+    log.remove()
+    assert current.read() == 'this run\n'
+
+
+def test_per_run_rotates_by_size(tmpdir, new_logger):
+    log = new_logger()
+    log.add(str(tmpdir.join('output.json')), json=True, per_run=True, rotation='1 KB', retention=3)
+    for i in range(200):
+        log.info('message {}', i)
+    log.remove()
+    maintenance.wait()
+    files = tmpdir.listdir()
+    assert 1 < len(files) <= 4
+    assert all(run_id() in file.basename for file in files)
+
+
+def test_rotation_does_not_wait_for_compression(tmpdir, new_logger):
+    release = threading.Event()
+    compressed = []
+
+    def slow_compression(path):
+        release.wait()
+        compressed.append(path)
+
+    log = new_logger()
+    log.add(str(tmpdir.join('output.log')), format='{message}', rotation=50, compression=slow_compression)
+    start = time.perf_counter()
+    for i in range(20):
+        log.info('message {}', i)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 1.0
+    assert compressed == []
+
+    release.set()
+    maintenance.wait()
+    assert len(compressed) > 1
+    log.remove()
+
+
+def test_stop_waits_only_for_its_own_jobs(tmpdir, new_logger):
+    release = threading.Event()
+    log = new_logger()
+    slow = log.add(str(tmpdir.join('slow.log')), format='{message}', rotation=50,
+                   compression=lambda path: release.wait())
+    fast = log.add(str(tmpdir.join('fast.log')), format='{message}', rotation=50, compression='gz')
+    for i in range(20):
+        log.info('message {}', i)
+    remover = threading.Thread(target=log.remove, args=(fast,))
+    remover.start()
+    remover.join(timeout=1.0)
+    stuck = remover.is_alive()
+    release.set()
+    remover.join()
+    log.remove(slow)
+    assert not stuck
+
+
+@pytest.mark.parametrize('compression, extension', [
+    ('gz', '.gz'),
+    pytest.param('zst', '.zst', marks=pytest.mark.skipif(not has_zstandard(), reason='zstandard not installed')),
+])
+def test_background_compression(tmpdir, compression, extension, new_logger):
+    log = new_logger()
+    log.add(str(tmpdir.join('output.log')), format='{message}', rotation=100, compression=compression)
+    for i in range(50):
+        log.info('message {}', i)
+    log.remove()
+    names = [file.basename for file in tmpdir.listdir()]
+    assert 'output.log' in names
+    assert len([name for name in names if name.endswith(extension)]) == len(names) - 1
+
+
+def test_mapped_writes_across_segments(tmpdir, new_logger):
+    log = new_logger()
+    path = tmpdir.join('output.log')
+    log.add(str(path), format='{message}', mapped=True, segment_size=1)  # one page per segment
+    lines = ['mapped message %d %s' % (i, 'x' * (i % 50)) for i in range(1000)]
+    for line in lines:
+        log.info(line)
+    assert path.size() % mmap.ALLOCATIONGRANULARITY == 0  # preallocated
+    log.remove()
+    assert path.read().splitlines() == lines  # truncated to the written length
+
+
+def test_mapped_size_rotation(tmpdir, new_logger):
+    log = new_logger()
+    path = tmpdir.join('output.log')
+    log.add(str(path), format='{message}', mapped=True, rotation='1 KB')
+    for i in range(100):
+        log.info('message {:04d}', i)
+    log.remove()
+    files = tmpdir.listdir()
+    assert len(files) > 1 and all(file.size() <= 1000 for file in files)
+    text = ''.join(file.read() for file in files)
+    assert sorted(text.splitlines()) == ['message %04d' % i for i in range(100)]
+
+
+def test_mapped_recovers_after_crash(tmpdir, new_logger):
+    path = tmpdir.join('output.log')
+    # what a crashed process leaves: the written lines, then the rest of the zero-filled segment
+    path.write_binary(b'before the crash\n' + b'\0' * 100000)
+    log = new_logger()
+    log.add(str(path), format='{message}', mapped=True)
+    log.info('after the restart')
+    log.remove()
+    assert path.read() == 'before the crash\nafter the restart\n'
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+""" Tests for rate limiting, sampling and deduplication filters. """
+import gc
+import weakref
+
+from autosysloguru import DedupFilter, FilterChain, RateLimitFilter, SamplingFilter
+
+
+def test_rate_limit_per_call_site(new_logger):
+    log = new_logger()
+    messages = []
+    rate_limit = RateLimitFilter(rate=0.001, burst=3)
+    log.add(messages.append, filter=[rate_limit, log.level_filter], format='{message}', level=0)
+    for i in range(10):
+        log.info('hot loop {}', i)
+    log.info('other call site')
+    assert messages == ['hot loop 0\n', 'hot loop 1\n', 'hot loop 2\n', 'other call site\n']
+    assert rate_limit.stats() == {'passed': 4, 'dropped': 7}
+
+
+def test_level_filter_runs_first(new_logger):
+    log = new_logger(level='INFO')
+    rate_limit = RateLimitFilter(rate=0.001, burst=1)
+    handler_id = log.add(lambda message: None, filter=[rate_limit, log.level_filter], level=0)
+    assert isinstance(log._core.handlers[handler_id]._filter, FilterChain)
+    assert log._core.min_level == log.level('INFO').no  # the early gate sees through the chain
+    log.log(15, 'below the level')  # reaches the chain, dropped by the level filter
+    assert rate_limit.stats() == {'passed': 0, 'dropped': 0}
+
+
+def test_rate_limit_lru_is_bounded(new_logger):
+    rate_limit = RateLimitFilter(rate=1, maxsize=2)
+    log = new_logger()
+    log.add(lambda message: None, filter=rate_limit)
+    log.info('one')
+    log.info('two')
+    log.info('three')
+    assert len(rate_limit._buckets) == 2
+
+
+def test_sampling_per_level(new_logger):
+    log = new_logger()
+    messages = []
+    log.add(messages.append, filter=SamplingFilter({'DEBUG': 0.0, 'INFO': 0.5}), format='{level}')
+    for _ in range(1000):
+        log.debug('never')
+        log.info('half')
+        log.warning('always')
+    assert 'DEBUG\n' not in messages
+    assert messages.count('WARNING\n') == 1000
+    assert 350 < messages.count('INFO\n') < 650
+
+
+def test_shared_filter_decides_once_per_record(new_logger):
+    log = new_logger()
+    first, second = [], []
+    sampling = SamplingFilter({'INFO': 0.5})
+    log.add(first.append, filter=sampling, format='{message}')
+    log.add(second.append, filter=sampling, format='{message}')
+    for i in range(200):
+        log.info('{}', i)
+    assert first == second
+    assert sampling.passed + sampling.dropped == 200
+
+
+def test_last_record_is_not_kept(new_logger):
+    log = new_logger()
+    sampling = SamplingFilter({'ERROR': 1.0})
+    log.add(lambda message: None, filter=sampling)
+
+    class Failure(Exception):
+        pass
+
+    def fail():
+        try:
+            raise Failure()
+        except Failure as error:
+            log.exception('failed')
+            return weakref.ref(error)
+    reference = fail()
+    assert sampling.passed == 1
+    gc.collect()  # the traceback's frames refer back to the exception
+    assert reference() is None  # neither the record nor its traceback is cached
+
+
+def test_dedup_summary_on_new_message(new_logger):
+    log = new_logger()
+    messages = []
+    dedup = DedupFilter()
+    log.add(messages.append, filter=[log.level_filter, dedup], format='{message}', level=0)
+    log.add(lambda message: None, level=0)  # another handler gets no summary
+    for i in range(5):
+        log.warning('disk full' if i < 4 else 'disk ok')
+    assert messages == ['disk full\n', 'disk full (repeated 3 times)\n', 'disk ok\n']
+    assert messages[1].record['extra']['repeated'] == 3
+    assert dedup.stats() == {'passed': 2, 'dropped': 3, 'summaries': 1}
+
+
+def test_dedup_summary_on_interval(wait_for, new_logger):
+    log = new_logger()
+    messages = []
+    dedup = DedupFilter(interval=0.05)
+    log.add(messages.append, filter=dedup, format='{message}')
+    for i in range(4):
+        log.error('storm')
+    wait_for(lambda: dedup.summaries == 1)  # the storm is over, nothing else is logged
+    assert messages == ['storm\n', 'storm (repeated 3 times)\n']
+    log.remove()
+
+
+def test_dedup_summaries_are_flushed(new_logger):
+    log = new_logger()
+    messages = []
+    dedup = DedupFilter(interval=3600)
+    handler_id = log.add(messages.append, filter=dedup, format='{message}')
+    for i in range(100):
+        log.info('same')
+    log.complete()
+    assert messages == ['same\n', 'same (repeated 99 times)\n']
+    assert dedup.stats() == {'passed': 1, 'dropped': 99, 'summaries': 1}
+    for i in range(3):
+        log.info('same')  # another call site
+    log.remove(handler_id)
+    assert messages[2:] == ['same\n', 'same (repeated 2 times)\n']
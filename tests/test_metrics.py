@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+""" Tests for the logging pipeline metrics (counters, latency histograms, Prometheus export). """
+import socket
+import threading
+
+import pytest
+
+
+def test_counts_records_and_drops(new_logger):
+    messages = []
+    log = new_logger(messages.append, level='INFO')
+    handler_id = log.add(lambda message: None, filter=log.level_filter, level=0, format='{message}')
+    log.enable_metrics()
+    try:
+        log.debug('dropped by the gate')
+        log.info('writtén')
+        log.opt(depth=0).warning('written {}', 2)
+        log.level_filter.level = 'WARNING'
+        log.info('dropped by the gate')
+        snapshot = log.metrics()
+    finally:
+        log.disable_metrics()
+        log.remove()
+    assert snapshot['emitted'] == {'INFO': 1, 'WARNING': 1}
+    assert snapshot['dropped'] == {'DEBUG': 1, 'INFO': 1}
+    sink = snapshot['sinks'][handler_id]
+    assert sink['written'] == 2 and sink['bytes'] == len('writtén\n'.encode()) + len('written 2\n')
+    assert sink['latency']['count'] == 2 and sink['latency']['p99_ns'] > 0
+    assert log.metrics() == {}
+
+
+def test_patchers_are_chained(new_logger):
+    messages = []
+    log = new_logger(messages.append, level='INFO')
+    log.configure(patcher=lambda record: record['extra'].update(first=True))
+    log.enable_metrics()
+    try:
+        log.info('both patchers')
+        log.configure(patcher=lambda record: record['extra'].update(second=True))
+        log.info('new patcher')
+        assert log.metrics()['emitted'] == {'INFO': 2}
+    finally:
+        log.disable_metrics()
+    log.info('metrics off')
+    log.remove()
+    assert [message.record['extra'] for message in messages] == [{'first': True}, {'second': True}, {'second': True}]
+
+
+def test_export_needs_a_target(new_logger):
+    log = new_logger(level='INFO')
+    with pytest.raises(ValueError):
+        log.export_metrics()
+    assert log.metrics() == {}
+
+
+def test_level_filter_drops_are_counted(new_logger):
+    log = new_logger(level='WARNING')
+    log.add(lambda message: None, level=0)  # keeps the gate open
+    log.add(lambda message: None, filter=log.level_filter, level=0)
+    log.enable_metrics()
+    try:
+        log.info('reaches the level filter')
+        assert log.metrics()['dropped'] == {'INFO': 1}
+    finally:
+        log.disable_metrics()
+        log.remove()
+
+
+def test_threads_are_merged(new_logger):
+    log = new_logger(lambda message: None, level='INFO')
+    log.enable_metrics()
+
+    def work():
+        for _ in range(500):
+            log.info('from a thread')
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        log.info('main thread')
+        assert log.metrics()['emitted'] == {'INFO': 2001}
+        assert log.metrics()['emitted'] == {'INFO': 2001}  # finished threads are folded once
+    finally:
+        log.disable_metrics()
+        log.remove()
+
+
+def test_sink_counters(tmp_path, new_logger):
+    log = new_logger(level='INFO')
+    log.enable_metrics()
+    file_id = log.add(tmp_path / 'out.log', rotation=100, format='{message}')
+    queue_id = log.add(lambda message: None, nonblocking=True)
+    try:
+        for i in range(10):
+            log.info('record number {}', i)
+        log.complete()
+        sinks = log.metrics()['sinks']
+    finally:
+        log.disable_metrics()
+        log.remove()
+    assert sinks[file_id]['rotations'] >= 1 and sinks[file_id]['written'] == 10
+    assert sinks[queue_id]['queue']['written'] == 10 and sinks[queue_id]['queue']['depth'] == 0
+
+
+def test_prometheus_file_and_socket(tmp_path, new_logger):
+    log = new_logger(lambda message: None, level='INFO')
+    path = tmp_path / 'autosysloguru.prom'
+    exporter = log.export_metrics(path, address=('127.0.0.1', 0), interval=60)
+    try:
+        log.info('exported')
+        with socket.create_connection(exporter.address, timeout=5) as connection:
+            connection.sendall(b'GET /metrics HTTP/1.0\r\n\r\n')
+            response = b''
+            while True:
+                data = connection.recv(65536)
+                if not data:
+                    break
+                response += data
+    finally:
+        log.disable_metrics()
+        log.remove()
+    head, _, body = response.decode().partition('\r\n\r\n')
+    assert head.startswith('HTTP/1.0 200')
+    assert 'autosysloguru_records_emitted_total{level="INFO"} 1' in body
+    assert 'autosysloguru_sink_write_seconds_count{handler="' in body
+    assert '# TYPE autosysloguru_sink_write_seconds histogram' in body
+    # written once more when stopped
+    assert 'autosysloguru_records_emitted_total{level="INFO"} 1' in path.read_text()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+""" Tests for PropagateHandler (loguru -> standard library logging). """
+import logging
+import time
+from logging import Handler, NullHandler
+
+import pytest
+from loguru import _Core, _Logger
+
+from autosysloguru import AutoSysLogger, PropagateHandler
+
+
+class CountHandler(Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def new_loguru_logger():
+    return _Logger(_Core(), None, 0, False, False, False, False, True, None, {})
+
+
+@pytest.fixture
+def tree(request):
+    """ A standard library logger tree with NullHandlers on every node and a
+        counting handler at the top. """
+    top = request.node.name.replace('[', '_').replace(']', '')
+    names = [top, top + '.a', top + '.a.b']
+    for name in names:
+        logging.getLogger(name).addHandler(NullHandler())
+    counter = CountHandler()
+    logging.getLogger(top).addHandler(counter)
+    logging.getLogger(top).propagate = False
+    logging.getLogger(top).setLevel(logging.DEBUG)
+    yield names[-1], counter
+    for name in names:
+        stdlib_logger = logging.getLogger(name)
+        stdlib_logger.handlers.clear()
+        stdlib_logger.setLevel(logging.NOTSET)
+
+
+def make_record(name, level=logging.INFO):
+    return logging.getLogger(name).makeRecord(name, level, __file__, 1, 'message', (), None)
+
+
+def test_loggers_are_cached(tree):
+    name, counter = tree
+    handler = PropagateHandler()
+    handler.handle(make_record(name))
+    assert handler.get_logger(name) is logging.getLogger(name)
+    assert list(handler._loggers) == [name]
+    handler.cache_clear()
+    assert handler._loggers == {}
+    assert len(counter.records) == 1
+
+
+def test_cache_is_bounded(tree):
+    name, counter = tree
+    handler = PropagateHandler(cache_size=2)
+    for suffix in 'xyz':
+        handler.get_logger(name + '.' + suffix)
+    assert len(handler._loggers) <= 2
+
+
+def test_disabled_level_is_not_dispatched(tree):
+    name, counter = tree
+    logging.getLogger(name).setLevel(logging.WARNING)
+    handler = PropagateHandler()
+    handler.handle(make_record(name, logging.INFO))
+    handler.handle(make_record(name, logging.ERROR))
+    assert [r.levelno for r in counter.records] == [logging.ERROR]
+
+
+def test_batches(tree):
+    name, counter = tree
+    handler = PropagateHandler(batch_size=10)
+    for _ in range(5):
+        handler.handle(make_record(name))
+    assert counter.records == []
+    handler.handle(make_record(name, logging.ERROR))
+    assert len(counter.records) == 6
+    handler.handle(make_record(name))
+    handler.close()
+    assert len(counter.records) == 7
+
+
+def test_partial_batch_is_flushed_on_interval(tree):
+    name, counter = tree
+    handler = PropagateHandler(batch_size=10, flush_interval=0.01)
+    handler.handle(make_record(name))
+    deadline = time.monotonic() + 5
+    while not counter.records and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(counter.records) == 1
+    handler.close()
+
+
+def test_complete_flushes_batches(tree):
+    name, counter = tree
+    log = AutoSysLogger(core=_Core(), level='TRACE', handlers=[])
+    log.remove()
+    log.add(PropagateHandler(batch_size=10, flush_interval=60), format='{message}')
+    log.patch(lambda record: record.update(name=name)).info('pending')
+    assert counter.records == []
+    log.complete()
+    assert [record.getMessage() for record in counter.records] == ['pending']
+    log.remove()
+
+
+@pytest.mark.parametrize('batch_size', [0, 64])
+def test_null_handler_tree_gets_every_record(tree, batch_size):
+    name, counter = tree
+    records = 10000
+    loguru_logger = new_loguru_logger()
+    loguru_logger.add(PropagateHandler(batch_size=batch_size), format='{message}')
+    loguru_logger = loguru_logger.patch(lambda record: record.update(name=name))
+
+    for i in range(records):
+        loguru_logger.info('record {}', i)
+    loguru_logger.remove()
+
+    assert len(counter.records) == records
+    assert counter.records[-1].getMessage() == 'record %d' % (records - 1)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+""" Tests for records built from shared parts (allocations per logged message). """
+import threading
+import tracemalloc
+
+import loguru
+from loguru import _Core, _Logger
+from loguru._datetime import aware_now
+
+from autosysloguru import AutoSysLogger
+from autosysloguru._record import RecordParts
+
+
+MESSAGES = 2000
+
+
+def _retained_per_message(log, records) -> tuple:
+    """ (blocks, bytes) still allocated per message, with the records kept alive. """
+    log.info('warm up {}', 0)
+    records.clear()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for i in range(MESSAGES):
+            log.info('message {}', i)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    return (sum(stat.count_diff for stat in stats) / MESSAGES,
+            sum(stat.size_diff for stat in stats) / MESSAGES)
+
+
+def test_allocations_per_message():
+    records = []
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[])
+    log.remove()
+    log.add(lambda message: records.append(message.record), format='{message}')
+    loguru_log = _Logger(_Core(), *log._options)
+    loguru_log.add(lambda message: records.append(message.record), format='{message}')
+
+    blocks, size = _retained_per_message(log, records)
+    loguru_blocks, loguru_size = _retained_per_message(loguru_log, records)
+    counts = f'per message: autosysloguru {blocks:.1f} blocks {size:.0f} B, ' \
+             f'loguru {loguru_blocks:.1f} blocks {loguru_size:.0f} B'
+    assert blocks <= loguru_blocks - 4, counts
+    assert size < loguru_size, counts
+    log.remove()
+    loguru_log.remove()
+
+
+def test_records_share_their_parts():
+    records = []
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[])
+    log.remove()
+    log.add(lambda message: records.append(message.record))
+    log.info('one')
+    log.warning('two')
+    log.info('three')
+    log.remove()
+    first, second, third = records
+    assert first['level'] is third['level'] and first['level'] is not second['level']
+    assert first['file'] is second['file'] and first['thread'] is second['thread']
+    assert first['module'] == 'test_record' and first['file'].name == 'test_record.py'
+    assert first['time'].utcoffset() == aware_now().utcoffset()
+    assert type(first['time']) is type(aware_now())
+
+
+def test_renamed_thread_gets_a_new_record_thread():
+    parts = RecordParts()
+    thread = threading.current_thread()
+    name = thread.name
+    first = parts.thread()
+    try:
+        thread.name = 'renamed'
+        renamed = parts.thread()
+    finally:
+        thread.name = name
+    assert parts.thread() is not first
+    assert renamed.name == 'renamed' and renamed.id == first.id
+
+
+def test_supported_loguru_version():
+    # AutoSysLogger._log() follows loguru 0.5.3's private Logger._log(): update both together.
+    assert loguru.__version__.split('.')[:2] == ['0', '5']
+    assert int(loguru.__version__.split('.')[2]) >= 3
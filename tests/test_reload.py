@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+""" Tests for configuration hot reload (incremental handler diff, polling, SIGHUP). """
+import os
+import signal
+
+import pytest
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger, LoguruConfig
+
+
+def _pyproject(level, handlers):
+    lines = ',\n'.join(f'    {{sink = "{sink}", format = "{{message}}"}}' for sink in handlers)
+    return f'[autosysloguru]\ndev_level = "{level}"\ndev_handlers = [\n{lines}\n]\n'
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('AUTOSYSLOGURU_CACHE_DIR', str(tmp_path / 'cache'))
+    for name in ('LOGURU_LEVEL', 'LOGURU_DEFAULT_LEVEL', 'LOGURU_CONFIG_FILENAME'):
+        monkeypatch.delenv(name, raising=False)
+    return tmp_path
+
+
+def _write(path, text):
+    """ Rewrite `path` with a later mtime (coarse filesystem clocks). """
+    mtime_ns = os.stat(path).st_mtime_ns if path.exists() else 0
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+
+
+def test_unchanged_handlers_are_kept(new_logger):
+    log = new_logger(lambda message: None, debug=True)
+    first, second = [], []
+    log.config(LoguruConfig('INFO', None, [{'sink': first.append, 'format': '{message}'}], None))
+    (first_id,) = log._core.handlers
+    sink = log._core.handlers[first_id]._sink
+
+    log.config(LoguruConfig('DEBUG', None, [{'sink': first.append, 'format': '{message}'},
+                                            {'sink': second.append, 'format': '{message}'}], None))
+    assert first_id in log._core.handlers
+    assert log._core.handlers[first_id]._sink is sink
+    assert len(log._core.handlers) == 2
+    log.debug('both')
+
+    log.config(LoguruConfig('DEBUG', None, [{'sink': second.append, 'format': '{message}'}], None))
+    assert first_id not in log._core.handlers
+    log.debug('second')
+    assert first == ['both\n']
+    assert second == ['both\n', 'second\n']
+
+
+def test_config_without_handlers_only_changes_level():
+    messages = []
+    log = AutoSysLogger(core=_Core(), debug=True, level='ERROR', propagate=False, handlers=[messages.append])
+    log.config(LoguruConfig('INFO', None, None, None))
+    log.info('shown')
+    assert len(messages) == 1
+
+
+def test_file_reload_keeps_open_file(project, wait_for, new_logger):
+    pyproject = project / 'pyproject.toml'
+    _write(pyproject, _pyproject('INFO', ['out.log']))
+    log = new_logger(lambda message: None, debug=True)
+    log.config()
+    (handler_id,) = log._core.handlers
+    file_sink = log._core.handlers[handler_id]._sink._stream
+    file = file_sink._file
+
+    log.watch(interval=0.01, signum=None)
+    try:
+        _write(pyproject, _pyproject('DEBUG', ['out.log', 'other.log']))
+        wait_for(lambda: log._state.watcher.reloads == 1)
+    finally:
+        log.unwatch()
+    assert log.level_filter.level == 'DEBUG'
+    assert log._core.handlers[handler_id]._sink._stream is file_sink
+    assert file_sink._file is file
+    log.debug('after reload')
+    log.remove()
+    assert (project / 'out.log').read_text() == 'after reload\n'
+    assert (project / 'other.log').read_text() == 'after reload\n'
+
+
+def test_failed_reload_keeps_configuration(project, capsys, wait_for, new_logger):
+    pyproject = project / 'pyproject.toml'
+    _write(pyproject, _pyproject('INFO', ['out.log']))
+    log = new_logger(lambda message: None, debug=True)
+    log.watch(interval=0.01, signum=None)
+    try:
+        _write(pyproject, '[autosysloguru]\ndev_handlers = "out.log"\n')
+        wait_for(lambda: 'configuration reload' in capsys.readouterr().err)
+    finally:
+        log.unwatch()
+    assert log.level_filter.level == 'INFO'
+    assert len(log._core.handlers) == 1
+    log.remove()
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGHUP'), reason='no SIGHUP on this platform')
+def test_sighup_reload(project, wait_for, new_logger):
+    pyproject = project / 'pyproject.toml'
+    _write(pyproject, _pyproject('INFO', ['out.log']))
+    log = new_logger(lambda message: None, debug=True)
+    log.watch(interval=None)
+    try:
+        pyproject.write_text(_pyproject('WARNING', ['out.log']))  # not polled
+        os.kill(os.getpid(), signal.SIGHUP)
+        wait_for(lambda: log._state.watcher.reloads == 1)
+    finally:
+        log.unwatch()
+    assert log.level_filter.level == 'WARNING'
+    assert signal.getsignal(signal.SIGHUP) == signal.SIG_DFL
+    log.remove()
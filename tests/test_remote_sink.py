@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+""" Tests for the batched network sink (RemoteSink over TCP). """
+import socket
+import time
+
+import pytest
+
+from autosysloguru._remote import WIRE_VERSION, LogReceiver, RemoteSink, decode_batch, encode_batch, parse_address
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def receiver(new_logger):
+    records = []
+    writer = new_logger(records.append, level='DEBUG')
+    receiver = LogReceiver(('127.0.0.1', 0), writer)
+    receiver.records = records
+    yield receiver
+    receiver.stop()
+    writer.remove()
+
+
+def test_parse_address():
+    assert parse_address('tcp://example.org:9999') == (socket.AF_INET, ('example.org', 9999))
+    assert parse_address(('localhost', '9999')) == (socket.AF_INET, ('localhost', 9999))
+    assert parse_address('/tmp/log.sock')[1] == '/tmp/log.sock'
+
+
+def test_frames_are_versioned_json():
+    fields = (0.0, 0.0, 0.0, 'INFO', 20, 'hé', 'name', 'module', 'function', 1, 'file', 'path',
+              1, 'MainProcess', 2, 'MainThread', {'user': 'ann', 'obj': object, 3: 'three'}, None)
+    frame = encode_batch([fields])
+    assert frame[0] == WIRE_VERSION
+    assert int.from_bytes(frame[1:5], 'big') == len(frame) - 5
+    (decoded,) = decode_batch(frame[5:])
+    assert decoded[:16] == list(fields[:16])
+    assert decoded[16] == {'user': 'ann', 'obj': repr(object), '3': 'three'}
+
+
+def test_propagate_batches_records(receiver, wait_for, new_logger):
+    log = new_logger(level='DEBUG')
+    handler_id = log.propagate(receiver.address, batch_size=50, flush_interval=10)
+    for i in range(500):
+        log.info('record {}', i)
+    wait_for(lambda: receiver.received == 500)
+    assert [message.record['message'] for message in receiver.records] == [f'record {i}' for i in range(500)]
+    assert receiver.batches == 10
+    assert receiver.connections == 1
+    log.remove(handler_id)
+
+
+def test_time_based_batching(receiver, wait_for, new_logger):
+    sink = RemoteSink(receiver.address, flush_interval=0.05)
+    log = new_logger(level='DEBUG')
+    log.add(sink, format='{message}')
+    log.info('alone')
+    wait_for(lambda: receiver.received == 1 and sink.batches == 1)
+    log.remove()
+
+
+def test_spool_while_receiver_is_down(wait_for, new_logger):
+    port = _free_port()
+    sink = RemoteSink(('127.0.0.1', port), flush_interval=0.01, spool_size=5, backoff=(0.01, 0.05))
+    log = new_logger(level='DEBUG')
+    log.add(sink, format='{message}')
+    start = time.monotonic()
+    for i in range(20):
+        log.error('record {}', i)  # ERROR: asks for an immediate send
+    assert time.monotonic() - start < 1.0  # never blocks on the dead peer
+    wait_for(lambda: sink.stats()['spooled'] == 5)
+    assert sink.dropped == 15
+    assert not sink.connected
+
+    records = []
+    writer = new_logger(records.append, level='DEBUG')
+    receiver = LogReceiver(('127.0.0.1', port), writer)
+    try:
+        wait_for(lambda: receiver.received == 5)
+        assert [message.record['message'] for message in records] == [f'record {i}' for i in range(15, 20)]
+    finally:
+        log.remove()
+        receiver.stop()
+        writer.remove()
+
+
+def test_reconnect_after_receiver_restart(wait_for, new_logger):
+    records = []
+    writer = new_logger(records.append, level='DEBUG')
+    receiver = LogReceiver(('127.0.0.1', 0), writer)
+    address = receiver.address
+    sink = RemoteSink(address, flush_interval=0.01, backoff=(0.01, 0.05))
+    log = new_logger(level='DEBUG')
+    log.add(sink, format='{message}')
+    log.info('first')
+    wait_for(lambda: receiver.received == 1)
+    receiver.stop()
+
+    receiver = LogReceiver(address, writer)
+    try:
+        for i in range(3):  # the first sends may still go to the closed connection
+            log.info('second {}', i)
+            time.sleep(0.05)
+        log.complete()
+        wait_for(lambda: any(message.record['message'] == 'second 2' for message in records))
+        assert sink.reconnects >= 1
+    finally:
+        log.remove()
+        receiver.stop()
+        writer.remove()
+
+
+def test_send_pending_gives_up(receiver, new_logger):
+    sink = RemoteSink(('127.0.0.1', _free_port()), flush_interval=10)
+    log = new_logger(level='DEBUG')
+    log.add(sink, format='{message}')
+    log.info('lost')
+    assert not sink.send_pending(timeout=0.1)
+    log.remove()
+
+
+@pytest.mark.parametrize('junk', [b'GET / HTTP/1.0\r\n\r\n',  # not a frame version
+                                  b'\1\xff\xff\xff\xff',  # above max_frame_size
+                                  b'\1\0\0\0\5short',  # not JSON
+                                  b'\1\0\0\0\5[[1]]',  # not a record
+                                  b'\1\0\0\0\2{}'])  # not a list of records
+def test_bad_frame_closes_only_its_connection(receiver, junk, capsys, wait_for, new_logger):
+    with socket.create_connection(receiver.address) as bad:
+        bad.sendall(junk)
+        wait_for(lambda: receiver.rejected == 1)
+        assert bad.recv(1) == b''  # closed by the receiver
+    assert 'Logging error in autosysloguru receiver' in capsys.readouterr().err
+
+    log = new_logger(level='DEBUG')
+    log.propagate(receiver.address, flush_interval=0.01)
+    log.info('still received')
+    wait_for(lambda: receiver.received == 1)
+    log.remove()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+""" Tests for the in-memory ring buffer (capture below the handlers' level, dump on ERROR). """
+import os
+import signal
+import threading
+import weakref
+
+import pytest
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger
+
+
+def test_context_is_written_before_the_error(new_logger):
+    messages = []
+    log = new_logger(messages.append, level='SUCCESS')
+    ring = log.ring_buffer(size=3, signum=None)
+    try:
+        for i in range(5):
+            log.debug('step {}', i)
+        log.info('no handler accepts {level}', level='INFO')
+        assert messages == [] and len(ring) == 3
+        log.error('failed')
+    finally:
+        log.stop_ring_buffer()
+        log.remove()
+    records = [message.record for message in messages]
+    assert [r['message'] for r in records] == ['step 3', 'step 4', 'no handler accepts INFO', 'failed']
+    assert [r['level'].name for r in records] == ['DEBUG', 'DEBUG', 'INFO', 'ERROR']
+    assert records[0]['function'] == 'test_context_is_written_before_the_error'
+    assert records[0]['extra']['ring_buffer'] and 'ring_buffer' not in records[-1]['extra']
+    assert records[2]['extra']['level'] == 'INFO'  # captured keyword arguments
+    assert ring.stats() == {'size': 3, 'buffered': 0, 'dumps': 1, 'dumped': 3}
+
+
+def test_messages_are_formatted_when_dumped(new_logger):
+    messages = []
+    log = new_logger(messages.append, level='SUCCESS')
+    log.ring_buffer(level='DEBUG', signum=None)
+    calls = []
+
+    class Payload(list):
+        def __format__(self, spec):
+            calls.append('format')
+            return super().__format__(spec)
+
+    payload = Payload([1])
+    reference = weakref.ref(payload)
+    try:
+        log.trace('below the ring buffer {}', payload)
+        log.debug('payload {}', payload)
+        log.opt(lazy=True).debug('lazy {}', lambda: calls.append('lazy') or 'value')
+        log.opt(capture=True).info('captured', payload=payload)
+        log.bind(request=7).info('bound')
+        log.success('written, no dump')
+        assert len(messages) == 1
+        assert calls == []
+        payload.append(2)
+        del payload
+        log.exception('dump')
+        assert calls == ['format', 'lazy']
+        assert reference() is None  # the slots are released by the dump
+    finally:
+        log.stop_ring_buffer()
+        log.remove()
+    records = [message.record for message in messages]
+    assert [r['message'] for r in records[1:5]] == ['payload [1, 2]', 'lazy value', 'captured', 'bound']
+    assert records[3]['extra']['payload'] == '[1, 2]'
+    assert records[4]['extra']['request'] == 7
+
+
+def test_captured_exception_is_rendered(new_logger):
+    messages = []
+    log = new_logger(messages.append, level='SUCCESS')
+    log.ring_buffer(signum=None)
+    try:
+        try:
+            1 / 0
+        except ZeroDivisionError as error:
+            log.opt(exception=error).debug('handled')
+        log.critical('dump')
+    finally:
+        log.stop_ring_buffer()
+        log.remove()
+    assert 'ZeroDivisionError' in messages[0].record['message']
+
+
+def test_json_handler_receives_replayed_records(tmp_path):
+    log = AutoSysLogger(core=_Core(), level='WARNING', propagate=False, handlers=[])
+    log.add(tmp_path / 'out.json', json=True, filter=log.level_filter, level=0)
+    log.ring_buffer(signum=None)
+    try:
+        log.info('context')
+        log.error('failure')
+    finally:
+        log.stop_ring_buffer()
+        log.remove()
+    lines = (tmp_path / 'out.json').read_text().splitlines()
+    assert len(lines) == 2 and '"context"' in lines[0]
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason='no SIGUSR1 on this platform')
+def test_signal_dumps_the_buffer(wait_for, new_logger):
+    messages = []
+    log = new_logger(messages.append, level='SUCCESS')
+    ring = log.ring_buffer(signum=signal.SIGUSR1)
+    try:
+        log.debug('on request')
+        os.kill(os.getpid(), signal.SIGUSR1)
+        wait_for(lambda: ring.dumps == 1)
+    finally:
+        log.stop_ring_buffer()
+        log.remove()
+    assert messages[0].record['message'] == 'on request'
+    assert signal.getsignal(signal.SIGUSR1) == signal.SIG_DFL
+
+
+def test_no_signal_handler_by_default_or_off_the_main_thread(new_logger):
+    log = new_logger(level='SUCCESS')
+    before = signal.getsignal(signal.SIGINT)
+    rings = []
+    try:
+        assert log.ring_buffer().signum is None
+        thread = threading.Thread(target=lambda: rings.append(log.ring_buffer(signum=signal.SIGINT)))
+        thread.start()
+        thread.join()
+        assert rings[0].signum is None
+        assert signal.getsignal(signal.SIGINT) is before
+    finally:
+        log.stop_ring_buffer()
+        log.remove()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+""" Tests for the JSON-lines serializer. """
+import json
+from typing import List
+
+import pytest
+
+from autosysloguru._serializer import DEFAULT_FIELDS, FIELDS, compile_layout
+
+
+def test_default_fields(tmpdir, new_logger):
+    log = new_logger()
+    path = tmpdir.join('output.json')
+    log.add(str(path), json=True)
+    log.bind(user='me').info('hello {}', 'world')
+    log.remove()
+
+    lines = path.read().splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert tuple(record) == DEFAULT_FIELDS
+    assert record['level'] == 'INFO'
+    assert record['message'] == 'hello world'
+    assert record['function'] == 'test_default_fields'
+    assert record['extra'] == {'user': 'me'}
+    assert record['exception'] is None
+
+
+def test_custom_fields_and_callable_sink(new_logger):
+    log = new_logger()
+    lines: List = []
+    log.add(lines.append, json=True, json_fields=('levelno', 'message', 'path'))
+    log.warning('warning')
+    record = json.loads(lines[0])
+    assert record == {'levelno': 30, 'message': 'warning', 'path': __file__}
+
+
+def test_exception_and_unserializable_extra(new_logger):
+    log = new_logger()
+    lines: List = []
+    log.add(lines.append, json=True)
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        log.bind(obj=object()).exception('failed')
+    record = json.loads(lines[0])
+    assert record['exception'].strip().endswith('ZeroDivisionError: division by zero')
+    assert record['extra']['obj'].startswith('<object object')
+
+
+def test_all_fields_compile(new_logger):
+    layout = compile_layout(list(FIELDS))
+    log = new_logger()
+    records: List = []
+    log.add(lambda message: records.append(layout(message.record)))
+    log.info('message')
+    assert list(records[0]) == list(FIELDS)
+
+
+def test_unknown_field():
+    with pytest.raises(ValueError):
+        compile_layout(['time', 'nope'])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+""" Tests for compiled format templates (same output as loguru's formatting). """
+import io
+
+import pytest
+from loguru import _Core
+
+from autosysloguru import AutoSysLogger
+from autosysloguru._template import TimeFormat, compile_template
+
+FORMATS = [
+    '<green>{time}</green> <level>{message}</level>',
+    '{time:YYYY-MM-DD HH:mm:ss.SSS} | <level>{level: <8}</level> | {name}:{function}:{line} - {message}',
+    '{time:x X [SSS] SS!UTC} {extra[user]!r:>6} {elapsed.days} 100% {process.id} {thread.name}',
+    '{time:%H:%M:%S.%f %z} <red><b>{file}</b></red> {module} {message}',
+    '<lvl>{level.icon}</lvl> {message:>{extra[width]}}',
+]
+
+
+class _Terminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+def _write_both(format_, colorize, log_calls):
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[])
+    log.remove()
+    expected, compiled = [], []
+    log.add(expected.append, format=format_, colorize=colorize)
+    log.add(compiled.append, format=format_, colorize=colorize, compiled=True)
+    log_calls(log.bind(user='bob', width=10))
+    log.remove()
+    return expected, compiled
+
+
+def _calls(log):
+    for level in ('TRACE', 'DEBUG', 'INFO', 'SUCCESS', 'WARNING', 'ERROR', 'CRITICAL'):
+        log.log(level, 'message with {{braces}}, %s and {}', 1)
+    log.log(15, 'numeric level')
+    log.opt(colors=True).info('<red>colored</red> <level>{}</level>', 'markup')
+    log.opt(colors=True).warning('plain, no markup')
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        log.exception('failed')
+
+
+@pytest.mark.parametrize('colorize', [False, True])
+@pytest.mark.parametrize('format_', FORMATS)
+def test_same_output_as_loguru(format_, colorize):
+    expected, compiled = _write_both(format_, colorize, _calls)
+    assert compiled == expected
+    assert compiled[0].record is expected[0].record
+
+
+def test_field_names_are_not_code():
+    template = '{name.__len__() if True else 0} {extra[a"]}'
+    with pytest.raises(AttributeError):
+        template.format_map({'name': 'x', 'extra': {}})  # what loguru does
+    render = compile_template(template)
+    with pytest.raises(AttributeError):
+        render({'name': 'x', 'extra': {}}, '')
+    assert compile_template('{name.__class__.__name__} {extra[a"]}')({'name': 'x', 'extra': {'a"': 1}}, '') == 'str 1'
+
+
+def test_time_format_cache():
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[])
+    log.remove()
+    records = []
+    log.add(lambda message: records.append(message.record))
+    for _ in range(100):
+        log.info('record')
+    for spec in ('', 'HH:mm:ss.SSSSSS', 'YYYY [SSS] x', '%Y %f %%f', 'HH:mm!UTC'):
+        time_format = TimeFormat(spec)
+        assert [time_format(record['time']) for record in records] == \
+            [format(record['time'], spec) for record in records]
+
+
+def test_colors_follow_the_terminal():
+    log = AutoSysLogger(core=_Core(), level='TRACE', propagate=False, handlers=[])
+    log.remove()
+    terminal, pipe = _Terminal(), io.StringIO()
+    log.add(terminal, format='<red>{message}</red>', compiled=True)
+    log.add(pipe, format='<red>{message}</red>', compiled=True)
+    log.info('hello')
+    log.remove()
+    assert terminal.getvalue() == '\x1b[31mhello\x1b[0m\n'
+    assert pipe.getvalue() == 'hello\n'
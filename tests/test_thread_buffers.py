@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+""" Tests for per-thread record buffers merged by a single flusher. """
+import threading
+import time
+
+
+def test_records_are_written_by_the_flusher(new_logger):
+    messages = []
+    log = new_logger({'sink': messages.append, 'format': '{message}'})
+    log.thread_buffers(interval=60)
+    try:
+        log.info('buffered')
+        assert messages == []
+        log.complete()
+        assert messages == ['buffered\n']
+        assert messages[0].record['thread'].id == threading.get_ident()
+    finally:
+        log.stop_thread_buffers()
+        log.remove()
+
+
+def test_threads_are_merged_in_call_order(new_logger):
+    messages = []
+    log = new_logger({'sink': messages.append, 'format': '{message}'})
+    buffers = log.thread_buffers(interval=0.005, lag=0.001, buffer_size=100)
+    turn = threading.Lock()
+    counter = iter(range(100000))
+
+    def work():
+        for _ in range(500):
+            with turn:  # a global call order to check against
+                log.info('{}', next(counter))
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        log.stop_thread_buffers()
+        log.remove()
+    assert [int(message) for message in messages] == list(range(4000))
+    assert buffers.stats()['pending'] == 0 and buffers.written == 4000
+
+
+def test_error_wakes_the_flusher(new_logger):
+    messages = []
+    log = new_logger({'sink': messages.append, 'format': '{message}'})
+    log.thread_buffers(interval=60, lag=0)
+    try:
+        log.info('context')
+        log.error('failure')
+        deadline = time.monotonic() + 5
+        while len(messages) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert messages == ['context\n', 'failure\n']
+    finally:
+        log.stop_thread_buffers()
+        log.remove()
+
+
+def test_stop_writes_pending_records(new_logger):
+    messages = []
+    log = new_logger({'sink': messages.append, 'format': '{message}'})
+    log.thread_buffers(interval=60)
+    log.info('pending')
+    log.stop_thread_buffers()
+    log.info('direct')
+    log.remove()
+    assert messages == ['pending\n', 'direct\n']